@@ -5,8 +5,8 @@ REM Set paths for the JDK installation, source files, and JARs
 SET JDK_URL=https://download.oracle.com/java/17/latest/jdk-17_windows-x64_bin.zip
 SET JDK_DIR=%~dp0local_jdk
 SET OCTANE_JAR=%~dp0\lib\Octane.jar
-SET SOURCE_FILE=%~dp0\src\TagReportListenerImplementation.java
-SET CLASS_FILE=%~dp0TagReportListenerImplementation.class
+SET SOURCE_FILES=%~dp0\src\TagReportListenerImplementation.java %~dp0\src\BinaryTagReportListener.java
+SET CLASS_DIR=%~dp0temp\classes
 SET INTERFACES_JAR=%~dp0\lib\interfaces.jar
 SET TEMP_DIR=%~dp0temp
 
@@ -31,25 +31,26 @@ REM Set the JAVA_HOME and PATH for the local JDK
 SET JAVA_HOME=%JDK_DIR%\jdk-17
 SET PATH=%JAVA_HOME%\bin;%PATH%
 
-REM Compile the Java file using the Octane.jar
-javac -cp %OCTANE_JAR% %SOURCE_FILE%
+REM Compile both listeners (text and binary) using the Octane.jar
+IF NOT EXIST %CLASS_DIR% (
+    mkdir %CLASS_DIR%
+)
+javac -cp %OCTANE_JAR% -d %CLASS_DIR% %SOURCE_FILES%
 
 REM Check if the compilation was successful
-IF EXIST %CLASS_FILE% (
-    echo Compilation successful. Moving the .class file to interfaces.jar...
+IF EXIST %CLASS_DIR%\BinaryTagReportListener.class IF EXIST %CLASS_DIR%\TagReportListenerImplementation.class (
+    echo Compilation successful. Moving the .class files to interfaces.jar...
 
-    REM Update interfaces.jar with the new .class file
-    jar cf %INTERFACES_JAR% %CLASS_FILE%
+    REM Rebuild interfaces.jar with both .class files
+    jar cf %INTERFACES_JAR% -C %CLASS_DIR% TagReportListenerImplementation.class -C %CLASS_DIR% BinaryTagReportListener.class
 
     echo Update successful. Cleaning up...
-
-    REM Optionally, delete the .class file after adding it to the jar
-    del %CLASS_FILE%
-
     echo Done.
-) ELSE (
-    echo Compilation failed. .class file not found.
+    GOTO cleanup
 )
+echo Compilation failed. .class files not found.
+
+:cleanup
 
 REM Clean up the temporary directory
 IF EXIST %TEMP_DIR% (
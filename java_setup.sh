@@ -5,8 +5,9 @@ JDK_VERSION=17
 JDK_URL=https://download.oracle.com/java/$JDK_VERSION/latest/jdk-${JDK_VERSION}_linux-x64_bin.tar.gz
 INSTALL_DIR=$(pwd)/local_jdk
 OCTANE_JAR=$(pwd)/lib/Octane.jar
-SOURCE_FILE=$(pwd)/src/TagReportListenerImplementation.java
-CLASS_FILE=$(pwd)/TagReportListenerImplementation.class
+SOURCE_FILES="$(pwd)/src/TagReportListenerImplementation.java $(pwd)/src/BinaryTagReportListener.java"
+CLASS_DIR=$(pwd)/temp/classes
+CLASS_FILES="TagReportListenerImplementation.class BinaryTagReportListener.class"
 INTERFACES_JAR=$(pwd)/lib/interfaces.jar
 TEMP_DIR=$(pwd)/temp
 
@@ -18,6 +19,7 @@ command_exists () {
 # Create necessary directories
 mkdir -p "$INSTALL_DIR"
 mkdir -p "$TEMP_DIR"
+mkdir -p "$CLASS_DIR"
 
 # Check for existing local JDK installation
 if [ -x "$INSTALL_DIR/bin/java" ]; then
@@ -42,24 +44,20 @@ fi
 export JAVA_HOME=$INSTALL_DIR
 export PATH=$JAVA_HOME/bin:$PATH
 
-# Compile the Java file using the Octane.jar
-javac -cp "$OCTANE_JAR" "$SOURCE_FILE"
+# Compile both listeners (text and binary) using the Octane.jar
+javac -cp "$OCTANE_JAR" -d "$CLASS_DIR" $SOURCE_FILES
 
 # Check if the compilation was successful
-if [ -f "$CLASS_FILE" ]; then
-    echo "Compilation successful. Moving the .class file to interfaces.jar..."
+if [ -f "$CLASS_DIR/TagReportListenerImplementation.class" ] && [ -f "$CLASS_DIR/BinaryTagReportListener.class" ]; then
+    echo "Compilation successful. Moving the .class files to interfaces.jar..."
 
-    # Update interfaces.jar with the new .class file
-    jar uf "$INTERFACES_JAR" -C $(dirname "$CLASS_FILE") $(basename "$CLASS_FILE")
+    # Update interfaces.jar with the new .class files
+    (cd "$CLASS_DIR" && jar uf "$INTERFACES_JAR" $CLASS_FILES)
 
     echo "Update successful. Cleaning up..."
-
-    # Optionally, delete the .class file after adding it to the jar
-    rm "$CLASS_FILE"
-
     echo "Done."
 else
-    echo "Compilation failed. .class file not found."
+    echo "Compilation failed. .class files not found."
 fi
 
 # Clean up the temporary directory
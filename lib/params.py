@@ -44,14 +44,80 @@ def parse_repo_name(root):
 def parse_sensor_def(root):
     return root.find('sensor_def').text
 
+# Function to parse the live phase-difference method (DTW or interpolation)
+def parse_is_dtw(root):
+    return root.find('is_dtw').text.lower() == 'true'
+
+# Function to parse the DTW band radius (None for the full cost matrix)
+def parse_dtw_band(root):
+    band = int(root.find('dtw_band').text)
+    return band if band > 0 else None
+
 # Function to parse the read rate
 def parse_read_rate(root):
     return int(root.find('read_rate').text)
 
+# Function to parse the rate (Hz) at which the live phase difference is computed
+def parse_compute_rate(root):
+    return float(root.find('compute_rate').text)
+
+# Function to parse how tag reports are passed from the Java listener ("text" or "binary")
+def parse_listener_mode(root):
+    return root.find('listener_mode').text.strip().lower()
+
+# Function to parse whether ingest and compute run in separate processes
+def parse_pipeline(root):
+    return root.find('pipeline').text.lower() == 'true'
+
+# Function to parse how results are batched for the GUI (flushed on size or age, coalesced when it falls behind)
+def parse_gui_batching(root):
+    return {
+        'size': int(root.find('./gui_batching/size').text),
+        'max_age_ms': float(root.find('./gui_batching/max_age_ms').text),
+        'max_pending': int(root.find('./gui_batching/max_pending').text)
+    }
+
+# Function to parse the frame rate of the real-time plot
+def parse_gui_fps(root):
+    return float(root.find('gui_fps').text)
+
+# Function to parse the number of phase differences shown by the real-time plot
+def parse_gui_window(root):
+    return int(root.find('gui_window').text)
+
+# Function to parse whether the real-time plot shows the dashboard of every sensor
+def parse_gui_dashboard(root):
+    return root.find('gui_dashboard').text.lower() == 'true'
+
+# Function to parse the configs of the local streaming server
+def parse_stream_configs(root):
+    return {
+        'enabled': root.find('./stream/enabled').text.lower() == 'true',
+        'host': root.find('./stream/host').text,
+        'port': int(root.find('./stream/port').text),
+        'max_pending': int(root.find('./stream/max_pending').text),
+        'rate': float(root.find('./stream/rate').text)
+    }
+
+# Function to parse the configs of the batch analysis of recorded captures
+def parse_batch_analysis_configs(root):
+    return {
+        'workers': int(root.find('./batch_analysis/workers').text),
+        'expected': float(root.find('./batch_analysis/expected').text)
+    }
+
+# Function to parse the maximum number of reads kept in memory per EPC
+def parse_max_tag_history(root):
+    return int(root.find('max_tag_history').text)
+
 # Function to parse the Impinj host IP
 def parse_impinj_host_ip(root):
     return root.find('./impinj/host_ip').text
 
+# Function to parse the IPs of every Impinj reader (one <host_ip> per reader)
+def parse_impinj_host_ips(root):
+    return [host_ip.text for host_ip in root.findall('./impinj/host_ip')]
+
 # Function to parse the Impinj host port
 def parse_impinj_host_port(root):
     return int(root.find('./impinj/host_port').text)
@@ -60,6 +126,14 @@ def parse_impinj_host_port(root):
 def parse_store_data(root):
     return root.find('store_data').text.lower() == 'true'
 
+# Function to parse the offline replay configs
+def parse_replay_configs(root):
+    return {
+        'enabled': root.find('./replay/enabled').text.lower() == 'true',
+        'captures': root.find('./replay/captures').text,
+        'speed': float(root.find('./replay/speed').text)
+    }
+
 # Function to parse the antenna reader configs
 def parse_reader_configs(root):
     return {
@@ -83,10 +157,24 @@ SENSOR_CONFIGS = parse_sensor_configs(root)
 repo_name = parse_repo_name(root)
 SENSOR_DEF = parse_sensor_def(root)
 read_rate = parse_read_rate(root)
+COMPUTE_RATE = parse_compute_rate(root)
+MAX_TAG_HISTORY = parse_max_tag_history(root)
+LISTENER_MODE = parse_listener_mode(root)
+PIPELINE = parse_pipeline(root)
+GUI_BATCHING = parse_gui_batching(root)
+GUI_FPS = parse_gui_fps(root)
+GUI_WINDOW = parse_gui_window(root)
+GUI_DASHBOARD = parse_gui_dashboard(root)
+STREAM = parse_stream_configs(root)
+BATCH_ANALYSIS = parse_batch_analysis_configs(root)
 IMPINJ_HOST_IP = parse_impinj_host_ip(root)
+IMPINJ_HOST_IPS = parse_impinj_host_ips(root)
 IMPINJ_HOST_PORT = parse_impinj_host_port(root)
 STORE_DATA = parse_store_data(root)
+IS_DTW = parse_is_dtw(root)
+DTW_BAND = parse_dtw_band(root)
 CONFIGS = parse_reader_configs(root)
+REPLAY = parse_replay_configs(root)
 
 # Paths
 directory = os.getcwd().split(repo_name)[0] + repo_name
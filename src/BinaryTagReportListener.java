@@ -0,0 +1,101 @@
+import com.impinj.octane.Tag;
+import com.impinj.octane.TagReport;
+import com.impinj.octane.ImpinjReader;
+import com.impinj.octane.TagReportListener;
+
+import java.nio.ByteBuffer;
+import java.nio.ByteOrder;
+import java.util.Map;
+import java.util.concurrent.ConcurrentHashMap;
+
+/**
+ * Writes tag reports as fixed-size little-endian records into a ring buffer
+ * backed by a direct ByteBuffer that Python maps as a NumPy structured array.
+ *
+ * Record layout (RECORD_SIZE bytes):
+ *   0  int64   LastSeenTime (microseconds)
+ *   8  float32 channel (MHz)
+ *   12 float32 phase angle (radians)
+ *   16 float32 peak RSSI (dBm)
+ *   20 uint16  EPC id (registration order, see registerEpc)
+ *   22 uint16  tag seen count
+ *
+ * Only registered EPCs are written. The listener owns writeCount and Python owns
+ * readCount, so a batch costs one call to read each counter. When the ring is full
+ * new reads are dropped (and counted) instead of overwriting unread records.
+ */
+public class BinaryTagReportListener implements TagReportListener {
+
+    public static final int RECORD_SIZE = 24;
+
+    private final ByteBuffer buffer;
+    private final int capacity;
+    private final Map<String, Short> epcIds = new ConcurrentHashMap<>();
+
+    private volatile long writeCount = 0;
+    private volatile long readCount = 0;
+    private volatile long droppedCount = 0;
+    private volatile long ignoredCount = 0;
+
+    public BinaryTagReportListener(ByteBuffer buffer) {
+        this.buffer = buffer.order(ByteOrder.LITTLE_ENDIAN);
+        this.capacity = buffer.capacity() / RECORD_SIZE;
+    }
+
+    public synchronized int registerEpc(String epc) {
+        String key = epc.replace(" ", "").toUpperCase();
+        Short id = epcIds.get(key);
+        if (id == null) {
+            id = (short) epcIds.size();
+            epcIds.put(key, id);
+        }
+        return id;
+    }
+
+    @Override
+    public void onTagReported(ImpinjReader reader, TagReport report) {
+        long write = writeCount;
+        for (Tag tag : report.getTags()) {
+            Short epcId = epcIds.get(tag.getEpc().toHexString().toUpperCase());
+            if (epcId == null) {
+                ignoredCount++;
+                continue;
+            }
+            if (write - readCount >= capacity) {
+                droppedCount++;
+                continue;
+            }
+            int offset = (int) (write % capacity) * RECORD_SIZE;
+            // Same value the text listener prints, so timestamps match the CSV path
+            buffer.putLong(offset, Long.parseLong(tag.getLastSeenTime().toString()));
+            buffer.putFloat(offset + 8, (float) tag.getChannelInMhz());
+            buffer.putFloat(offset + 12, (float) tag.getPhaseAngleInRadians());
+            buffer.putFloat(offset + 16, (float) tag.getPeakRssiInDbm());
+            buffer.putShort(offset + 20, epcId);
+            buffer.putShort(offset + 22, (short) tag.getTagSeenCount());
+            write++;
+        }
+        // Publish the whole report at once; the volatile write orders the record stores before it
+        writeCount = write;
+    }
+
+    public long getWriteCount() {
+        return writeCount;
+    }
+
+    public void setReadCount(long count) {
+        readCount = count;
+    }
+
+    public long getDroppedCount() {
+        return droppedCount;
+    }
+
+    public long getIgnoredCount() {
+        return ignoredCount;
+    }
+
+    public int getCapacity() {
+        return capacity;
+    }
+}
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import numpy as np
+from collections import defaultdict, deque, Counter
+from itertools import chain, islice
+
+class ChannelIndex:
+    """
+    Live index of the phases inside the sliding read window, keyed by (epc, channel).
+
+    The index is updated on every read and evicts the oldest read once the window
+    holds more than `window_size` reads. Channels touched by an insert or an
+    eviction are marked dirty so that consumers only recompute those.
+    """
+    MIN_BATCH = 128  # smaller batches are added read by read, cheaper than the array setup of `extend`
+
+    def __init__(self, window_size):
+        self.window_size = window_size
+        self.phases = defaultdict(deque)   # (epc, channel) -> phases in the window, oldest first
+        self.order = deque(maxlen=window_size)  # (epc, channel) of every read in the window, oldest first
+        self.dirty_channels = set()
+
+    def add(self, epc, channel, phase):
+        """Insert a read and evict the oldest one if the window is full."""
+        key = (epc, channel)
+        if len(self.order) == self.window_size:
+            # The append below drops the oldest key from `order`
+            self.evict({self.order[0]: 1})
+        self.phases[key].append(phase)
+        self.order.append(key)
+        self.dirty_channels.add(channel)
+
+    def extend(self, epcs, channels, phases):
+        """
+        Batch version of `add` for reads in read order (arrays of equal length). Ends with
+        the same window and dirty channels as adding the reads one by one.
+        """
+        epcs, channels, phases = np.asarray(epcs), np.asarray(channels), np.asarray(phases)
+        if len(epcs) < self.MIN_BATCH:
+            for epc, channel, phase in zip(epcs.tolist(), channels.tolist(), phases.tolist()):
+                self.add(epc, channel, phase)
+            return
+        keys = list(zip(epcs.tolist(), channels.tolist()))
+        overflow = len(self.order) + len(keys) - self.window_size
+        evicted = Counter(islice(chain(self.order, keys), max(overflow, 0)))
+
+        # Phases are appended one (epc, channel) group at a time, still oldest first
+        _, epc_codes = np.unique(epcs, return_inverse=True)
+        _, channel_codes = np.unique(channels, return_inverse=True)
+        codes = epc_codes * (channel_codes.max() + 1) + channel_codes
+        order = np.argsort(codes, kind="stable")
+        sorted_codes = codes[order]
+        starts = np.flatnonzero(sorted_codes[1:] != sorted_codes[:-1]) + 1
+        for group in np.split(order, starts):
+            self.phases[keys[group[0]]].extend(phases[group].tolist())
+
+        self.order.extend(keys)
+        self.dirty_channels.update(channels.tolist())
+        self.evict(evicted)
+
+    def evict(self, counts):
+        """Drop the oldest `count` phases of every (epc, channel) key in `counts`."""
+        for key, count in counts.items():
+            old_phases = self.phases[key]
+            if count >= len(old_phases):
+                del self.phases[key]
+            else:
+                for _ in range(count):
+                    old_phases.popleft()
+            self.dirty_channels.add(key[1])
+
+    def get_phases(self, epc, channel):
+        """Phases of one EPC on one channel inside the window (may be empty)."""
+        return self.phases.get((epc, channel), ())
+
+    def pop_dirty_channels(self):
+        """Return the channels changed since the last call and reset the dirty set."""
+        dirty, self.dirty_channels = self.dirty_channels, set()
+        return dirty
+
+    def clear(self):
+        self.phases.clear()
+        self.order.clear()
+        self.dirty_channels.clear()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from time import perf_counter, time
+
+class ComputeScheduler:
+    """
+    Runs a computation at a fixed target rate instead of once per read.
+
+    Reads are counted with `notify` as they are ingested. `poll` runs the
+    computation once a tick is due and at least one read arrived since the
+    previous run, so every read that arrived in between is coalesced into a
+    single computation. When the caller falls behind by more than a period,
+    the missed ticks are skipped rather than replayed back to back.
+
+    Callers must also poll while no read arrives (e.g. from their idle wait), or the
+    reads of the last tick before a pause are only computed once reads resume.
+    """
+    def __init__(self, compute, rate_hz=20):
+        if rate_hz <= 0:
+            raise ValueError("`rate_hz` must be positive.")
+        self.compute = compute
+        self.period = 1.0 / rate_hz
+        self.next_tick = perf_counter()
+
+        self.pending = 0          # reads since the last computation
+        self.latest_timestamp = None
+        self.ticks = 0
+        self.reads = 0
+        self.skipped_ticks = 0
+        self.lag = 0.0            # how late the last tick ran (s)
+        self.max_lag = 0.0
+        self.compute_time = 0.0   # duration of the last computation (s)
+
+    def notify(self, count=1, timestamp=None):
+        """Record newly ingested reads; `timestamp` is the reader time of the newest one (us)."""
+        self.pending += count
+        self.reads += count
+        if timestamp is not None:
+            self.latest_timestamp = timestamp
+
+    def due(self, now=None):
+        now = perf_counter() if now is None else now
+        return self.pending > 0 and now >= self.next_tick
+
+    def poll(self, now=None):
+        """
+        Run the computation if a tick is due.
+
+        :return: (ran, result): whether the computation ran and what it returned (None
+                 when it did not run), so a computation returning None is not mistaken
+                 for a tick that was not due.
+        """
+        now = perf_counter() if now is None else now
+        if not self.due(now):
+            return False, None
+
+        self.lag = now - self.next_tick
+        self.max_lag = max(self.max_lag, self.lag)
+        self.next_tick += self.period
+        if self.next_tick <= now:
+            missed = int((now - self.next_tick) / self.period) + 1
+            self.skipped_ticks += missed
+            self.next_tick += missed * self.period
+
+        self.pending = 0
+        self.ticks += 1
+        result = self.compute()
+        self.compute_time = perf_counter() - now
+        return True, result
+
+    def get_stats(self):
+        """Summary of the scheduler state, for logging."""
+        return {
+            "ticks": self.ticks,
+            "reads": self.reads,
+            "reads_per_tick": self.reads / self.ticks if self.ticks else 0.0,
+            "skipped_ticks": self.skipped_ticks,
+            "lag_s": self.lag,
+            "max_lag_s": self.max_lag,
+            "compute_time_s": self.compute_time,
+            # Age of the newest read against the wall clock, assumes the reader clock is in sync
+            "data_age_s": time() - self.latest_timestamp / 1e6 if self.latest_timestamp is not None else None
+        }
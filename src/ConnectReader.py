@@ -1,15 +1,70 @@
 import jpype
+import jpype.nio
+import numpy as np
 from jpype.types import JInt
 
 from time import time,sleep
-from threading import Thread,Event
+from threading import Thread,Event,Lock
 from multiprocessing import Queue
 from traceback import format_exc
-from lib.params import CONFIGS
+from ComputeScheduler import ComputeScheduler
+from ResultPublisher import ResultPublisher
+from report_parser import parse_report_lines
+from lib.params import CONFIGS, COMPUTE_RATE, LISTENER_MODE, GUI_BATCHING
 from lib.params import SENSOR_CONFIGS,SENSOR_DEF
 
+@jpype.JImplements("com.impinj.octane.TagReportListener", deferred=True)
+class PythonTagReportListener:
+    """
+    TagReportListener implemented in Python through a JPype proxy.
+
+    Octane calls onTagReported on its own thread; the tags of each report are
+    converted to typed columns and ingested right there, with no pipe or reader thread.
+    Ingest holds the reader's lock, as ConnectReader.tick_loop computes on another thread.
+    """
+    def __init__(self, connect_reader):
+        self.connect_reader = connect_reader
+
+    @jpype.JOverride
+    def onTagReported(self, reader, report):
+        # Exceptions must not propagate into the reader's event thread
+        try:
+            if self.connect_reader.stop_event.is_set():
+                return
+            tags = list(report.getTags())
+            if not tags:
+                return
+            timestamps = np.array([int(str(tag.getLastSeenTime().toString())) for tag in tags], dtype=np.int64)
+            columns = (
+                [str(tag.getEpc().toHexString()).upper() for tag in tags],
+                timestamps,
+                [float(tag.getChannelInMhz()) for tag in tags],
+                [float(tag.getPhaseAngleInRadians()) for tag in tags],
+                [float(tag.getPeakRssiInDbm()) for tag in tags],
+                [int(tag.getTagSeenCount()) for tag in tags]
+            )
+            parsed_at = time()*1_000
+            with self.connect_reader.lock:
+                self.connect_reader.tag_data.add_tags(*columns)
+                self.connect_reader.publish_reads(len(tags), int(timestamps[-1]), parsed_at, time()*1_000)
+        except Exception:
+            print("Error processing tag report")
+            print(format_exc())
+
 class ConnectReader():
-    def __init__(self, hostname, jar_files, tag_data, if_gui=False, data_queue=None):
+    # Record layout written by BinaryTagReportListener (little endian, 24 bytes)
+    REPORT_DTYPE = np.dtype([
+        ("timestamp", "<i8"),       # LastSeenTime (microseconds)
+        ("channel", "<f4"),         # MHz
+        ("phase", "<f4"),           # radians
+        ("rssi", "<f4"),
+        ("epc", "<u2"),             # index into tag_data.epcs
+        ("readCount", "<u2")
+    ])
+
+    def __init__(self, hostname, jar_files, tag_data, if_gui=False, data_queue=None, compute_rate=COMPUTE_RATE, batch_size=GUI_BATCHING['size'],
+                 listener_mode=LISTENER_MODE, report_capacity=1 << 16, poll_interval=0.001, max_chunk=4096, series=None,
+                 dashboard=False):
         self.hostname = hostname
         self.jars = jar_files
         self.tag_data = tag_data  # Instance of TagData class
@@ -21,10 +76,42 @@ class ConnectReader():
         self.tag_listener = None
         self.stop_event = Event()
         self.stream_thread = None
+        # Proxy mode ingests on the reader's thread and ticks on stream_thread
+        self.lock = Lock()
+        # Coalesces the reads that arrive between ticks into one phase-difference computation
+        # (only when computing here; an ingest-only reader just forwards reads)
+        # The dashboard and stream subscribers get the phase and RSSI difference of every sensor, the plot only the primary phase difference
+        self.dashboard = dashboard
+        # Ingest-only sinks (e.g. RingTagSink) have no compute methods
+        self.scheduler = None
+        if if_gui:
+            compute = self.tag_data.calculate_sensor_differences if dashboard else self.tag_data.calculate_avg_phase_difference
+            self.scheduler = ComputeScheduler(compute, compute_rate)
+        # (parse, insert) wall-clock times (ms) of the newest reads, for latency tracing
+        self.stamps = (None, None)
+        # Writes the phase differences to the shared series, or batches them through data_queue
+        # (flushed on batch_size or age, see GUI_BATCHING); results already arrive at compute_rate
+        self.publisher = ResultPublisher(data_queue, batch_size, series)
+        # "text": CSV lines through a Java pipe, "binary": records in a shared direct ByteBuffer,
+        # "proxy": a Python listener called directly by the reader (no pipe, no reader thread)
+        if listener_mode not in ("text", "binary", "proxy"):
+            raise ValueError("`listener_mode` must be 'text', 'binary' or 'proxy'.")
+        self.listener_mode = listener_mode
+        self.report_capacity = report_capacity
+        self.poll_interval = poll_interval
+        self.report_buffer = None
+        self.report_records = None
+        self.report_read = 0
+        # Upper bound on the report lines parsed at once in text mode
+        self.max_chunk = max_chunk
 
+    # A failing step only raises: the JVM may be shared with other readers, so it is
+    # left to `shutdown`, which the owner of the readers calls once
     def start_jvm(self):
         try:
-            jpype.startJVM(classpath=self.jars)
+            # Several readers (see MultiReaderCollector) share the single JVM of the process
+            if not jpype.isJVMStarted():
+                jpype.startJVM(classpath=self.jars)
             self.TagReportListenerImplementation = jpype.JClass("TagReportListenerImplementation")
             self.PipedOutputStream = jpype.JClass('java.io.PipedOutputStream')
             self.PipedInputStream = jpype.JClass('java.io.PipedInputStream')
@@ -33,7 +120,6 @@ class ConnectReader():
         except Exception:
             print("Could not import the Java dependencies")
             print(format_exc())
-            jpype.shutdownJVM()
             raise
 
     def connect_reader(self):
@@ -44,7 +130,6 @@ class ConnectReader():
         except Exception:
             print(f"Could not establish connection with the reader at {self.hostname}")
             print(format_exc())
-            jpype.shutdownJVM()
             raise
     
     def configure_reader(self):
@@ -76,10 +161,13 @@ class ConnectReader():
             print(f"Could not configure the reader")
             print(format_exc())
             self.reader.disconnect()
-            jpype.shutdownJVM()
             raise
 
     def setup_listener(self):
+        if self.listener_mode == "binary":
+            return self.setup_binary_listener()
+        if self.listener_mode == "proxy":
+            return self.setup_proxy_listener()
         try:
             self.output_stream = self.PipedOutputStream()
             input_stream = self.PipedInputStream(self.output_stream)
@@ -91,70 +179,199 @@ class ConnectReader():
             print("Could not initialize the listener")
             print(format_exc())
             self.reader.disconnect()
-            jpype.shutdownJVM()
             raise
 
+    def setup_binary_listener(self):
+        try:
+            # The Java listener writes straight into this memory; NumPy views it without copying
+            self.report_buffer = bytearray(self.report_capacity * self.REPORT_DTYPE.itemsize)
+            self.report_records = np.frombuffer(self.report_buffer, dtype=self.REPORT_DTYPE)
+            self.report_read = 0
+
+            try:
+                listener_class = jpype.JClass("BinaryTagReportListener")
+            except Exception as e:
+                # Jars built before the binary listener only hold TagReportListenerImplementation
+                raise RuntimeError("lib/interfaces.jar has no BinaryTagReportListener: rebuild it with "
+                                   "java_setup.sh/java_setup.bat or set <listener_mode>text</listener_mode>") from e
+            self.tag_listener = listener_class(jpype.nio.convertToDirectBuffer(self.report_buffer))
+            for epc in self.tag_data.epcs:
+                self.tag_listener.registerEpc(epc)
+            self.reader.setTagReportListener(self.tag_listener)
+        except Exception:
+            print("Could not initialize the binary listener")
+            print(format_exc())
+            self.reader.disconnect()
+            raise
+
+    def setup_proxy_listener(self):
+        try:
+            self.tag_listener = PythonTagReportListener(self)
+            self.reader.setTagReportListener(self.tag_listener)
+        except Exception:
+            print("Could not initialize the proxy listener")
+            print(format_exc())
+            self.reader.disconnect()
+            raise
+
+    def publish_reads(self, count, timestamp, parsed_at=None, inserted_at=None):
+        """
+        Let the scheduler know about new reads and send any phase difference it computes to the GUI.
+
+        :param timestamp: Reader timestamp (us) of the newest read.
+        :param parsed_at: Wall-clock time (ms) the reads were decoded, for latency tracing.
+        :param inserted_at: Wall-clock time (ms) they were in TagData.
+        """
+        if not self.if_gui:
+            return
+        self.scheduler.notify(count, timestamp)
+        self.stamps = (parsed_at, inserted_at)
+        self.tick()
+
+    def tick(self):
+        """
+        Run the computation if a tick is due and send its result, otherwise send whatever
+        the publisher has due. Every listener mode also calls this while no read arrives,
+        so the last reads before a pause are computed on time and no result waits for the next read.
+        """
+        if not self.if_gui:
+            return
+        ran, result = self.scheduler.poll()
+        if ran and result is not None:
+            parsed_at, inserted_at = self.stamps
+            trace = {"read": self.scheduler.latest_timestamp / 1_000, "parse": parsed_at, "insert": inserted_at,
+                     "compute": time()*1_000}
+            if self.dashboard:
+                self.publisher.publish_sensors(result, trace)
+            else:
+                self.publisher.publish(result, trace)
+        else:
+            self.publisher.poll()
+
+    def tick_loop(self):
+        """Proxy mode: tick while the listener is idle (it only runs when a report arrives)."""
+        while not self.stop_event.is_set():
+            with self.lock:
+                self.tick()
+            sleep(self.poll_interval)
+
+    def drain_reports(self):
+        """
+        Move every record published by the binary listener into TagData.
+
+        :return: (number of records, timestamp of the last one, (parsed_at, inserted_at) in ms)
+        """
+        write = int(self.tag_listener.getWriteCount())
+        count = write - self.report_read
+        if count == 0:
+            return 0, None, ()
+        start = self.report_read % self.report_capacity
+        end = start + count
+        if end <= self.report_capacity:
+            records = self.report_records[start:end]
+        else:
+            records = np.concatenate((self.report_records[start:], self.report_records[:end - self.report_capacity]))
+        parsed_at = time()*1_000
+        # TagData copies everything it keeps, so the slots can be handed back to the listener afterwards
+        self.tag_data.add_tag_batch(
+            records["epc"], records["timestamp"], records["channel"],
+            np.degrees(records["phase"].astype(float)), records["rssi"], records["readCount"]
+        )
+        inserted_at = time()*1_000
+        timestamp = int(records["timestamp"][-1])
+        self.report_read = write
+        self.tag_listener.setReadCount(write)
+        return count, timestamp, (parsed_at, inserted_at)
+
+    def read_binary_stream(self):
+        try:
+            while True:
+                stopping = self.stop_event.is_set()
+                count, timestamp, stamps = self.drain_reports()
+                if count:
+                    self.publish_reads(count, timestamp, *stamps)
+                elif stopping:
+                    break
+                else:
+                    # Due computations and buffered results go out without waiting for a read
+                    self.tick()
+                    sleep(self.poll_interval)
+        except KeyboardInterrupt:
+            print("Read interrupted. Stopping the connection.")
+        except Exception:
+            print(format_exc())
+        finally:
+            dropped = int(self.tag_listener.getDroppedCount())
+            if dropped:
+                print(f"Binary listener dropped {dropped} reads (ring buffer full)")
+            if self.if_gui:
+                print(f"Compute scheduler: {self.scheduler.get_stats()}, publisher: {self.publisher.get_stats()}")
+
+    def read_available_lines(self):
+        """
+        Drain every report line the pipe already holds, without blocking.
+
+        :return: A list of lines (empty when none is ready), or None once the stream is closed.
+        """
+        lines = []
+        while len(lines) < self.max_chunk and self.reader_stream.ready():
+            line = self.reader_stream.readLine()
+            if line is None:
+                return lines or None
+            lines.append(str(line))
+        return lines
+
     def read_stream(self):
         try:
-            buffer = []
-            counter = 0
             while not self.stop_event.is_set():
-                line = self.reader_stream.readLine()
-                if line:
-                    try:
-                        epc, timestamp, channel, phase, rssi, readCount = line.strip().split(',')
-                        epc = "".join(str(epc).strip().split(" "))
-                        self.tag_data.add_tag(epc, str(timestamp), str(channel), str(phase), str(rssi), str(readCount))
-                        # print(epc, time()*1_000, channel, phase, rssi)
-                        # print(len(self.tag_data.get_all_tags()))
-                        # Latency charaterization for dtw_phase_calc
-                        # t_start = time() * 1_000
-                        # avg_phase_diff = self.tag_data.calculate_avg_phase_difference()
-                        # t_stop  = time() * 1_000
-                        # print(f"lag: {t_stop - t_start}")
-                        # counter += 1
-                        # if self.if_gui and counter % 10 == 0:
-                        if self.if_gui:
-                            # Add the avg phase difference to the buffer
-                            avg_phase_diff = self.tag_data.calculate_avg_phase_difference()
-                            print(avg_phase_diff)
-                            # t_start = time()*1_000
-                            # self.data_queue.put([avg_phase_diff,t_start])
-                            
-                            if avg_phase_diff is not None:
-                                t_start = time()*1_000
-                                buffer.append([avg_phase_diff,t_start])
-
-                            # Send the buffer if it reaches a certain size
-                            if len(buffer) >= 50:
-                                t_start = time()
-                                print(f"t_start: {t_start}, {len(self.tag_data.get_all_tags())}")
-                                self.data_queue.put(buffer)
-                                sleep(0.001)
-                                buffer.clear()
-                            
-                    except Exception as e:
-                        print(f"Error processing line {line}. Error: {str(e)}")
-                        print(format_exc())
-                else:
+                lines = self.read_available_lines()
+                if lines is None:
                     break
+                if not lines:
+                    # Polled rather than blocking on readLine, so due computations and
+                    # buffered results go out while no read arrives
+                    self.tick()
+                    sleep(self.poll_interval)
+                    continue
+                try:
+                    reads = parse_report_lines(lines)
+                    if len(reads["epc"]) == 0:
+                        continue
+                    parsed_at = time()*1_000
+                    self.tag_data.add_tags(reads["epc"], reads["timestamp"], reads["channel"],
+                                           reads["phase"], reads["rssi"], reads["readCount"])
+                    self.publish_reads(len(reads["epc"]), int(reads["timestamp"][-1]), parsed_at, time()*1_000)
+                except Exception as e:
+                    print(f"Error processing {len(lines)} lines. Error: {str(e)}")
+                    print(format_exc())
         except KeyboardInterrupt:
             print("Read interrupted. Stopping the connection.")
         except Exception:
             print(format_exc())
         finally:
+            if self.if_gui:
+                print(f"Compute scheduler: {self.scheduler.get_stats()}, publisher: {self.publisher.get_stats()}")
             try:
                 self.reader_stream.close()
             except Exception:
                 print("Failed to close reader stream.")
 
+    def begin_reading(self):
+        """Start the reader and the ingest thread without waiting (see start_reading)."""
+        print(f"Starting the reader at {self.hostname}...")
+        self.reader.start()
+        self.stop_event.clear()
+        if self.listener_mode != "proxy":
+            target = self.read_binary_stream if self.listener_mode == "binary" else self.read_stream
+            self.stream_thread = Thread(target=target)
+            self.stream_thread.start()
+        elif self.if_gui:
+            self.stream_thread = Thread(target=self.tick_loop)
+            self.stream_thread.start()
+
     def start_reading(self, continuous=False, duration=10):
         try:
-            print("Starting the reader...")
-            self.reader.start()
-            self.stop_event.clear()
-            self.stream_thread = Thread(target=self.read_stream)
-            self.stream_thread.start()
+            self.begin_reading()
 
             if not continuous:
                 jpype.java.lang.Thread.sleep(JInt(duration) * 1000)
@@ -164,17 +381,19 @@ class ConnectReader():
                 # jpype.java.lang.Thread.sleep(JInt(duration) * 1000)
                 # self.stop_event.set()
                 try:
-                    # pass
+                    # Sleep instead of spinning so the listener is not starved of the GIL
                     while True:
-                        pass
+                        sleep(0.1)
                 except KeyboardInterrupt:
                     print("Keyboard interrupt received. Stopping the stream")
                     self.stop_event.set()
                 except Exception:
                     print(format_exc())
             # print(f"count: {len(self.tag_data.get_all_tags())}")
-            self.output_stream.close()
-            self.stream_thread.join()
+            self.close_stream()
+            self.join_stream()
+            if self.listener_mode == "proxy" and self.if_gui:
+                print(f"Compute scheduler: {self.scheduler.get_stats()}, publisher: {self.publisher.get_stats()}")
 
         except jpype.JException as e:
             print(f"Java exception: {e.getMessage()}")
@@ -187,11 +406,20 @@ class ConnectReader():
             self.reader.disconnect()
             print("Disconnected")
 
+    def close_stream(self):
+        # Closes the text-mode pipe; the read loops stop on stop_event
+        if self.output_stream is not None:
+            self.output_stream.close()
+
+    def join_stream(self):
+        if self.stream_thread is not None:
+            self.stream_thread.join()
+
     def stop_reading(self):
         try:
             self.stop_event.set()
-            self.output_stream.close()
-            self.stream_thread.join()
+            self.close_stream()
+            self.join_stream()
         except:
             print(format_exc())
         finally:
@@ -200,4 +428,5 @@ class ConnectReader():
             print("Disconnected")
 
     def shutdown(self):
-        jpype.shutdownJVM()
\ No newline at end of file
+        if jpype.isJVMStarted():
+            jpype.shutdownJVM()
\ No newline at end of file
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import json
+import numpy as np
+
+# Columns of a published sample: the phase difference followed by the wall-clock time (ms)
+# at which it passed each stage upstream of the GUI. "read" is the reader LastSeenTime of
+# the newest read behind the value, so it assumes the reader clock is in sync.
+SAMPLE_FIELDS = ("value", "enqueue", "read", "parse", "insert", "compute")
+
+# Stage transitions measured for every sample, ending with the two GUI-side stages
+STAGES = (
+    ("read", "parse"),
+    ("parse", "insert"),
+    ("insert", "compute"),
+    ("compute", "enqueue"),
+    ("enqueue", "dequeue"),
+    ("dequeue", "draw"),
+    ("read", "draw")
+)
+
+class LatencyHistogram:
+    """
+    HDR-style histogram of latencies in microseconds.
+
+    Values below 2 * SUB_BUCKETS are counted exactly; above that every power of two is
+    split into SUB_BUCKETS linear buckets, so any recorded value is off by less than
+    1 / SUB_BUCKETS (about 1.6%) whatever its magnitude. Recording is a vectorized
+    bucket increment and memory is fixed.
+    """
+    SUB_BUCKETS = 64
+
+    def __init__(self, max_value_us=100_000_000):
+        self.max_value = int(max_value_us)
+        self.counts = np.zeros(self.bucket_index(np.array([self.max_value]))[0] + 1, dtype=np.int64)
+        self.total = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+    def bucket_index(self, values):
+        values = np.asarray(values, dtype=np.int64)
+        # frexp gives the bit length of each (positive) integer as its exponent
+        magnitude = np.maximum(np.frexp(np.maximum(values, 1).astype(float))[1] - 7, 0)
+        return magnitude * self.SUB_BUCKETS + (values >> magnitude)
+
+    def bucket_value(self, index):
+        magnitude = max(index // self.SUB_BUCKETS - 1, 0)
+        return (index - magnitude * self.SUB_BUCKETS) << magnitude
+
+    def record(self, values_us):
+        """Record latencies (us); negative values (clock skew) count as 0, huge ones are clamped."""
+        values = np.clip(np.asarray(values_us, dtype=float), 0, self.max_value).astype(np.int64)
+        if len(values) == 0:
+            return
+        np.add.at(self.counts, self.bucket_index(values), 1)
+        self.total += len(values)
+        self.sum += float(values.sum())
+        self.min = int(values.min()) if self.min is None else min(self.min, int(values.min()))
+        self.max = int(values.max()) if self.max is None else max(self.max, int(values.max()))
+
+    def percentile(self, q):
+        """Latency (us) below which q percent of the recorded values fall."""
+        if self.total == 0:
+            return None
+        rank = max(int(np.ceil(q / 100 * self.total)), 1)
+        index = int(np.searchsorted(np.cumsum(self.counts), rank))
+        return min(self.bucket_value(index), self.max)
+
+    def summary(self):
+        return {
+            "count": self.total,
+            "min_ms": self.min / 1_000 if self.total else None,
+            "mean_ms": self.sum / self.total / 1_000 if self.total else None,
+            **{f"p{q:g}_ms": self.percentile(q) / 1_000 if self.total else None for q in (50, 90, 99, 99.9)},
+            "max_ms": self.max / 1_000 if self.total else None
+        }
+
+class LatencyTracer:
+    """Per-stage latency histograms fed with the stage timestamps carried by every sample."""
+    def __init__(self, stages=STAGES):
+        self.stages = stages
+        self.histograms = {f"{start}->{end}": LatencyHistogram() for start, end in stages}
+
+    def record_samples(self, samples, dequeue, draw):
+        """
+        :param samples: (n, len(SAMPLE_FIELDS)) array of published samples (ms timestamps).
+        :param dequeue: Time (ms) the GUI took them off the transport.
+        :param draw: Time (ms) the frame showing them was drawn.
+        """
+        samples = np.asarray(samples, dtype=float)
+        if samples.ndim != 2 or samples.shape[1] < len(SAMPLE_FIELDS):
+            return
+        times = {field: samples[:, i] for i, field in enumerate(SAMPLE_FIELDS)}
+        times["dequeue"] = np.full(len(samples), dequeue)
+        times["draw"] = np.full(len(samples), draw)
+        for (start, end), histogram in zip(self.stages, self.histograms.values()):
+            # Stages that were not stamped upstream (NaN) are left out
+            deltas = (times[end] - times[start]) * 1_000
+            histogram.record(deltas[np.isfinite(deltas)])
+
+    def report(self):
+        return {stage: histogram.summary() for stage, histogram in self.histograms.items()}
+
+    def dump(self, path):
+        """Write the per-stage summary as a JSON report."""
+        with open(path, "w") as f:
+            json.dump(self.report(), f, indent=4)
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from time import sleep,perf_counter
+from traceback import format_exc
+from TagData import TagData
+from reader_factory import create_reader
+from lib.params import CONFIGS
+
+class MultiReaderCollector:
+    """
+    Collects from several Impinj readers at once.
+
+    Every reader gets its own connection, listener and ingest lane: a TagData of its
+    own, so lanes never contend and phase differences are only formed between reads of
+    the same reader and antenna (phase offsets differ between them). The lanes are
+    merged on demand into views keyed by (reader, antenna, epc).
+
+    Readers are created with `reader_factory.create_reader`, so with replay enabled in
+    params.xml every lane is a simulated reader replaying the recorded captures.
+    """
+    def __init__(self, hostnames, sensor_cfg, antenna=CONFIGS['reader']['antenna'], create=create_reader, **reader_kwargs):
+        """
+        :param hostnames: One hostname per reader (e.g. IMPINJ_HOST_IPS).
+        :param sensor_cfg: Sensor config(s) tracked by every lane, as for TagData.
+        :param antenna: Antenna the readers report on (configure_reader enables only this one).
+        :param create: Reader constructor, called as create(tag_data, hostname=..., **reader_kwargs).
+        """
+        if not hostnames or len(set(hostnames)) != len(hostnames):
+            raise ValueError("`hostnames` must name at least one reader, each only once.")
+        self.hostnames = list(hostnames)
+        self.antenna = antenna
+        self.lanes = {(hostname, antenna): TagData(sensor_cfg) for hostname in self.hostnames}
+        self.readers = {hostname: create(self.lanes[(hostname, antenna)], hostname=hostname, **reader_kwargs)
+                        for hostname in self.hostnames}
+        # Kept to shut the shared JVM down even if every reader was left out
+        self.jvm_reader = next(iter(self.readers.values()))
+        self.failed = {}
+        self.reading_time = 0.0
+
+    def connect(self):
+        """
+        Start the JVM (shared by all readers), then connect, configure and attach a listener to each reader.
+
+        A reader that fails is left out, with its lane, and recorded in `failed`; the others
+        keep going on the JVM they share. Raises only if no reader is left.
+        """
+        for hostname, reader in list(self.readers.items()):
+            try:
+                reader.start_jvm()
+                reader.connect_reader()
+                reader.configure_reader()
+                reader.setup_listener()
+            except Exception as e:
+                print(f"Leaving out the reader at {hostname}: {e}")
+                self.failed[hostname] = e
+                del self.readers[hostname]
+                lane = self.lanes.pop((hostname, self.antenna))
+                if lane.segment_writer is not None:
+                    lane.segment_writer.finalize()
+        if not self.readers:
+            raise RuntimeError(f"Could not connect to any of the readers {self.hostnames}")
+
+    def start_reading(self, continuous=False, duration=10):
+        """Read from every reader concurrently for `duration` seconds (until Ctrl-C when continuous)."""
+        start = perf_counter()
+        started = []
+        try:
+            for reader in self.readers.values():
+                reader.begin_reading()
+                started.append(reader)
+            if continuous:
+                while True:
+                    sleep(0.1)
+            else:
+                sleep(duration)
+        except KeyboardInterrupt:
+            print("Keyboard interrupt received. Stopping the readers")
+        except Exception:
+            print("Failed to start or complete reading")
+            print(format_exc())
+        finally:
+            for reader in started:
+                try:
+                    reader.stop_reading()
+                except Exception:
+                    print(format_exc())
+            self.reading_time = perf_counter() - start
+
+    def shutdown(self):
+        # The readers share one JVM, shut down once here rather than by a failing reader
+        self.jvm_reader.shutdown()
+
+    def get_stats(self):
+        """Per-reader throughput: tracked reads and reads per second over the reading time."""
+        stats = {}
+        for (hostname, antenna), tag_data in self.lanes.items():
+            stats[hostname] = {
+                "antenna": antenna,
+                "reads": tag_data.num_reads,
+                "reads_per_s": tag_data.num_reads / self.reading_time if self.reading_time else 0.0
+            }
+        return stats
+
+    def get_record_count(self):
+        return sum(tag_data.get_record_count() for tag_data in self.lanes.values())
+
+    def get_all_tags(self):
+        """Reads of every lane, each tagged with its reader and antenna, ordered by timestamp."""
+        tags = []
+        for (hostname, antenna), tag_data in self.lanes.items():
+            for tag in tag_data.get_all_tags():
+                tag["reader"] = hostname
+                tag["antenna"] = antenna
+                tags.append(tag)
+        return sorted(tags, key=lambda tag: tag["timestamp"])
+
+    def restructure_tag_data(self, window=False):
+        """Reads grouped by (reader, antenna, epc)."""
+        return {
+            (hostname, antenna, epc): data
+            for (hostname, antenna), tag_data in self.lanes.items()
+            for epc, data in tag_data.restructure_tag_data(window).items()
+        }
+
+    def calculate_phase_differences(self, window=True):
+        """Phase difference of every sensor, per (reader, antenna)."""
+        return {key: tag_data.calculate_phase_differences(window) for key, tag_data in self.lanes.items()}
+
+    def lane_names(self, fname):
+        """Capture name of each lane: <fname>_reader<i>_ant<antenna>, i the reader's index in `hostnames`."""
+        return {key: f"{fname}_reader{self.hostnames.index(key[0])}_ant{key[1]}" for key in self.lanes}
+
+    def start_spill(self, fname):
+        for key, lane_name in self.lane_names(fname).items():
+            self.lanes[key].start_spill(lane_name)
+
+    def save_data(self, fname):
+        """Save each lane as its own capture."""
+        for key, lane_name in self.lane_names(fname).items():
+            self.lanes[key].save_data(lane_name)
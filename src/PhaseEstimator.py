@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import numpy as np
+from collections import deque
+from phase_unwrap import PhaseUnwrapper
+
+class PhaseEstimator:
+    """
+    Streaming version of the interpolated moving-average phase difference.
+
+    Mirrors `plot_interpolated_moving_average_phase_difference`: phases are
+    unwrapped per (epc, channel), tag 2 is linearly interpolated at the
+    timestamps of tag 1 on the same channel, and the differences are averaged
+    over a time window before being folded into [0, 90] degrees.
+
+    Every read is handled in amortized constant time:
+      * the unwrap state (last phase, cumulative correction) is kept per (epc, channel),
+      * tag-1 reads wait for the next tag-2 read on their channel and are then
+        interpolated between the two tag-2 reads surrounding them (they fall back
+        to the last tag-2 value, as np.interp does, when the reader hops away),
+      * a running sum over a time-ordered deque gives the window mean, with
+        expired differences evicted from the front.
+
+    Since unwrapping is continuous instead of restarting at each window, every
+    difference is wrapped into [-180, 180) so the mean does not depend on where
+    the unwrap started.
+    """
+    MIN_BATCH = 256  # smaller batches are added read by read, cheaper than the array setup of `extend`
+
+    def __init__(self, epcs, window_s, time_scale=1_000_000):
+        """
+        :param epcs: The two EPCs of the sensor, reference tag first.
+        :param window_s: Averaging window in seconds.
+        :param time_scale: Timestamp ticks per second (reader timestamps are microseconds).
+        """
+        if len(epcs) < 2:
+            raise ValueError("`epcs` must contain two RFID EPC codes.")
+        if window_s <= 0:
+            raise ValueError("`window_s` must be positive.")
+        self.epc1, self.epc2 = epcs[0], epcs[1]
+        self.window = window_s * time_scale
+
+        self.unwrappers = {}     # (epc, channel) -> PhaseUnwrapper (last raw phase, cumulative correction)
+        self.last_ref = {}       # channel -> (timestamp, unwrapped phase) of the last tag-2 read
+        self.pending = deque()   # (timestamp, unwrapped phase) tag-1 reads waiting for tag 2
+        self.pending_channel = None
+
+        self.diffs = deque()     # (timestamp, difference) inside the window
+        self.total = 0.0
+        self.latest = None
+        self.value = None
+
+    def unwrapper(self, epc, channel):
+        """PhaseUnwrapper of one (epc, channel), created on its first read."""
+        unwrapper = self.unwrappers.get((epc, channel))
+        if unwrapper is None:
+            unwrapper = self.unwrappers[(epc, channel)] = PhaseUnwrapper()
+        return unwrapper
+
+    def unwrap(self, epc, channel, phase):
+        """Unwrap one phase (degrees) against the previous read of the same (epc, channel)."""
+        return self.unwrapper(epc, channel).update(phase)
+
+    def unwrap_batch(self, is_ref, channels, phases):
+        """Unwrap a batch of reads of both tags, one (epc, channel) chunk at a time."""
+        channel_values, channel_codes = np.unique(channels, return_inverse=True)
+        codes = channel_codes * 2 + is_ref
+        order = np.argsort(codes, kind="stable")
+        sorted_codes = codes[order]
+        starts = np.flatnonzero(sorted_codes[1:] != sorted_codes[:-1]) + 1
+        unwrapped = np.empty(len(phases))
+        for group in np.split(order, starts):
+            epc = self.epc2 if is_ref[group[0]] else self.epc1
+            unwrapped[group] = self.unwrapper(epc, channel_values[channel_codes[group[0]]].item()).unwrap(phases[group])
+        return unwrapped
+
+    def add(self, epc, timestamp, channel, phase):
+        """
+        Feed one read (phase in degrees).
+
+        :return: The updated phase difference in degrees, or None while the window is empty.
+        """
+        if epc == self.epc1:
+            unwrapped = self.unwrap(epc, channel, phase)
+            if channel != self.pending_channel:
+                self.flush_pending()
+                self.pending_channel = channel
+            self.pending.append((timestamp, unwrapped))
+        elif epc == self.epc2:
+            unwrapped = self.unwrap(epc, channel, phase)
+            if channel == self.pending_channel:
+                self.resolve_pending(timestamp, unwrapped)
+            self.last_ref[channel] = (timestamp, unwrapped)
+        else:
+            return self.value
+
+        if self.latest is None or timestamp > self.latest:
+            self.latest = timestamp
+        self.evict()
+        return self.value
+
+    def extend(self, epcs, timestamps, channels, phases):
+        """
+        Batch version of `add` for reads in read order (arrays of equal length, phases in
+        degrees). Ends in the same state as adding the reads one by one.
+
+        A tag-1 read is resolved by the first tag-2 read on its channel before tag 1 hops
+        to another channel (interpolated, as in `resolve_pending`), or else by that hop
+        (held at the last tag-2 read of the channel, as in `flush_pending`). Both are found
+        with array searches per channel instead of stepping through the reads.
+
+        :param epcs: EPC of every read; reads of other EPCs are ignored.
+        :return: The updated phase difference in degrees, or None while the window is empty.
+        """
+        epcs = np.asarray(epcs)
+        if len(epcs) < self.MIN_BATCH:
+            for epc, timestamp, channel, phase in zip(epcs.tolist(), np.asarray(timestamps).tolist(),
+                                                      np.asarray(channels).tolist(), np.asarray(phases).tolist()):
+                self.add(epc, timestamp, channel, phase)
+            return self.value
+        is_ref = epcs == self.epc2
+        keep = is_ref | (epcs == self.epc1)
+        if not keep.any():
+            return self.value
+        is_ref = is_ref[keep]
+        timestamps = np.asarray(timestamps, dtype=np.int64)[keep]
+        channels = np.asarray(channels)[keep]
+        unwrapped = self.unwrap_batch(is_ref, channels, np.asarray(phases, dtype=float)[keep])
+        n = len(timestamps)
+
+        # Tag-1 reads: those still waiting from earlier batches (at position -1), then the new ones
+        new = np.flatnonzero(~is_ref)
+        carried = len(self.pending)
+        t1, u1, c1, p1 = timestamps[new], unwrapped[new], channels[new], new
+        if carried:
+            t1 = np.concatenate((np.array([t for t, _ in self.pending], dtype=np.int64), t1))
+            u1 = np.concatenate((np.array([u for _, u in self.pending], dtype=float), u1))
+            c1 = np.concatenate((np.full(carried, self.pending_channel, dtype=channels.dtype), c1))
+            p1 = np.concatenate((np.full(carried, -1), p1))
+
+        # Position of the tag-1 read on another channel that flushes each read (n: none yet)
+        hop = np.zeros(len(c1), dtype=np.intp)
+        hop[1:] = c1[1:] != c1[:-1]
+        flush_at = np.append(p1[hop.astype(bool)], n)[np.cumsum(hop)]
+
+        resolved_at = np.full(len(c1), -1)   # position of the read that resolves each tag-1 read
+        dropped = np.zeros(len(c1), dtype=bool)
+        ref_phase = np.zeros(len(c1))
+        ref = np.flatnonzero(is_ref)
+        for channel in np.unique(c1).tolist():
+            k = np.flatnonzero(c1 == channel)
+            p2 = ref[channels[ref] == channel]
+            # Tag-2 reads of the channel, after the one before this batch (if any) and a dummy for "none"
+            last = self.last_ref.get(channel)
+            base = 0 if last is None else 1
+            ref_t = np.concatenate(([last[0]] if last else [], timestamps[p2], [0])).astype(np.int64)
+            ref_u = np.concatenate(([last[1]] if last else [], unwrapped[p2], [0.0]))
+
+            idx = np.searchsorted(p2, p1[k], side="right")   # first tag-2 read after each tag-1 read
+            prev = idx - 1 + base                              # the one before it, -1 (the dummy) for none
+            next_pos = np.append(p2, n)[idx]
+            has_next = next_pos < flush_at[k]
+            no_prev = prev < 0
+            prev_t, prev_u = ref_t[prev], ref_u[prev]
+            next_t, next_u = ref_t[np.minimum(idx + base, len(ref_t) - 1)], ref_u[np.minimum(idx + base, len(ref_u) - 1)]
+
+            t = t1[k]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                interpolated = prev_u + (next_u - prev_u) * (t - prev_t) / (next_t - prev_t)
+            resolved = np.where(no_prev | (t >= next_t) | (next_t == prev_t), next_u, np.where(t <= prev_t, prev_u, interpolated))
+            flushed = ~has_next & (flush_at[k] < n)
+
+            resolved_at[k] = np.where(has_next, next_pos, np.where(flushed, flush_at[k], -1))
+            ref_phase[k] = np.where(has_next, resolved, prev_u)
+            dropped[k] = flushed & no_prev
+
+        # Differences in the order `add` would push them: by resolving read, then read order
+        pushed = np.flatnonzero((resolved_at >= 0) & ~dropped)
+        pushed = pushed[np.lexsort((pushed, resolved_at[pushed]))]
+        diffs = (u1[pushed] - ref_phase[pushed] + 180.0) % 360.0 - 180.0
+        self.diffs.extend(zip(t1[pushed].tolist(), diffs.tolist()))
+        self.total += float(diffs.sum())
+
+        waiting = resolved_at < 0
+        self.pending = deque(zip(t1[waiting].tolist(), u1[waiting].tolist()))
+        if len(c1):
+            self.pending_channel = c1[-1].item()
+        # The last tag-2 read of every channel (later reads overwrite earlier ones)
+        self.last_ref.update(zip(channels[ref].tolist(), zip(timestamps[ref].tolist(), unwrapped[ref].tolist())))
+
+        newest = int(timestamps.max())
+        if self.latest is None or newest > self.latest:
+            self.latest = newest
+        self.evict()
+        return self.value
+
+    def resolve_pending(self, timestamp, unwrapped):
+        """Interpolate the waiting tag-1 reads between the previous and the new tag-2 read."""
+        prev = self.last_ref.get(self.pending_channel)
+        while self.pending:
+            t1, ph1 = self.pending.popleft()
+            if prev is None or t1 >= timestamp or timestamp == prev[0]:
+                ph2 = unwrapped
+            elif t1 <= prev[0]:
+                ph2 = prev[1]
+            else:
+                ph2 = prev[1] + (unwrapped - prev[1]) * (t1 - prev[0]) / (timestamp - prev[0])
+            self.push(t1, ph1 - ph2)
+
+    def flush_pending(self):
+        """Resolve waiting tag-1 reads against the last tag-2 read when the reader hops away."""
+        prev = self.last_ref.get(self.pending_channel)
+        while self.pending:
+            t1, ph1 = self.pending.popleft()
+            if prev is not None:
+                self.push(t1, ph1 - prev[1])
+
+    def push(self, timestamp, diff):
+        diff = (diff + 180.0) % 360.0 - 180.0
+        self.diffs.append((timestamp, diff))
+        self.total += diff
+
+    def evict(self):
+        """Drop differences that left the window and refresh the output value."""
+        horizon = self.latest - self.window
+        while self.diffs and self.diffs[0][0] < horizon:
+            self.total -= self.diffs.popleft()[1]
+
+        if self.diffs:
+            phi_norm = (self.total / len(self.diffs)) % 180
+            self.value = min(phi_norm, 180 - phi_norm)
+        else:
+            self.total = 0.0
+            self.value = None
+
+    def clear(self):
+        self.unwrappers.clear()
+        self.last_ref.clear()
+        self.pending.clear()
+        self.pending_channel = None
+        self.diffs.clear()
+        self.total = 0.0
+        self.latest = None
+        self.value = None
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import numpy as np
+from time import perf_counter
+from RollingWindow import RollingWindow
+
+class PlotPanel:
+    """
+    One live panel of RealTimePlotApp: the phase difference of a sensor and, optionally,
+    its RSSI difference on a twin Y-axis, each over the last `window` published samples.
+
+    The lines and the annotation are animated artists. The panel caches the background
+    of its own axes after every full redraw, so it can be blitted on its own. It renders
+    at most `fps` frames per second and not at all while it is hidden, but it keeps taking
+    in samples either way.
+    """
+    RSSI_RANGE = 10  # initial RSSI difference range (dB) either side of 0, grown as needed
+
+    def __init__(self, ax, phase_column, y_range, window, fps, rssi_column=None, annotate=True, relative_x=False):
+        """
+        :param phase_column: Column of the published samples holding the phase difference.
+        :param rssi_column: Column holding the RSSI difference, None for a phase-only panel.
+        :param annotate: Write the current phase difference above the line (text is by far
+                         the most expensive artist to blit).
+        :param relative_x: Number the samples from the newest one (0) backwards, so the X-axis
+                           never moves, instead of paging through the sample count.
+        """
+        self.ax = ax
+        self.window = window
+        self.relative_x = relative_x
+        self.frame_interval = 1.0 / fps
+        self.next_frame = 0.0
+        self.visible = True
+        self.dirty = False
+        self.background = None
+
+        ax.set_ylim(0, y_range)
+        ax.set_xlim(-window, 1) if relative_x else ax.set_xlim(0, window)
+        # Ensure X-axis shows only integers
+        ax.get_xaxis().get_major_locator().set_params(integer=True)
+        self.axes = [ax]
+        self.columns = [phase_column]
+        self.y_ranges = [y_range]
+        self.lines = [ax.plot([], [], 'r-', animated=True)[0]]
+        if rssi_column is not None:
+            rssi_ax = ax.twinx()
+            rssi_ax.set_ylabel("RSSI Difference (dB)", color='blue')
+            # Signed (tag 1 - tag 2, as in rfid_analysis), so the axis is centred on 0
+            rssi_ax.set_ylim(-self.RSSI_RANGE, self.RSSI_RANGE)
+            self.axes.append(rssi_ax)
+            self.columns.append(rssi_column)
+            self.y_ranges.append(self.RSSI_RANGE)
+            self.lines.append(rssi_ax.plot([], [], 'b-', animated=True)[0])
+        self.histories = [RollingWindow(window) for _ in self.columns]
+
+        # Text annotation above the current phase value
+        self.annotation = ax.text(0, 0, "", ha='center', va='bottom', color='black', clip_on=True,
+                                  animated=True) if annotate else None
+
+    @property
+    def phase(self):
+        """Rolling window of the phase difference."""
+        return self.histories[0]
+
+    def extend(self, samples):
+        """Take in an (n, columns) array of published samples."""
+        for column, history in zip(self.columns, self.histories):
+            history.extend(samples[:, column])
+        self.dirty = True
+
+    def due(self, now=None):
+        """Whether the panel is shown, has new samples and its next frame is due."""
+        now = perf_counter() if now is None else now
+        return self.visible and self.dirty and now >= self.next_frame
+
+    def update(self, now=None):
+        """
+        Move the artists to the newest samples.
+
+        :return: Whether the axes limits changed (the background has to be redrawn).
+        """
+        now = perf_counter() if now is None else now
+        self.next_frame = max(self.next_frame + self.frame_interval, now)
+        self.dirty = False
+
+        changed = False
+        for ax, line, history, y_range in zip(self.axes, self.lines, self.histories, self.y_ranges):
+            values = history.view()
+            x_offset = history.total if self.relative_x else 0
+            line.set_data(history.indices() - x_offset, values)
+            if np.isfinite(values).any():
+                changed |= self.update_limits(ax, history.total - x_offset, np.nanmin(values), np.nanmax(values), y_range)
+
+        x_last, y_last = 0 if self.relative_x else self.phase.total, self.phase.latest()
+        if self.annotation is not None and np.isfinite(y_last):
+            self.annotation.set_position((x_last, y_last + self.y_ranges[0] * 0.05))
+            self.annotation.set_text(f"\u03C6: {y_last:.2f}")
+        return changed
+
+    def summary(self):
+        """Rolling mean and std of every line, as text."""
+        return "  ".join(
+            f"{name}: {history.mean():.2f} \u00B1 {history.std():.2f}" if history.valid else f"{name}: N/A"
+            for name, history in zip(("\u03C6", "\u0394RSSI"), self.histories)
+        )
+
+    def update_limits(self, ax, x_last, y_min, y_max, y_range):
+        """
+        Move the axes only when the data leaves them: the X-axis pages forward by half a
+        window at a time and the Y-axis grows past the sensor range (either way) if needed.
+        """
+        changed = False
+        x_min, x_max = ax.get_xlim()
+        if x_last > x_max:
+            x_max = x_last + self.window // 2
+            ax.set_xlim(max(0, x_max - self.window), max(self.window, x_max))
+            changed = True
+        # Leave headroom for the annotation, and grow by half a range at once so that a
+        # slowly rising value does not force a redraw on every frame
+        y_low, y_high = ax.get_ylim()
+        if y_max + y_range * 0.1 > y_high or y_min < y_low:
+            ax.set_ylim(min(y_low, y_min - y_range * 0.5), max(y_high, y_max + y_range * 0.5))
+            changed = True
+        return changed
+
+    def draw_artists(self):
+        for ax, line in zip(self.axes, self.lines):
+            ax.draw_artist(line)
+        if self.annotation is not None:
+            self.ax.draw_artist(self.annotation)
+
+    def capture(self, canvas):
+        """After a full redraw: cache the background of the panel and draw its artists over it."""
+        self.background = canvas.copy_from_bbox(self.ax.bbox)
+        self.draw_artists()
+
+    def restore(self, canvas):
+        """Draw the artists over the cached background (the caller blits the panel's bbox)."""
+        canvas.restore_region(self.background)
+        self.draw_artists()
@@ -3,123 +3,210 @@ from tkinter import ttk
 import numpy as np
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 from matplotlib.figure import Figure
+from matplotlib.transforms import Bbox
 
+import os
+from collections import deque
 from traceback import format_exc
-from time import time,sleep
+from time import time,sleep,perf_counter
 
-from lib.params import SENSOR_CONFIGS,SENSOR_DEF
+from LatencyTracer import LatencyTracer,SAMPLE_FIELDS
+from PlotPanel import PlotPanel
+from lib.params import SENSOR_CONFIGS,SENSOR_DEF,DATA,GUI_FPS,GUI_WINDOW,GUI_DASHBOARD
+from lib.common_functions import get_date_string
 
 class RealTimePlotApp:
-    def __init__(self, result_queue, stop_event):
+    def __init__(self, result_queue, stop_event, series=None, fps=GUI_FPS, window=GUI_WINDOW, dashboard=GUI_DASHBOARD):
         self.result_queue = result_queue
         self.stop_event = stop_event
+        # Shared-memory series of published samples; result_queue is only used without it
+        self.series = series
+        self.series_cursor = 0
+        # Results the publisher folded into summaries instead of sending
+        self.coalesced = 0
+        # Stage latencies of every displayed sample, reported when the window closes
+        self.tracer = LatencyTracer()
+        # (samples, dequeue time) fetched but not on screen yet, traced at the frame that draws them;
+        # bounded so a long minimized stretch only keeps the last 10 s of frames
+        self.undrawn = deque(maxlen=int(10 * fps))
 
         self.root = tk.Tk()
         self.root.title("Real-Time Phase Difference Plot")
         
         # Set the window size to be larger
-        self.root.geometry("800x600")
+        self.root.geometry("1200x900" if dashboard else "800x600")
         self.start_time = time()
 
-        self.fig = Figure(figsize=(6, 4), dpi=100)
-        self.ax = self.fig.add_subplot(111)
-        self.ax.set_title("Diff-Z-Tag Sensing")
-        self.ax.set_xlabel("Tag Reads")
-        self.ax.set_ylabel("Phase Difference (degrees)")
+        self.window = window
+        self.frame_interval_ms = 1_000 / fps
+        self.dashboard = dashboard
+        if dashboard:
+            self.fig, self.panels = self.create_dashboard(fps)
+        else:
+            self.fig = Figure(figsize=(6, 4), dpi=100)
+            ax = self.fig.add_subplot(111)
+            ax.set_title("Diff-Z-Tag Sensing")
+            ax.set_xlabel("Tag Reads")
+            ax.set_ylabel("Phase Difference (degrees)")
+            # The Y-axis starts at the fixed range of the sensor
+            self.panels = [PlotPanel(ax, 0, SENSOR_CONFIGS[SENSOR_DEF]['y_range'], window, fps)]
 
-        self.y_axis_max = SENSOR_CONFIGS[SENSOR_DEF]['y_range']
-        # Set the fixed range for the Y-axis
-        self.ax.set_ylim(0, self.y_axis_max)
-
-        # Ensure X-axis shows only integers
-        self.ax.get_xaxis().get_major_locator().set_params(integer=True)
-        
         self.canvas = FigureCanvasTkAgg(self.fig, master=self.root)
         self.canvas.get_tk_widget().pack(side=tk.TOP, fill=tk.BOTH, expand=True)
-        self.line, = self.ax.plot([], [], 'r-')
-        
-        self.x_data = []
-        self.y_data = []
-        self.text_annotation = None  # To store the text annotation object
+        # Full redraws (first frame, resize, new limits) recapture the panel backgrounds
+        self.canvas.mpl_connect("draw_event", self.on_draw)
+        self.drawn = False
 
         self.stop_button = ttk.Button(self.root, text="Stop", command=self.stop)
         self.stop_button.pack(side=tk.BOTTOM)
 
-        # Label to display the average of current Y values
+        if dashboard:
+            # One toggle per panel, labelled with its rolling stats (Tk labels are much cheaper
+            # to update than blitted text); hidden panels keep their data but are not rendered
+            toggles = ttk.Frame(self.root)
+            toggles.pack(side=tk.BOTTOM)
+            self.panel_toggles = []
+            for i, panel in enumerate(self.panels):
+                shown = tk.BooleanVar(value=True)
+                toggle = ttk.Checkbutton(toggles, variable=shown,
+                                         command=lambda panel=panel, shown=shown: self.set_panel_visible(panel, shown.get()))
+                toggle.grid(row=i // 2, column=i % 2, sticky=tk.W)
+                self.panel_toggles.append((shown, toggle))
+
+        # Label to display the average of current Y values (the dashboard panels show their own)
         self.avg_label = ttk.Label(self.root, text="\u03C6: N/A")
-        self.avg_label.pack(side=tk.BOTTOM)
+        if not dashboard:
+            self.avg_label.pack(side=tk.BOTTOM)
 
         # Bind the window close event to ensure graceful shutdown
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
 
         self.update_plot()
 
+    def create_dashboard(self, fps):
+        """
+        One panel per configured sensor, two to a row, with its phase difference and RSSI
+        difference (the columns ResultPublisher.publish_sensors adds after SAMPLE_FIELDS).
+        The X-axes count back from the newest sample so they never have to be redrawn.
+        """
+        columns = 2 if len(SENSOR_CONFIGS) > 1 else 1
+        rows = -(-len(SENSOR_CONFIGS) // columns)
+        fig = Figure(figsize=(6 * columns, 2.5 * rows), dpi=100, layout="constrained")
+        panels = []
+        for i, (name, cfg) in enumerate(SENSOR_CONFIGS.items()):
+            ax = fig.add_subplot(rows, columns, i + 1)
+            ax.set_title(name)
+            ax.set_ylabel("Phase Difference (degrees)", color='red')
+            column = len(SAMPLE_FIELDS) + 2 * i
+            panels.append(PlotPanel(ax, column, cfg['y_range'], self.window, fps, rssi_column=column + 1, annotate=False,
+                                    relative_x=True))
+        for panel in panels[-columns:]:
+            panel.ax.set_xlabel("Samples (0 = newest)")
+        return fig, panels
+
+    def fetch_results(self):
+        """All (phase difference, t_start, ...) samples published since the last frame."""
+        if self.series is not None:
+            data_batch, self.series_cursor = self.series.read_since(self.series_cursor)
+            return data_batch
+        data_batch = []
+        while not self.result_queue.empty():
+            samples, summary = self.result_queue.get()
+            data_batch.extend(samples)
+            # The publisher coalesced results while this process was behind: only the newest got here
+            if summary is not None:
+                self.coalesced += summary["count"] - len(samples)
+        return data_batch
+
     def update_plot(self):
+        """
+        One frame: take every result published since the previous frame, blit the panels
+        that are due, and schedule the next frame so that frames start 1 / fps apart.
+        """
+        if self.stop_event.is_set():
+            return
+        frame_start = perf_counter()
         try:
-            if not self.stop_event.is_set():
-                try:
-                    if not self.result_queue.empty():
-                        try:
-                            data_batch = self.result_queue.get()
-                            # Latency test for single data push
-                            # avg_phase_diff = data_batch[0]
-                            # t_start = data_batch[1]
-                            # t_stop  = time()*1_000
-                            # lag = t_stop - t_start
-                            # print(f"lag: {lag}")
-                            # self.x_data.append(len(self.x_data) + 1)
-                            # self.y_data.append(avg_phase_diff)
-
-                            # Process each batch of data
-                            for phase_diff in data_batch:
-                                self.x_data.append(len(self.x_data) + 1)
-                                self.y_data.append(phase_diff[0])
-                                t_start = phase_diff[1]
-                                t_stop  = time()*1_000
-                                lag = t_stop - t_start
-                                print("lag, pd: ", lag, phase_diff[0])
-                            # Limit the X-axis to the last 20 data points
-                            self.line.set_xdata(self.x_data[-20:])
-                            self.line.set_ydata(self.y_data[-20:])
-
-                            # Set the X-axis range to always show 20 data points
-                            self.ax.set_xlim(max(0, len(self.x_data) - 20), max(20, len(self.x_data)))
-
-                            # Update the average label with the Greek letter Phi (Φ)
-                            current_avg = np.mean(self.y_data[-20:])
-                            self.avg_label.config(text=f"\u03C6_avg: {current_avg:.2f}")
-
-                            # Remove the previous annotation if it exists
-                            if self.text_annotation:
-                                self.text_annotation.remove()
-
-                            # Add text annotation above the current phase value
-                            self.text_annotation = self.ax.text(
-                                self.x_data[-1],  # x-coordinate
-                                self.y_data[-1] + (self.y_axis_max * 0.05),  # y-coordinate (slightly above the line)
-                                f"\u03C6: {self.y_data[-1]:.2f}",  # Text to display (the current phase value)
-                                ha='center', va='bottom', color='black'
-                            )
-
-                            self.ax.relim()
-                            self.ax.autoscale_view()
-                            self.canvas.draw()
-                            self.canvas.draw_idle()
-                        except:
-                            pass
-                except:
-                    pass
-                self.root.after(1, self.update_plot)
-        except:
-            pass
+            data_batch = self.fetch_results()
+            if len(data_batch):
+                samples = np.asarray(data_batch, dtype=float)
+                for panel in self.panels:
+                    panel.extend(samples)
+                self.undrawn.append((data_batch, time()*1_000))
+            # Nothing is rendered while the window is minimized
+            if self.root.state() != "iconic" and self.render(frame_start) and self.undrawn:
+                t_draw = time()*1_000
+                for data_batch, t_dequeue in self.undrawn:
+                    self.tracer.record_samples(data_batch, t_dequeue, t_draw)
+                self.undrawn.clear()
+        except Exception:
+            print(format_exc())
+        elapsed_ms = (perf_counter() - frame_start) * 1_000
+        self.root.after(max(1, int(self.frame_interval_ms - elapsed_ms)), self.update_plot)
+
+    def render(self, now):
+        """
+        Update the panels that are due and blit all of them in one pass.
+
+        :return: Whether anything reached the screen (a blit or a full redraw).
+        """
+        panels = [panel for panel in self.panels if panel.due(now)]
+        if not panels:
+            return False
+        # Every panel has to be updated, so no short-circuiting any()
+        limits_changed = [panel.update(now) for panel in panels]
+
+        if self.dashboard:
+            for name, panel, (_, toggle) in zip(SENSOR_CONFIGS, self.panels, self.panel_toggles):
+                if panel in panels:
+                    toggle.config(text=f"{name}  {panel.summary()}")
+        else:
+            # Update the average label with the Greek letter Phi (Φ)
+            phase = self.panels[0].phase
+            self.avg_label.config(text=f"\u03C6_avg: {phase.mean():.2f} \u00B1 {phase.std():.2f}")
+
+        if any(limits_changed) or not self.drawn:
+            # The axes changed: full redraw, on_draw recaptures the backgrounds
+            self.canvas.draw()
+            return True
+        for panel in panels:
+            panel.restore(self.canvas)
+        self.canvas.blit(Bbox.union([panel.ax.bbox for panel in panels]))
+        return True
+
+    def set_panel_visible(self, panel, visible):
+        panel.visible = visible
+        # Catch up on the samples that arrived while it was hidden
+        panel.dirty = True
+
+    def on_draw(self, event):
+        """After every full redraw cache the static background of every panel."""
+        for panel in self.panels:
+            panel.capture(self.canvas)
+        self.drawn = True
 
     def on_closing(self):
         """Handle the window close event to stop processes and exit gracefully."""
         self.stop()
 
+    def dump_latency_report(self):
+        """Write the per-stage latency percentiles to data/latency/latency_<date>.json."""
+        try:
+            latency_dir = os.path.join(DATA, "latency")
+            os.makedirs(latency_dir, exist_ok=True)
+            path = os.path.join(latency_dir, f"latency_{get_date_string()}.json")
+            self.tracer.dump(path)
+            print(f"Latency report: {path}")
+            for stage, summary in self.tracer.report().items():
+                print(f"  {stage}: p50 {summary['p50_ms']} ms, p99 {summary['p99_ms']} ms ({summary['count']} samples)")
+        except Exception:
+            print("Could not write the latency report")
+            print(format_exc())
+
     def stop(self):
         print(f"t_stop:{time()}")
-        print("total", (time() - self.start_time), len(self.y_data))
+        print("total", (time() - self.start_time), self.panels[0].phase.total, "coalesced", self.coalesced)
+        self.dump_latency_report()
         self.stop_event.set()
         self.root.quit()
 
@@ -127,6 +214,6 @@ class RealTimePlotApp:
         self.root.mainloop()
 
     @staticmethod
-    def run_gui(result_queue, stop_event):
-        app = RealTimePlotApp(result_queue, stop_event)
+    def run_gui(result_queue, stop_event, series=None, fps=GUI_FPS, window=GUI_WINDOW, dashboard=GUI_DASHBOARD):
+        app = RealTimePlotApp(result_queue, stop_event, series, fps, window, dashboard)
         app.run()
\ No newline at end of file
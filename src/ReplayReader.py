@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import json
+import numpy as np
+from glob import glob
+from time import time,sleep,perf_counter
+from threading import Thread,Event
+from traceback import format_exc
+from ComputeScheduler import ComputeScheduler
+from ResultPublisher import ResultPublisher
+from lib.params import COMPUTE_RATE, GUI_BATCHING
+
+class ReplayReader():
+    """
+    Stands in for ConnectReader by replaying recorded captures (data/json/raw/*_raw.json).
+
+    The reads of every capture are merged in time order and fed through the same path
+    as live reads (TagData batch ingest, compute scheduler, GUI publisher), keeping the
+    recorded inter-read timing. `speed` scales the pacing: 1 replays in real time, N
+    replays N times faster and None (or 0) replays as fast as possible.
+
+    Captures store relative times in milliseconds; they are replayed as microsecond
+    reader timestamps counted from the wall-clock time at which the replay started.
+    """
+    def __init__(self, captures, tag_data, if_gui=False, data_queue=None, compute_rate=COMPUTE_RATE, batch_size=GUI_BATCHING['size'],
+                 series=None, speed=1.0, max_chunk=4096, loop=False, dashboard=False):
+        """
+        :param captures: Glob pattern or list of raw capture files, replayed one after another.
+        :param speed: Replay speed factor, None or 0 for as fast as possible.
+        :param max_chunk: Most reads ingested at once (bounds the bursts at max speed).
+        :param loop: Start over from the first capture once the last one ends.
+        """
+        self.captures = sorted(glob(captures)) if isinstance(captures, str) else list(captures)
+        if not self.captures:
+            raise ValueError(f"No captures to replay: {captures}")
+        self.tag_data = tag_data
+        self.data_queue = data_queue
+        self.if_gui = if_gui
+        self.speed = speed or None
+        self.max_chunk = max_chunk
+        self.loop = loop
+        self.reads = None
+        self.stop_event = Event()
+        self.stream_thread = None
+        # The dashboard and stream subscribers get the phase and RSSI difference of every sensor, the plot only the primary phase difference
+        self.dashboard = dashboard
+        # Ingest-only sinks (e.g. RingTagSink) have no compute methods
+        self.scheduler = None
+        if if_gui:
+            compute = self.tag_data.calculate_sensor_differences if dashboard else self.tag_data.calculate_avg_phase_difference
+            self.scheduler = ComputeScheduler(compute, compute_rate)
+        # (parse, insert) wall-clock times (ms) of the newest reads, for latency tracing
+        self.stamps = (None, None)
+        self.publisher = ResultPublisher(data_queue, batch_size, series)
+
+        self.num_reads = 0
+        self.replay_time = 0.0
+        self.replayed_span = 0.0
+
+    @staticmethod
+    def load_capture(path):
+        """
+        Merge the per-EPC series of one raw capture into time-ordered typed columns.
+
+        :return: A dictionary of epc, timestamp (relative, us), channel, phase (degrees),
+                 rssi and readCount arrays.
+        """
+        with open(path, "r") as f:
+            raw_data = json.load(f)
+
+        columns = {name: [] for name in ("epc", "timestamp", "channel", "phase", "rssi", "readCount")}
+        for epc, data in raw_data.items():
+            n = len(data["timestamps"])
+            columns["epc"].append(np.full(n, epc))
+            columns["timestamp"].append(np.round(np.asarray(data["timestamps"], dtype=float) * 1_000).astype(np.int64))
+            columns["channel"].append(np.asarray(data["channels"], dtype=float))
+            columns["phase"].append(np.asarray(data["phases"], dtype=float))
+            columns["rssi"].append(np.asarray(data["rssis"], dtype=float))
+            columns["readCount"].append(np.asarray(data.get("readCounts", np.zeros(n)), dtype=np.int64))
+
+        columns = {name: np.concatenate(parts) if parts else np.zeros(0) for name, parts in columns.items()}
+        order = np.argsort(columns["timestamp"], kind="stable")
+        return {name: column[order] for name, column in columns.items()}
+
+    # The connection steps of ConnectReader have nothing to do offline
+    def start_jvm(self):
+        pass
+
+    def connect_reader(self):
+        print(f"Replaying {len(self.captures)} capture(s) at {f'{self.speed}x' if self.speed else 'max'} speed")
+
+    def configure_reader(self):
+        pass
+
+    def setup_listener(self):
+        """Load every capture and lay them end to end on one relative time axis (us)."""
+        parts = []
+        offset = 0
+        for path in self.captures:
+            reads = self.load_capture(path)
+            if len(reads["timestamp"]) == 0:
+                continue
+            reads["timestamp"] = reads["timestamp"] - reads["timestamp"][0] + offset
+            offset = int(reads["timestamp"][-1]) + 1
+            parts.append(reads)
+        if not parts:
+            raise ValueError("The captures hold no reads.")
+        reads = {name: np.concatenate([part[name] for part in parts]) for name in parts[0]}
+
+        # Resolve the EPCs once; reads of untracked EPCs would be dropped by TagData anyway
+        epc_ids = self.tag_data.get_epc_ids(reads["epc"])
+        known = epc_ids >= 0
+        print(f"Loaded {len(known)} reads, {int(known.sum())} of tracked EPCs")
+        self.reads = {name: column[known] for name, column in reads.items()}
+        self.reads["epc_id"] = epc_ids[known]
+
+    def publish_reads(self, count, timestamp, parsed_at=None, inserted_at=None):
+        """Same as ConnectReader.publish_reads."""
+        if not self.if_gui:
+            return
+        self.scheduler.notify(count, timestamp)
+        self.stamps = (parsed_at, inserted_at)
+        self.tick()
+
+    def tick(self):
+        """Same as ConnectReader.tick, also called while waiting for the next recorded read."""
+        if not self.if_gui:
+            return
+        ran, result = self.scheduler.poll()
+        if ran and result is not None:
+            parsed_at, inserted_at = self.stamps
+            trace = {"read": self.scheduler.latest_timestamp / 1_000, "parse": parsed_at, "insert": inserted_at,
+                     "compute": time()*1_000}
+            if self.dashboard:
+                self.publisher.publish_sensors(result, trace)
+            else:
+                self.publisher.publish(result, trace)
+        else:
+            self.publisher.poll()
+
+    def replay(self):
+        timestamps = self.reads["timestamp"]
+        if len(timestamps) == 0:
+            print("Nothing to replay")
+            return
+        span = int(timestamps[-1]) + 1
+        origin = int(time() * 1_000_000)
+        start = perf_counter()
+        self.replay_time = 0.0
+        try:
+            lap = 0
+            while not self.stop_event.is_set():
+                i = 0
+                while i < len(timestamps) and not self.stop_event.is_set():
+                    if self.speed:
+                        # Everything the reader would have reported by now, in one batch
+                        elapsed_us = (perf_counter() - start) * 1_000_000 * self.speed - lap * span
+                        end = min(int(np.searchsorted(timestamps, elapsed_us, side="right")), i + self.max_chunk)
+                        if end == i:
+                            self.tick()
+                            sleep(min((timestamps[i] - elapsed_us) / self.speed / 1_000_000, 0.001))
+                            continue
+                    else:
+                        end = min(i + self.max_chunk, len(timestamps))
+
+                    reader_timestamps = timestamps[i:end] + origin + lap * span
+                    parsed_at = time()*1_000
+                    self.tag_data.add_tag_batch(self.reads["epc_id"][i:end], reader_timestamps, self.reads["channel"][i:end],
+                                                self.reads["phase"][i:end], self.reads["rssi"][i:end],
+                                                self.reads["readCount"][i:end])
+                    self.num_reads += end - i
+                    self.replayed_span = (lap * span + int(timestamps[end - 1])) / 1_000_000
+                    self.publish_reads(end - i, int(reader_timestamps[-1]), parsed_at, time()*1_000)
+                    i = end
+                if not self.loop:
+                    break
+                lap += 1
+            self.replay_time = perf_counter() - start
+            # The reads since the last tick are still computed, and buffered results sent, once the captures end
+            while self.if_gui and (self.scheduler.pending or self.publisher.due()) and not self.stop_event.is_set():
+                self.tick()
+                sleep(0.001)
+        except Exception:
+            print(format_exc())
+        finally:
+            if not self.replay_time:
+                self.replay_time = perf_counter() - start
+            print(f"Replay: {self.get_stats()}")
+            if self.if_gui:
+                print(f"Compute scheduler: {self.scheduler.get_stats()}, publisher: {self.publisher.get_stats()}")
+
+    def begin_reading(self):
+        """Start the replay thread without waiting (see start_reading)."""
+        print("Starting the replay...")
+        self.stop_event.clear()
+        self.stream_thread = Thread(target=self.replay)
+        self.stream_thread.start()
+
+    def start_reading(self, continuous=False, duration=10):
+        """Replay until the captures end; `duration` (s) caps non-continuous replays, Ctrl-C stops continuous ones."""
+        self.begin_reading()
+        try:
+            self.stream_thread.join(None if continuous else duration)
+        except KeyboardInterrupt:
+            print("Keyboard interrupt received. Stopping the replay")
+        self.stop_reading()
+
+    def stop_reading(self):
+        self.stop_event.set()
+        if self.stream_thread is not None:
+            self.stream_thread.join()
+
+    def shutdown(self):
+        pass
+
+    def get_stats(self):
+        """Replay throughput: reads, wall time, reads per second and the achieved speed factor."""
+        return {
+            "reads": self.num_reads,
+            "replay_time_s": self.replay_time,
+            "reads_per_s": self.num_reads / self.replay_time if self.replay_time else 0.0,
+            "replayed_span_s": self.replayed_span,
+            "speed": self.replayed_span / self.replay_time if self.replay_time else 0.0
+        }
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import numpy as np
+from time import time
+from LatencyTracer import SAMPLE_FIELDS
+from lib.params import GUI_BATCHING
+
+class ResultPublisher:
+    """
+    Sends computed phase differences, stamped with the wall-clock time (ms), to the GUI process.
+
+    Every sample also carries the stage timestamps (ms) of the value in the order of
+    LatencyTracer.SAMPLE_FIELDS, NaN for stages the producer does not stamp. Samples
+    published with `publish_sensors` are followed by the phase and RSSI difference of
+    every sensor (the columns of the dashboard and the stream).
+
+    Results are buffered and sent in batches, as soon as `batch_size` samples are buffered
+    or the oldest one is `max_age_ms` old, whichever comes first, so the display latency
+    is bounded at any read rate as long as the producer polls while idle. With a
+    SharedSeries a batch is written into shared memory in one go, where the GUI picks up
+    all new samples on its next frame. Otherwise it goes through the multiprocessing queue
+    as (samples, summary). Only the queue can back up: while `max_pending` batches are
+    still waiting in it the GUI is behind, and results are held back and folded into one
+    batch holding only the newest sample, with the count, mean, min and max of every value
+    it stands for as its summary (None for regular batches). The series never needs this,
+    it overwrites the oldest samples instead.
+    """
+    def __init__(self, data_queue=None, batch_size=GUI_BATCHING['size'], series=None,
+                 max_age_ms=GUI_BATCHING['max_age_ms'], max_pending=GUI_BATCHING['max_pending']):
+        if batch_size <= 0:
+            raise ValueError("`batch_size` must be a positive integer.")
+        self.data_queue = data_queue
+        self.batch_size = batch_size
+        self.series = series
+        self.max_age_ms = max_age_ms
+        self.max_pending = max_pending
+        self.buffer = []
+        self.oldest = None         # time (ms) the oldest buffered sample was published
+        self.coalesced = None      # summary of the values held back while the GUI is behind
+
+        self.batches = 0
+        self.samples = 0
+        self.coalesced_batches = 0
+        self.coalesced_samples = 0
+
+    def publish(self, avg_phase_diff, trace=None, fields=()):
+        """
+        :param trace: Stage timestamps of the value by name ("read", "parse", "insert",
+                      "compute"), in ms.
+        :param fields: Extra values appended to the sample after the stage timestamps.
+        """
+        t_start = time()*1_000
+        trace = trace or {}
+        sample = [avg_phase_diff, t_start] + [trace.get(field, float("nan")) for field in SAMPLE_FIELDS[2:]] + list(fields)
+        if not self.buffer:
+            self.oldest = t_start
+        self.buffer.append(sample)
+        self.poll(t_start)
+
+    def publish_sensors(self, differences, trace=None):
+        """
+        Publish the output of TagData.calculate_sensor_differences: the phase difference
+        of the primary sensor as the value, every (phase, RSSI) difference as fields.
+        """
+        self.publish(float(differences[0, 0]), trace, differences.ravel().tolist())
+
+    def due(self, now=None):
+        """Whether the buffer is full, its oldest sample reached the deadline or coalesced results are held back."""
+        if self.coalesced is not None:
+            return True
+        if not self.buffer:
+            return False
+        now = time()*1_000 if now is None else now
+        return len(self.buffer) >= self.batch_size or now - self.oldest >= self.max_age_ms
+
+    def poll(self, now=None):
+        """
+        Send the buffer if a batch is due. The readers' tick() and the pipeline's compute
+        loop call this on every pass without a new result, so a lone buffered result goes
+        out within `max_age_ms` instead of waiting for the next one.
+        """
+        if self.due(now):
+            self.flush()
+
+    def pending(self):
+        """Batches sent but not yet taken by the GUI (0 where the queue size is unavailable, e.g. macOS)."""
+        try:
+            return self.data_queue.qsize()
+        except NotImplementedError:
+            return 0
+
+    def flush(self):
+        """Send the buffered samples now, or fold them into the coalesced batch if the GUI is behind."""
+        if self.series is not None:
+            if self.buffer:
+                self.series.extend(self.buffer)
+                self.batches += 1
+                self.samples += len(self.buffer)
+                self.buffer, self.oldest = [], None
+            return
+
+        if self.buffer and (self.coalesced is not None or self.pending() >= self.max_pending):
+            self.coalesce(self.buffer)
+            self.buffer, self.oldest = [], None
+
+        if self.coalesced is not None:
+            if self.pending() >= self.max_pending:
+                return
+            summary = self.coalesced
+            samples = [summary.pop("newest")]
+            summary["mean"] = summary.pop("sum") / summary["count"]
+            self.coalesced = None
+            self.coalesced_batches += 1
+            self.coalesced_samples += summary["count"]
+        elif self.buffer:
+            samples, summary = self.buffer, None
+            # The queue pickles in a feeder thread, so hand it a list that is not reused
+            self.buffer, self.oldest = [], None
+        else:
+            return
+        self.data_queue.put((samples, summary))
+        self.batches += 1
+        self.samples += len(samples)
+
+    def coalesce(self, samples):
+        values = np.array([sample[0] for sample in samples], dtype=float)
+        if self.coalesced is None:
+            self.coalesced = {"count": 0, "sum": 0.0, "min": np.inf, "max": -np.inf}
+        self.coalesced["count"] += len(values)
+        self.coalesced["sum"] += float(values.sum())
+        self.coalesced["min"] = min(self.coalesced["min"], float(values.min()))
+        self.coalesced["max"] = max(self.coalesced["max"], float(values.max()))
+        self.coalesced["newest"] = samples[-1]
+
+    def get_stats(self):
+        """Batches and samples sent, and how many results were folded into coalesced batches."""
+        return {
+            "batches": self.batches,
+            "samples": self.samples,
+            "coalesced_batches": self.coalesced_batches,
+            "coalesced_samples": self.coalesced_samples,
+            "buffered": len(self.buffer) + (self.coalesced["count"] if self.coalesced is not None else 0)
+        }
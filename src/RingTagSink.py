@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import numpy as np
+from SegmentWriter import SegmentWriter
+from report_parser import lookup_epc_ids
+
+class RingTagSink:
+    """
+    Ingest-side stand-in for TagData in the split ingest/compute pipeline.
+
+    It takes reads through the same batch calls as TagData (`add_tags`, `add_tag_batch`)
+    but only packs them into records and pushes them into a SharedRing. The compute
+    process pops them and feeds its own TagData, numbered with the same EPC table.
+    """
+    RECORD_DTYPE = SegmentWriter.RECORD_DTYPE
+
+    def __init__(self, ring, epcs):
+        """
+        :param ring: SharedRing of RECORD_DTYPE records.
+        :param epcs: EPC table, as `TagData.list_epcs` of the compute side's sensor config.
+        """
+        if ring.dtype != self.RECORD_DTYPE:
+            raise ValueError("`ring` must hold RingTagSink.RECORD_DTYPE records.")
+        self.ring = ring
+        self.epcs = list(epcs)
+        self.num_reads = 0
+
+    def get_epc_ids(self, epcs):
+        return lookup_epc_ids(self.epcs, epcs)
+
+    def add_tags(self, epcs, timestamps, channels, phases, rssis, readCounts):
+        """Same as `TagData.add_tags`: typed columns with phases in radians, untracked EPCs masked out."""
+        epc_ids = self.get_epc_ids(epcs)
+        known = epc_ids >= 0
+        self.add_tag_batch(epc_ids[known], np.asarray(timestamps)[known], np.asarray(channels)[known],
+                           np.degrees(np.asarray(phases, dtype=float)[known]), np.asarray(rssis)[known],
+                           np.asarray(readCounts)[known])
+
+    def add_tag_batch(self, epc_ids, timestamps, channels, phases, rssis, readCounts):
+        """Same as `TagData.add_tag_batch`, but the reads go to the ring."""
+        records = np.zeros(len(epc_ids), dtype=self.RECORD_DTYPE)
+        for name, column in zip(self.RECORD_DTYPE.names, (epc_ids, timestamps, channels, phases, rssis, readCounts)):
+            records[name] = column
+        self.ring.push(records)
+        self.num_reads += len(records)
+
+    def get_record_count(self):
+        return self.num_reads
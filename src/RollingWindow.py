@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import numpy as np
+
+class RollingWindow:
+    """
+    Fixed-size window over the most recent values of a stream, with O(1) mean and std.
+
+    Values are kept in a ring buffer mirrored at twice the size (as in TagBuffer), so
+    the window is always one contiguous view. A running sum and sum of squares are
+    updated with the values entering and leaving the window, and recomputed from the
+    window each time the ring wraps so floating-point drift cannot build up. NaN values
+    (e.g. a sensor without reads yet) are kept in the window but left out of the stats.
+    """
+    def __init__(self, size):
+        if size <= 0:
+            raise ValueError("`size` must be a positive integer.")
+        self.size = int(size)
+        self.values = np.zeros(2 * self.size, dtype=np.float64)
+        self.head = 0       # next slot to be written, in [0, size)
+        self.count = 0      # values in the window, saturates at size
+        self.total = 0      # values seen since the start
+        self.valid = 0      # finite values in the window
+        self.sum = 0.0
+        self.sum_sq = 0.0
+
+    def __len__(self):
+        return self.count
+
+    def extend(self, values):
+        """Add a batch of values, dropping the oldest ones that fall out of the window."""
+        values = np.asarray(values, dtype=np.float64)
+        n = len(values)
+        if n == 0:
+            return
+        self.total += n
+        if n >= self.size:
+            values = values[-self.size:]
+            self.head = 0
+            self.values[:self.size] = values
+            self.values[self.size:] = values
+            self.count = self.size
+            self.resync()
+            return
+
+        entering = self.finite(values)
+        leaving = self.finite(self.view()[:max(self.count + n - self.size, 0)])
+        self.valid += len(entering) - len(leaving)
+        self.sum += entering.sum() - leaving.sum()
+        self.sum_sq += (entering * entering).sum() - (leaving * leaving).sum()
+
+        slots = (self.head + np.arange(n)) % self.size
+        self.values[slots] = values
+        self.values[slots + self.size] = values
+        wrapped = self.head + n >= self.size
+        self.head = (self.head + n) % self.size
+        self.count = min(self.count + n, self.size)
+        if wrapped:
+            self.resync()
+
+    @staticmethod
+    def finite(values):
+        return values[np.isfinite(values)]
+
+    def resync(self):
+        window = self.finite(self.view())
+        self.valid = len(window)
+        self.sum = float(window.sum())
+        self.sum_sq = float((window * window).sum())
+
+    def view(self):
+        """The values in the window, oldest first (a view, no copy)."""
+        end = self.head + self.size
+        return self.values[end - self.count:end]
+
+    def indices(self):
+        """1-based position of each value of the window in the stream."""
+        return np.arange(self.total - self.count + 1, self.total + 1)
+
+    def latest(self):
+        return self.values[self.head + self.size - 1] if self.count else None
+
+    def mean(self):
+        return self.sum / self.valid if self.valid else None
+
+    def std(self):
+        """Population standard deviation of the window."""
+        if not self.valid:
+            return None
+        mean = self.sum / self.valid
+        return float(np.sqrt(max(self.sum_sq / self.valid - mean * mean, 0.0)))
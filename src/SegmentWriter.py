@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import numpy as np
+from glob import glob
+from queue import Queue, Full
+from threading import Thread
+from traceback import format_exc
+
+class SegmentWriter:
+    """
+    Spills reads to append-only on-disk segments from a background thread.
+
+    Reads are packed into fixed-size blocks of a structured array. Full blocks
+    are handed to a writer thread that appends them to the current segment file,
+    rolling over to a new segment every `segment_records` records. Memory use is
+    bounded by `block_size` x `max_pending_blocks` records, and everything up to
+    the last written block survives a crash.
+
+    Every writer gets a directory of its own: if `path` is already taken (e.g. a
+    capture run twice under the same name), a numbered suffix is added to it.
+
+    Layout of a capture directory:
+        segments.json         EPC table and record dtype
+        segment_00000.bin     raw records, in arrival order
+        ...
+    """
+    RECORD_DTYPE = np.dtype([
+        ("epc", np.uint16),         # index into the EPC table
+        ("timestamp", np.int64),
+        ("channel", np.float32),    # MHz
+        ("phase", np.float32),      # degrees
+        ("rssi", np.float32),
+        ("readCount", np.uint16)
+    ])
+
+    def __init__(self, path, epcs, block_size=4096, segment_records=1_000_000, max_pending_blocks=8, put_timeout=1.0):
+        """
+        :param put_timeout: How often (s) a producer waiting on a full queue checks that the
+                            writer thread is still alive.
+        """
+        self.path = self.create_directory(path)
+        self.epcs = list(epcs)
+        self.block_size = block_size
+        self.segment_records = segment_records
+
+        with open(os.path.join(self.path, "segments.json"), "w") as f:
+            json.dump({"epcs": self.epcs, "dtype": self.RECORD_DTYPE.descr}, f)
+
+        self.block = np.zeros(self.block_size, dtype=self.RECORD_DTYPE)
+        self.fill = 0
+        self.num_records = 0
+
+        # A bounded queue keeps memory flat: a slow disk back-pressures the producer
+        self.blocks = Queue(maxsize=max_pending_blocks)
+        self.put_timeout = put_timeout
+        self.error = None
+        self.segment_index = 0
+        self.segment_fill = 0
+        self.segment_file = None
+        self.writer_thread = Thread(target=self.write_blocks, daemon=True)
+        self.writer_thread.start()
+
+    @staticmethod
+    def create_directory(path):
+        """Create `path`, or `path_1`, `path_2`, ... if it is taken, so no capture is ever appended to another."""
+        candidate, suffix = path, 0
+        while True:
+            try:
+                os.makedirs(candidate)
+                if candidate != path:
+                    print(f"{path} already exists, spilling to {candidate}")
+                return candidate
+            except FileExistsError:
+                suffix += 1
+                candidate = f"{path}_{suffix}"
+
+    def append(self, epc_id, timestamp, channel, phase, rssi, readCount):
+        """Add one read, handing the block to the writer thread once it is full."""
+        self.block[self.fill] = (epc_id, timestamp, channel, phase, rssi, readCount)
+        self.fill += 1
+        self.num_records += 1
+        if self.fill == self.block_size:
+            self.flush()
+
+    def extend(self, epc_ids, timestamps, channels, phases, rssis, readCounts):
+        """Add a batch of reads (column arrays of equal length)."""
+        n = len(epc_ids)
+        start = 0
+        while start < n:
+            count = min(self.block_size - self.fill, n - start)
+            block = self.block[self.fill:self.fill + count]
+            for name, column in zip(self.RECORD_DTYPE.names, (epc_ids, timestamps, channels, phases, rssis, readCounts)):
+                block[name] = column[start:start + count]
+            self.fill += count
+            self.num_records += count
+            start += count
+            if self.fill == self.block_size:
+                self.flush()
+
+    def flush(self):
+        """Hand the current (possibly partial) block to the writer thread."""
+        if self.fill == 0:
+            return
+        self.hand_off(self.block[:self.fill])
+        self.block = np.zeros(self.block_size, dtype=self.RECORD_DTYPE)
+        self.fill = 0
+
+    def hand_off(self, item):
+        """
+        Queue `item` for the writer thread, waiting while the queue is full.
+
+        :raises RuntimeError: If the writer thread has stopped (the queue would never drain).
+        """
+        while True:
+            if not self.writer_thread.is_alive():
+                raise RuntimeError(f"Segment writer stopped, {self.path} is incomplete") from self.error
+            try:
+                self.blocks.put(item, timeout=self.put_timeout)
+                return
+            except Full:
+                continue
+
+    def segment_path(self, index):
+        return os.path.join(self.path, f"segment_{index:05d}.bin")
+
+    def write_blocks(self):
+        try:
+            while True:
+                block = self.blocks.get()
+                if block is None:
+                    break
+                while len(block):
+                    if self.segment_file is None:
+                        self.segment_file = open(self.segment_path(self.segment_index), "wb")
+                    room = self.segment_records - self.segment_fill
+                    chunk, block = block[:room], block[room:]
+                    self.segment_file.write(chunk.tobytes())
+                    self.segment_fill += len(chunk)
+                    if self.segment_fill >= self.segment_records:
+                        self.segment_file.close()
+                        self.segment_file = None
+                        self.segment_index += 1
+                        self.segment_fill = 0
+                if self.segment_file is not None:
+                    self.segment_file.flush()
+        except Exception as e:
+            self.error = e
+            print("Segment writer failed")
+            print(format_exc())
+        finally:
+            if self.segment_file is not None:
+                self.segment_file.close()
+                self.segment_file = None
+
+    def finalize(self):
+        """Flush the last block and wait for the writer thread to finish."""
+        if not self.writer_thread.is_alive():
+            return
+        self.flush()
+        self.hand_off(None)
+        self.writer_thread.join()
+
+    @classmethod
+    def load(cls, path):
+        """
+        Read back a capture directory.
+
+        :return: (epcs, records) with records as one structured array in arrival order.
+                 A record truncated by a crash at the end of a segment is dropped.
+        """
+        with open(os.path.join(path, "segments.json"), "r") as f:
+            header = json.load(f)
+        dtype = np.dtype([tuple(field) for field in header["dtype"]])
+
+        parts = []
+        for segment in sorted(glob(os.path.join(path, "segment_*.bin"))):
+            raw = np.fromfile(segment, dtype=np.uint8)
+            usable = len(raw) - len(raw) % dtype.itemsize
+            parts.append(raw[:usable].view(dtype))
+        records = np.concatenate(parts) if parts else np.zeros(0, dtype=dtype)
+        return header["epcs"], records
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from ChannelIndex import ChannelIndex
+from PhaseEstimator import PhaseEstimator
+from lib.params import read_rate
+
+class SensorPair:
+    """Live phase-difference state of one configured sensor (a pair of EPCs) tracked by TagData."""
+    def __init__(self, name, sensor_cfg, is_dtw):
+        self.name = name
+        self.epcs = sensor_cfg['epc']
+        self.window = sensor_cfg['window']
+        self.buffer_size = int(read_rate * self.window)
+        self.is_dtw = is_dtw
+
+        # Live (epc, channel) index over the last `buffer_size` reads of this sensor and
+        # the cached (sum, count) of the phase differences of every common channel
+        self.channel_index = ChannelIndex(self.buffer_size)
+        self.channel_diffs = {}
+
+        # Streaming interpolation estimator, used instead of DTW when is_dtw is off
+        self.phase_estimator = PhaseEstimator(self.epcs, self.window) if len(self.epcs) >= 2 else None
+
+    def add(self, epc, timestamp, channel_id, phase_degrees):
+        """Feed one read of one of this sensor's EPCs."""
+        if self.is_dtw:
+            self.channel_index.add(epc, channel_id, phase_degrees)
+        elif self.phase_estimator is not None:
+            self.phase_estimator.add(epc, timestamp, channel_id, phase_degrees)
+
+    def extend(self, epcs, timestamps, channel_ids, phases):
+        """Batch version of `add`: arrays of this sensor's reads, in read order."""
+        if self.is_dtw:
+            self.channel_index.extend(epcs, channel_ids, phases)
+        elif self.phase_estimator is not None:
+            self.phase_estimator.extend(epcs, timestamps, channel_ids, phases)
+
+    def clear(self):
+        self.channel_index.clear()
+        self.channel_diffs.clear()
+        if self.phase_estimator is not None:
+            self.phase_estimator.clear()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import numpy as np
+from time import time_ns
+from multiprocessing.shared_memory import SharedMemory
+
+class SharedRing:
+    """
+    Single-producer / single-consumer ring of fixed-size records in shared memory.
+
+    The segment starts with a small int64 header followed by `capacity` records of
+    `dtype`. The producer only advances write_count and the consumer only advances
+    read_count, so no lock is needed: records are copied in before write_count is
+    published and copied out before read_count is. When the ring is full, new
+    records are dropped and counted rather than overwriting unread ones.
+
+    The ring can be passed to another process (it pickles by name) and attached there.
+    The creating process owns the segment and unlinks it on `close`.
+    """
+    HEADER = ("write_count", "read_count", "dropped", "write_time_ns", "read_time_ns")
+    HEADER_BYTES = 64
+
+    def __init__(self, dtype, capacity, name=None):
+        """
+        :param dtype: NumPy (structured) dtype of one record.
+        :param capacity: Number of records the ring holds.
+        :param name: Name of an existing ring to attach to; a new one is created when None.
+        """
+        if capacity <= 0:
+            raise ValueError("`capacity` must be a positive integer.")
+        self.dtype = np.dtype(dtype)
+        self.capacity = int(capacity)
+        # With the fork start method children inherit this object as is, so ownership
+        # is tied to the creating process rather than to the object
+        self.owner_pid = os.getpid() if name is None else None
+        size = self.HEADER_BYTES + self.capacity * self.dtype.itemsize
+        self.shm = SharedMemory(name=name, create=name is None, size=size)
+        self.name = self.shm.name
+
+        self.header = np.ndarray(len(self.HEADER), dtype=np.int64, buffer=self.shm.buf)
+        self.records = np.ndarray(self.capacity, dtype=self.dtype, buffer=self.shm.buf, offset=self.HEADER_BYTES)
+        if name is None:
+            self.header[:] = 0
+
+    def __reduce__(self):
+        # Other processes attach to the same segment instead of copying it
+        return (SharedRing, (self.dtype, self.capacity, self.name))
+
+    def counter(self, field):
+        return int(self.header[self.HEADER.index(field)])
+
+    def __len__(self):
+        """Number of records written but not consumed yet."""
+        return self.counter("write_count") - self.counter("read_count")
+
+    def push(self, records):
+        """
+        Producer side: append records (a structured array of `dtype`).
+
+        :return: Number of records written; the rest did not fit and were dropped.
+        """
+        write = self.counter("write_count")
+        free = self.capacity - (write - self.counter("read_count"))
+        count = min(len(records), free)
+        if count < len(records):
+            self.header[self.HEADER.index("dropped")] += len(records) - count
+
+        if count:
+            start = write % self.capacity
+            first = min(count, self.capacity - start)
+            self.records[start:start + first] = records[:first]
+            self.records[:count - first] = records[first:count]
+            self.header[self.HEADER.index("write_time_ns")] = time_ns()
+            self.header[self.HEADER.index("write_count")] = write + count
+        return count
+
+    def pop(self, max_count=None):
+        """Consumer side: copy out (and release) up to `max_count` unread records, oldest first."""
+        read = self.counter("read_count")
+        count = self.counter("write_count") - read
+        if max_count is not None:
+            count = min(count, max_count)
+
+        start = read % self.capacity
+        first = min(count, self.capacity - start)
+        records = np.concatenate((self.records[start:start + first], self.records[:count - first]))
+        if count:
+            self.header[self.HEADER.index("read_time_ns")] = time_ns()
+            self.header[self.HEADER.index("read_count")] = read + count
+        return records
+
+    def get_stats(self):
+        """Counters of both sides; readable from any attached process."""
+        now = time_ns()
+        stats = {field: self.counter(field) for field in ("write_count", "read_count", "dropped")}
+        stats["lag"] = stats["write_count"] - stats["read_count"]
+        stats["fill"] = stats["lag"] / self.capacity
+        for side in ("write", "read"):
+            last = self.counter(f"{side}_time_ns")
+            stats[f"{side}_idle_s"] = (now - last) / 1e9 if last else None
+        return stats
+
+    def close(self):
+        # The NumPy views must go before the mapping can be closed
+        self.header = None
+        self.records = None
+        self.shm.close()
+        if self.owner_pid == os.getpid():
+            self.shm.unlink()
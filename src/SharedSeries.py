@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import numpy as np
+from multiprocessing.shared_memory import SharedMemory
+
+class SharedSeries:
+    """
+    Shared-memory time series of (value, timestamp, ...) float64 rows, one writer and any number of readers.
+
+    The writer reserves the slots it is about to fill, stores the rows and then publishes
+    the new write index, overwriting the oldest samples once the ring is full (it never
+    blocks on a slow GUI).
+    Every reader keeps its own cursor and gets all samples written since in one slice.
+    A reader that fell more than `capacity` samples behind skips to the oldest one still
+    held; samples overwritten while they were being copied are dropped from the result.
+
+    Like SharedRing, it pickles by name so other processes attach to the same segment.
+    """
+    HEADER_BYTES = 64
+
+    def __init__(self, capacity=4096, width=2, name=None):
+        """
+        :param width: Columns per sample: the value, its timestamp and any extra fields
+                      (e.g. the stage timestamps of LatencyTracer.SAMPLE_FIELDS).
+        """
+        if capacity <= 0:
+            raise ValueError("`capacity` must be a positive integer.")
+        self.capacity = int(capacity)
+        self.width = int(width)
+        self.owner_pid = os.getpid() if name is None else None
+        self.shm = SharedMemory(name=name, create=name is None, size=self.HEADER_BYTES + self.capacity * self.width * 8)
+        self.name = self.shm.name
+
+        # Write index (samples published) and reserve index (samples being written)
+        self.index = np.ndarray(2, dtype=np.int64, buffer=self.shm.buf)
+        self.samples = np.ndarray((self.capacity, self.width), dtype=np.float64, buffer=self.shm.buf, offset=self.HEADER_BYTES)
+        if name is None:
+            self.index[:] = 0
+
+    def __reduce__(self):
+        return (SharedSeries, (self.capacity, self.width, self.name))
+
+    def __len__(self):
+        """Number of samples written so far."""
+        return int(self.index[0])
+
+    def append(self, value, timestamp, *fields):
+        """Writer side: add one sample (the write index is published after the data)."""
+        write = int(self.index[0])
+        self.index[1] = write + 1
+        self.samples[write % self.capacity] = (value, timestamp, *fields)
+        self.index[0] = write + 1
+
+    def extend(self, rows):
+        """Writer side: add a batch of samples, published to the readers at once."""
+        rows = np.asarray(rows, dtype=np.float64).reshape(-1, self.width)
+        write = int(self.index[0])
+        end = write + len(rows)
+        self.index[1] = end
+        # Of a batch longer than the ring only the newest `capacity` rows survive
+        rows = rows[-self.capacity:]
+        slots = np.arange(end - len(rows), end) % self.capacity
+        self.samples[slots] = rows
+        self.index[0] = end
+
+    def read_since(self, cursor):
+        """
+        Reader side: every sample written since `cursor`.
+
+        :return: (samples, new cursor), samples as an (n, width) array of (value, timestamp, ...).
+        """
+        write = int(self.index[0])
+        start = max(cursor, write - self.capacity)
+        slots = np.arange(start, write) % self.capacity
+        samples = self.samples[slots]
+
+        # Drop whatever the writer lapped (or may be writing) while the copy was made
+        overwritten = int(self.index[1]) - self.capacity - start
+        if overwritten > 0:
+            samples = samples[overwritten:]
+        return samples, write
+
+    def close(self):
+        self.index = None
+        self.samples = None
+        self.shm.close()
+        if self.owner_pid == os.getpid():
+            self.shm.unlink()
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import json
+import struct
+import asyncio
+import hashlib
+import numpy as np
+from base64 import b64encode
+from collections import deque
+from traceback import format_exc
+from urllib.parse import urlsplit, parse_qs
+from LatencyTracer import SAMPLE_FIELDS
+from lib.params import STREAM, SENSOR_DEF
+
+WS_GUID = b"258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+WS_TEXT, WS_BINARY, WS_CLOSE, WS_PING, WS_PONG = 0x1, 0x2, 0x8, 0x9, 0xA
+
+# Binary frame: enqueue time (ms) and sensor count, then (sensor index, phase, RSSI) per sensor
+FRAME_HEADER = struct.Struct("<dH")
+FRAME_SENSOR = struct.Struct("<Hff")
+
+def ws_frame(payload, opcode):
+    """Encode one unmasked (server to client) WebSocket frame."""
+    length = len(payload)
+    if length < 126:
+        header = struct.pack("!BB", 0x80 | opcode, length)
+    elif length < 1 << 16:
+        header = struct.pack("!BBH", 0x80 | opcode, 126, length)
+    else:
+        header = struct.pack("!BBQ", 0x80 | opcode, 127, length)
+    return header + payload
+
+async def read_ws_frame(reader):
+    """Read one WebSocket frame. :return: (opcode, payload), unmasked."""
+    first, second = await reader.readexactly(2)
+    length = second & 0x7F
+    if length == 126:
+        length, = struct.unpack("!H", await reader.readexactly(2))
+    elif length == 127:
+        length, = struct.unpack("!Q", await reader.readexactly(8))
+    mask = await reader.readexactly(4) if second & 0x80 else None
+    payload = await reader.readexactly(length)
+    if mask:
+        payload = (np.frombuffer(payload, np.uint8) ^ np.resize(np.frombuffer(mask, np.uint8), length)).tobytes()
+    return first & 0x0F, payload
+
+class StreamClient:
+    """
+    One subscriber: its connection, frame format, the sensors it follows and an outbox of
+    at most `max_pending` samples. Offering a sample to a full outbox drops the oldest one,
+    so a slow client always gets the newest values and never holds up the others.
+    """
+    def __init__(self, writer, protocol, binary, sensors, max_pending):
+        self.writer = writer
+        self.protocol = protocol      # "ws" or "sse"
+        self.binary = binary
+        self.sensors = sensors        # indices into StreamServer.sensor_names
+        self.outbox = deque(maxlen=max_pending)
+        self.ready = asyncio.Event()
+        self.sent = 0
+        self.coalesced = 0
+
+    def offer(self, sample):
+        if len(self.outbox) == self.outbox.maxlen:
+            self.coalesced += 1
+        self.outbox.append(sample)
+        self.ready.set()
+
+class StreamServer:
+    """
+    Local asyncio server streaming the live phase and RSSI differences of every sensor.
+
+    It reads the SharedSeries the compute side publishes into (as one more reader next to
+    the GUI) and pushes every new sample to its subscribers:
+      - WebSocket at /ws, as JSON text frames or, with ?format=binary, compact binary
+        frames (FRAME_HEADER followed by one FRAME_SENSOR per sensor),
+      - Server-Sent Events at /events, as JSON.
+    ?sensors=name1,name2 restricts a client to some sensors; WebSocket clients can change
+    it later by sending {"subscribe": [names]}. On connect every client first gets
+    {"sensorNames": [...]}, whose order gives the sensor index of the binary frames.
+
+    Each client is served by its own task that waits for the socket to drain, so a slow
+    client only backs up its own outbox, where stale samples are coalesced away.
+    """
+    def __init__(self, sensor_names, host=STREAM['host'], port=STREAM['port'], max_pending=STREAM['max_pending'],
+                 rate=STREAM['rate']):
+        """
+        :param sensor_names: Sensors of the published samples, in column order.
+        :param max_pending: Samples held per client while it is busy; older ones are dropped.
+        :param rate: How often (Hz) the series is polled for new samples.
+        """
+        self.sensor_names = list(sensor_names)
+        self.sensor_ids = {name: idx for idx, name in enumerate(self.sensor_names)}
+        self.host = host
+        self.port = port
+        self.max_pending = max_pending
+        self.poll_interval = 1.0 / rate
+        self.clients = set()
+        self.samples = 0
+        self.connections = 0
+        # Frames sent to and samples coalesced for the clients that already left
+        self.sent = 0
+        self.coalesced = 0
+
+    def sensor_columns(self, width):
+        """
+        (phase, RSSI) columns of every sensor in the samples of a series `width` wide: the
+        per-sensor columns when present, else the primary phase difference and no RSSI.
+        """
+        if width >= len(SAMPLE_FIELDS) + 2 * len(self.sensor_names):
+            return [(len(SAMPLE_FIELDS) + 2 * i, len(SAMPLE_FIELDS) + 2 * i + 1) for i in range(len(self.sensor_names))]
+        return [(0, None)]
+
+    def select_sensors(self, names):
+        """Indices of the named sensors (every sensor when none are named); unknown names are ignored."""
+        if not names:
+            return list(range(len(self.sensor_names)))
+        return [self.sensor_ids[name] for name in names if name in self.sensor_ids]
+
+    def encode(self, client, sample):
+        """Encode one (time, [(phase, rssi) per sensor]) sample for `client`."""
+        timestamp, values = sample
+        if client.binary:
+            return FRAME_HEADER.pack(timestamp, len(client.sensors)) + b"".join(
+                FRAME_SENSOR.pack(i, *values[i]) for i in client.sensors)
+        return json.dumps({
+            "t": timestamp,
+            "sensors": {
+                self.sensor_names[i]: {key: (value if np.isfinite(value) else None) for key, value in zip(("phase", "rssi"), values[i])}
+                for i in client.sensors
+            }
+        }).encode()
+
+    async def send(self, client, payload, binary=False):
+        if client.protocol == "ws":
+            client.writer.write(ws_frame(payload, WS_BINARY if binary else WS_TEXT))
+        else:
+            client.writer.write(b"data: " + payload + b"\n\n")
+        await client.writer.drain()
+
+    async def send_loop(self, client):
+        await self.send(client, json.dumps({"sensorNames": self.sensor_names}).encode())
+        while True:
+            await client.ready.wait()
+            client.ready.clear()
+            while client.outbox:
+                await self.send(client, self.encode(client, client.outbox.popleft()), client.binary)
+                client.sent += 1
+
+    async def receive_loop(self, client, reader):
+        """Handle the control frames and subscription changes of a WebSocket client."""
+        while True:
+            opcode, payload = await read_ws_frame(reader)
+            if opcode == WS_CLOSE:
+                client.writer.write(ws_frame(payload[:2], WS_CLOSE))
+                await client.writer.drain()
+                return
+            if opcode == WS_PING:
+                client.writer.write(ws_frame(payload, WS_PONG))
+            elif opcode == WS_TEXT:
+                try:
+                    client.sensors = self.select_sensors(json.loads(payload).get("subscribe"))
+                except (ValueError, AttributeError):
+                    print(f"Ignoring stream message: {payload[:100]}")
+
+    async def handle(self, reader, writer):
+        client = None
+        try:
+            request = (await reader.readuntil(b"\r\n\r\n")).decode("latin-1").split("\r\n")
+            method, target, _ = request[0].split(" ", 2)
+            headers = dict((key.strip().lower(), value.strip()) for key, _, value in
+                           (line.partition(":") for line in request[1:] if line))
+            url = urlsplit(target)
+            query = parse_qs(url.query)
+            names = [name for value in query.get("sensors", []) for name in value.split(",") if name]
+            binary = query.get("format", ["json"])[0] == "binary"
+
+            if url.path == "/ws" and headers.get("upgrade", "").lower() == "websocket":
+                accept = b64encode(hashlib.sha1(headers["sec-websocket-key"].encode() + WS_GUID).digest()).decode()
+                writer.write(("HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                              f"Sec-WebSocket-Accept: {accept}\r\n\r\n").encode())
+                client = StreamClient(writer, "ws", binary, self.select_sensors(names), self.max_pending)
+            elif url.path == "/events":
+                writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nCache-Control: no-cache\r\n"
+                             b"Connection: keep-alive\r\nAccess-Control-Allow-Origin: *\r\n\r\n")
+                client = StreamClient(writer, "sse", False, self.select_sensors(names), self.max_pending)
+            else:
+                writer.write(b"HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\n\r\n")
+                await writer.drain()
+                return
+
+            self.clients.add(client)
+            self.connections += 1
+            # An SSE client only ever closes the connection
+            receiving = self.receive_loop(client, reader) if client.protocol == "ws" else reader.read()
+            tasks = [asyncio.ensure_future(self.send_loop(client)), asyncio.ensure_future(receiving)]
+            done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in pending:
+                task.cancel()
+            for task in done:
+                task.result()
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            pass
+        except Exception:
+            print(format_exc())
+        finally:
+            if client in self.clients:
+                self.clients.discard(client)
+                self.sent += client.sent
+                self.coalesced += client.coalesced
+            writer.close()
+
+    def broadcast(self, samples, columns):
+        """Offer every new sample to every client."""
+        for row in samples:
+            values = [(row[phase], row[rssi] if rssi is not None else np.nan) for phase, rssi in columns]
+            sample = (float(row[SAMPLE_FIELDS.index("enqueue")]), values)
+            for client in self.clients:
+                client.offer(sample)
+        self.samples += len(samples)
+
+    async def serve(self, series, stop_event):
+        """Stream the samples published into `series` until `stop_event` is set."""
+        server = await asyncio.start_server(self.handle, self.host, self.port)
+        print(f"Streaming on ws://{self.host}:{self.port}/ws and http://{self.host}:{self.port}/events")
+        columns = self.sensor_columns(series.width)
+        cursor = len(series)
+        try:
+            while not stop_event.is_set():
+                samples, cursor = series.read_since(cursor)
+                if len(samples) and self.clients:
+                    self.broadcast(samples, columns)
+                await asyncio.sleep(self.poll_interval)
+        finally:
+            server.close()
+            for client in list(self.clients):
+                client.writer.close()
+            await server.wait_closed()
+            print(f"Stream server: {self.get_stats()}")
+
+    def get_stats(self):
+        return {
+            "samples": self.samples,
+            "connections": self.connections,
+            "clients": len(self.clients),
+            "sent": self.sent + sum(client.sent for client in self.clients),
+            "coalesced": self.coalesced + sum(client.coalesced for client in self.clients)
+        }
+
+    @staticmethod
+    def run_server(series, stop_event, sensor_names=None, **kwargs):
+        """Process target: serve `series` until `stop_event` is set."""
+        try:
+            sensor_names = sensor_names or [SENSOR_DEF]
+            asyncio.run(StreamServer(sensor_names, **kwargs).serve(series, stop_event))
+        except Exception:
+            print("Stream server failed")
+            print(format_exc())
+        finally:
+            series.close()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import numpy as np
+
+class TagBuffer:
+    """
+    Preallocated columnar ring buffer holding the reads of a single EPC.
+
+    Every column is allocated at twice the capacity and each record is written
+    to slot i and slot i + capacity. The most recent n records are therefore
+    always contiguous, so window queries are plain slices (views, no copy).
+    """
+    COLUMNS = {
+        "seqs": np.int64,           # global insertion order across all EPCs
+        "timestamps": np.int64,     # reader LastSeenTime (microseconds)
+        "phases": np.float32,       # degrees
+        "rssis": np.float32,        # dBm
+        "channels": np.uint16,      # index into TagData.channel_freqs
+        "readCounts": np.uint16
+    }
+
+    def __init__(self, capacity):
+        if capacity <= 0:
+            raise ValueError("`capacity` must be a positive integer.")
+        self.capacity = int(capacity)
+        self.columns = {name: np.zeros(2 * self.capacity, dtype=dtype) for name, dtype in self.COLUMNS.items()}
+        self.head = 0   # next slot to be written, in [0, capacity)
+        self.count = 0  # number of valid records, saturates at capacity
+        self.overwritten = 0  # records lost to wrapping since the last clear
+
+    def __len__(self):
+        return self.count
+
+    def append(self, seq, timestamp, channel, phase, rssi, readCount):
+        """Write a single record, overwriting the oldest one once the buffer is full."""
+        i, j = self.head, self.head + self.capacity
+        if self.count == self.capacity:
+            self.overwritten += 1
+        for name, value in zip(self.COLUMNS, (seq, timestamp, phase, rssi, channel, readCount)):
+            column = self.columns[name]
+            column[i] = value
+            column[j] = value
+        self.head = (self.head + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def extend(self, seqs, timestamps, channels, phases, rssis, readCounts):
+        """Write a batch of records (column arrays of equal length) in one vectorized step."""
+        n = len(seqs)
+        if n == 0:
+            return
+        values = dict(zip(self.COLUMNS, (seqs, timestamps, phases, rssis, channels, readCounts)))
+        self.overwritten += max(0, self.count + n - self.capacity)
+        if n > self.capacity:
+            values = {name: column[-self.capacity:] for name, column in values.items()}
+            self.head = (self.head + n - self.capacity) % self.capacity
+            n = self.capacity
+
+        slots = (self.head + np.arange(n)) % self.capacity
+        for name, column in self.columns.items():
+            column[slots] = values[name]
+            column[slots + self.capacity] = values[name]
+        self.head = (self.head + n) % self.capacity
+        self.count = min(self.count + n, self.capacity)
+
+    def view(self, n=None):
+        """
+        Return the most recent n records (all of them if n is None).
+
+        :return: A dictionary of column name -> NumPy view, oldest record first.
+        """
+        n = self.count if n is None else max(0, min(int(n), self.count))
+        end = self.head + self.capacity
+        return {name: column[end - n:end] for name, column in self.columns.items()}
+
+    def view_since(self, seq):
+        """Return the records whose global sequence number is >= seq as views."""
+        records = self.view()
+        start = int(np.searchsorted(records["seqs"], seq, side="left"))
+        return {name: column[start:] for name, column in records.items()}
+
+    def clear(self):
+        self.head = 0
+        self.count = 0
+        self.overwritten = 0
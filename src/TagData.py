@@ -1,142 +1,422 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import os
 import math
-from collections import defaultdict
-from fastdtw import fastdtw
-from lib.params import read_rate
+import numpy as np
+from dtw_kernel import dtw_align
+from TagBuffer import TagBuffer
+from SensorPair import SensorPair
+from SegmentWriter import SegmentWriter
+from report_parser import lookup_epc_ids
+from lib.params import MAX_TAG_HISTORY, IS_DTW, DTW_BAND
 from lib.common_functions import save_raw_data_to_json,save_raw_data_to_mat
-
-import json
 from lib.params import DATA
 
 class TagData:
-    def __init__(self, sensor_cfg):
-        """Initialize the TagData class with an empty list to store tag records."""
-        simulate = False
-        if simulate:
-            with open(DATA+"/json/data_60.json", "r") as f:
-                self.tag_records = json.load(f)
-        else:
-            self.tag_records = []
+    def __init__(self, sensor_cfg, capacity=MAX_TAG_HISTORY, is_dtw=IS_DTW):
+        """
+        Initialize the TagData class with one preallocated ring buffer per EPC.
+
+        :param sensor_cfg: A single sensor config (as in SENSOR_CONFIGS[SENSOR_DEF]) or a
+                           dictionary of named sensor configs (as SENSOR_CONFIGS) to track
+                           all of them at once. The first sensor is the primary one.
+        """
+        sensor_cfg = self.normalize_sensor_cfg(sensor_cfg)
+
+        self.is_dtw = is_dtw
+        self.sensors = {name: SensorPair(name, cfg, is_dtw) for name, cfg in sensor_cfg.items()}
+        self.primary_sensor = next(iter(self.sensors.values()))
+
+        # Route every read to the sensors its EPC belongs to
+        self.epc_sensors = {}
+        for sensor in self.sensors.values():
+            for epc in sensor.epcs:
+                self.epc_sensors.setdefault(epc, []).append(sensor)
+
+        self.epcs = list(self.epc_sensors)
+        self.epc_ids = {epc: idx for idx, epc in enumerate(self.epcs)}
+        # EPC of every index as an array, and which EPC indices belong to each sensor, for batch routing
+        self.epc_names = np.array(self.epcs, dtype=object)
+        self.sensor_epc_masks = [np.isin(self.epcs, sensor.epcs) for sensor in self.sensors.values()]
+        self.buffer_size = max(sensor.buffer_size for sensor in self.sensors.values())
+        self.buffers = {epc: TagBuffer(capacity) for epc in self.epcs}
+
+        # Channels are stored as uint16 indices into this table of frequencies (MHz)
+        self.channel_freqs = []
+        self.channel_ids = {}
+        self.num_reads = 0
 
-        self.epcs = sensor_cfg['epc']
-        self.buffer_size = int(read_rate * sensor_cfg['window'])
+        # Optional spill-to-disk of every read for captures longer than the ring buffers
+        self.segment_writer = None
+
+    @staticmethod
+    def normalize_sensor_cfg(sensor_cfg):
+        """Wrap a single sensor config into a dictionary of named configs."""
+        if 'epc' in sensor_cfg:
+            return {"default": sensor_cfg}
+        return sensor_cfg
+
+    @staticmethod
+    def list_epcs(sensor_cfg):
+        """EPCs tracked for `sensor_cfg`, in the order TagData numbers them (its `epcs`)."""
+        epcs = {}
+        for cfg in TagData.normalize_sensor_cfg(sensor_cfg).values():
+            epcs.update(dict.fromkeys(cfg['epc']))
+        return list(epcs)
 
     def convert_phase_to_degrees(self, phase):
         """Convert a phase angle from radians to degrees."""
         return math.degrees(float(phase))
 
+    def get_channel_id(self, channel):
+        """Map a channel frequency (MHz) to its index, registering unseen channels."""
+        channel_id = self.channel_ids.get(channel)
+        if channel_id is None:
+            channel_id = len(self.channel_freqs)
+            self.channel_freqs.append(channel)
+            self.channel_ids[channel] = channel_id
+        return channel_id
+
+    def store_tag(self, epc, timestamp, channel, phase_degrees, rssi, readCount):
+        """Append an already converted read to the ring buffer of its EPC."""
+        buffer = self.buffers.get(epc)
+        if buffer is None:
+            return
+        channel_id = self.get_channel_id(float(channel))
+        timestamp, rssi, readCount = int(timestamp), float(rssi), int(readCount)
+        buffer.append(self.num_reads, timestamp, channel_id, phase_degrees, rssi, readCount)
+        for sensor in self.epc_sensors[epc]:
+            sensor.add(epc, timestamp, channel_id, phase_degrees)
+        if self.segment_writer is not None:
+            self.segment_writer.append(self.epc_ids[epc], timestamp, self.channel_freqs[channel_id], phase_degrees, rssi, readCount)
+        self.num_reads += 1
+
     def add_tag(self, epc, timestamp, channel, phase, rssi, readCount):
-        """Add a new tag record to the list after converting the phase."""
+        """Add a new tag record to the ring buffer of its EPC after converting the phase."""
         try:
-            if epc not in self.epcs:
+            if epc not in self.buffers:
                 return
-            phase_degrees = self.convert_phase_to_degrees(phase)
-            tag_record = {
-                "epc": epc,
-                "timestamp": timestamp,
-                "channel": float(channel),  # Keep the channel as the frequency seen
-                "phase": phase_degrees,
-                "rssi": float(rssi),
-                "readCount": int(readCount)
-            }
-
-            self.tag_records.append(tag_record)
+            self.store_tag(epc, timestamp, channel, self.convert_phase_to_degrees(phase), rssi, readCount)
         except Exception as e:
             print(f"Error adding tag: {e}")
 
+    def get_epc_ids(self, epcs):
+        """Vectorized lookup of the index of each EPC in `self.epcs`, -1 for untracked EPCs."""
+        return lookup_epc_ids(self.epcs, epcs)
+
+    def add_tags(self, epcs, timestamps, channels, phases, rssis, readCounts):
+        """
+        Batch version of `add_tag`: typed columns with phases in radians.
+        Reads of untracked EPCs are masked out.
+        """
+        epc_ids = self.get_epc_ids(epcs)
+        known = epc_ids >= 0
+        self.add_tag_batch(epc_ids[known], np.asarray(timestamps)[known], np.asarray(channels)[known],
+                           np.degrees(np.asarray(phases, dtype=float)[known]), np.asarray(rssis)[known],
+                           np.asarray(readCounts)[known])
+
+    def add_tag_batch(self, epc_ids, timestamps, channels, phases, rssis, readCounts):
+        """
+        Add a batch of already converted reads in one call.
+
+        :param epc_ids: Index of each read's EPC in `self.epcs`; reads of other EPCs must
+                        be filtered out beforehand.
+        :param phases: Phases in degrees.
+        """
+        epc_ids = np.asarray(epc_ids, dtype=np.intp)
+        n = len(epc_ids)
+        if n == 0:
+            return
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        channels = np.asarray(channels, dtype=float)
+        phases = np.asarray(phases, dtype=float)
+        rssis = np.asarray(rssis, dtype=float)
+        readCounts = np.asarray(readCounts, dtype=np.int64)
+
+        unique_channels, channel_inverse = np.unique(channels, return_inverse=True)
+        channel_ids = np.array([self.get_channel_id(ch) for ch in unique_channels.tolist()], dtype=np.uint16)[channel_inverse]
+        seqs = self.num_reads + np.arange(n)
+
+        for epc_id in np.unique(epc_ids).tolist():
+            mask = epc_ids == epc_id
+            self.buffers[self.epcs[epc_id]].extend(seqs[mask], timestamps[mask], channel_ids[mask],
+                                                   phases[mask], rssis[mask], readCounts[mask])
+
+        # Each sensor takes its own reads as one batch, still in read order
+        for sensor, epc_mask in zip(self.sensors.values(), self.sensor_epc_masks):
+            mask = epc_mask[epc_ids]
+            if mask.all():
+                sensor.extend(self.epc_names[epc_ids], timestamps, channel_ids, phases)
+            elif mask.any():
+                sensor.extend(self.epc_names[epc_ids[mask]], timestamps[mask], channel_ids[mask], phases[mask])
+
+        if self.segment_writer is not None:
+            self.segment_writer.extend(epc_ids, timestamps, channels, phases, rssis, readCounts)
+        self.num_reads += n
+
+    def start_spill(self, fname):
+        """Spill every subsequent read to on-disk segments under data/segments/<fname>."""
+        self.segment_writer = SegmentWriter(os.path.join(DATA, "segments", fname), self.epcs)
+
+    def get_record_count(self):
+        """Number of reads currently held in memory."""
+        return sum(len(buffer) for buffer in self.buffers.values())
+
+    def get_overwritten_count(self):
+        """Number of reads the ring buffers have overwritten (lost unless spilled to disk)."""
+        return sum(buffer.overwritten for buffer in self.buffers.values())
+
+    def warn_if_truncated(self):
+        """Print a warning when the in-memory capture lost reads that were not spilled to disk."""
+        overwritten = self.get_overwritten_count()
+        if overwritten and self.segment_writer is None:
+            print(f"Warning: the ring buffers overwrote {overwritten} reads (max_tag_history = "
+                  f"{next(iter(self.buffers.values())).capacity} per EPC), only the most recent ones are kept. "
+                  f"Call start_spill before reading to keep the full capture.")
+        return overwritten
+
     def get_all_tags(self):
-        """Retrieve all stored tag records."""
-        return self.tag_records
+        """Retrieve all stored tag records, in the order they were read."""
+        self.warn_if_truncated()
+        records = [(epc, buffer.view()) for epc, buffer in self.buffers.items() if len(buffer)]
+        if not records:
+            return []
+
+        epcs = np.concatenate([np.full(len(view["seqs"]), idx) for idx, (_, view) in enumerate(records)])
+        columns = {name: np.concatenate([view[name] for _, view in records]) for name in TagBuffer.COLUMNS}
+        order = np.argsort(columns["seqs"], kind="stable")
+        channel_freqs = np.asarray(self.channel_freqs)
+
+        return [
+            {
+                "epc": records[e][0],
+                "timestamp": t,
+                "channel": c,
+                "phase": p,
+                "rssi": r,
+                "readCount": n
+            }
+            for e, t, c, p, r, n in zip(
+                epcs[order].tolist(),
+                columns["timestamps"][order].tolist(),
+                channel_freqs[columns["channels"][order]].tolist(),
+                columns["phases"][order].tolist(),
+                columns["rssis"][order].tolist(),
+                columns["readCounts"][order].tolist()
+            )
+        ]
+
+    def get_tag_window(self, epc, window=True):
+        """
+        Column views over the reads of one EPC.
+
+        :param window: Restrict to reads among the last `buffer_size` reads overall.
+        :return: A dictionary of column name -> NumPy view (channels as indices), or None.
+        """
+        buffer = self.buffers.get(epc)
+        if buffer is None or len(buffer) == 0:
+            return None
+        if window:
+            return buffer.view_since(self.num_reads - self.buffer_size)
+        return buffer.view()
 
     def restructure_tag_data(self,window=False):
         """
         Organize and return tag data by EPC.
+
+        When spilling to disk, the full capture (window=False) is merged from the segments.
         
         :return: A dictionary with data grouped by each predefined EPC.
         """
-        epc_data = defaultdict(lambda: {
-            "timestamps": [],
-            "channels": [],
-            "phases": [],
-            "rssis": [],
-            "readCounts": []
-        })
-
-        records_to_process = self.tag_records[-self.buffer_size:] if window else self.tag_records
-
-        for record in records_to_process:
-            if record['epc'] in self.epcs:
-                epc_data[record['epc']]["timestamps"].append(record["timestamp"])
-                epc_data[record['epc']]["channels"].append(record["channel"])
-                epc_data[record['epc']]["phases"].append(record["phase"])
-                epc_data[record['epc']]["rssis"].append(record["rssi"])
-                epc_data[record['epc']]["readCounts"].append(record["readCount"])
-
-        return dict(epc_data)
+        if self.segment_writer is not None and not window:
+            return self.restructure_segment_data()
+
+        epc_data = {}
+        channel_freqs = np.asarray(self.channel_freqs)
+
+        for epc in self.epcs:
+            records = self.get_tag_window(epc, window=window)
+            if records is None or len(records["seqs"]) == 0:
+                continue
+            epc_data[epc] = {
+                "timestamps": records["timestamps"].tolist(),
+                "channels": channel_freqs[records["channels"]].tolist(),
+                "phases": records["phases"].tolist(),
+                "rssis": records["rssis"].tolist(),
+                "readCounts": records["readCounts"].tolist()
+            }
+
+        return epc_data
+
+    def restructure_segment_data(self):
+        """Finalize the on-disk segments and group their records by EPC."""
+        self.segment_writer.finalize()
+        epcs, records = SegmentWriter.load(self.segment_writer.path)
+
+        epc_data = {}
+        for idx, epc in enumerate(epcs):
+            epc_records = records[records["epc"] == idx]
+            if len(epc_records) == 0:
+                continue
+            epc_data[epc] = {
+                "timestamps": epc_records["timestamp"].tolist(),
+                "channels": epc_records["channel"].tolist(),
+                "phases": epc_records["phase"].tolist(),
+                "rssis": epc_records["rssi"].tolist(),
+                "readCounts": epc_records["readCount"].tolist()
+            }
+
+        return epc_data
     
     def dtw_matching(self, sequence1, sequence2):
         """
         Performs dynamic time warping (DTW) matching between two sequences.
         """
-        _, warp_paths = fastdtw(sequence1, sequence2)
+        return dtw_align(sequence1, sequence2, DTW_BAND)
+    
+    @staticmethod
+    def clean_phase_differences(diffs):
+        """Fold absolute phase differences (degrees) into [0, 135], as the offline phase cleaning does."""
+        return np.where(diffs > 270, np.abs(diffs - 360), np.where(diffs > 135, np.abs(diffs - 180), diffs))
 
-        warped_sequence1 = []
-        warped_sequence2 = []
+    def channel_phase_differences(self, pairs):
+        """
+        Sum and count of the DTW-aligned, cleaned phase differences of many channels at once.
 
-        for index in warp_paths:
-            warped_sequence1.append(sequence1[index[0]])
-            warped_sequence2.append(sequence2[index[1]])
+        Only the alignment is done channel by channel; the differences of every channel are
+        then cleaned and summed together.
 
-        return (warped_sequence1, warped_sequence2)
-    
-    def calculate_avg_phase_difference(self, window=True):
-        epc_data = self.restructure_tag_data(window=window)
+        :param pairs: (phases of EPC 1, phases of EPC 2) per channel, both non-empty.
+        :return: (sums, counts) arrays, one entry per pair.
+        """
+        if not pairs:
+            return np.zeros(0), np.zeros(0, dtype=np.int64)
+        warped = [self.dtw_matching(phase_seq1, phase_seq2) for phase_seq1, phase_seq2 in pairs]
+        counts = np.array([len(warped_rf1) for warped_rf1, _ in warped], dtype=np.int64)
+        diffs = np.abs(np.concatenate([warped_rf1 for warped_rf1, _ in warped]) - np.concatenate([warped_rf2 for _, warped_rf2 in warped]))
+        sums = np.add.reduceat(self.clean_phase_differences(diffs), np.r_[0, np.cumsum(counts)[:-1]])
+        return sums, counts
 
-        if len(self.epcs) < 2:
-            return None
-        
-        epc1, epc2 = self.epcs[0], self.epcs[1]
+    def update_channel_diffs(self, sensors):
+        """Recompute the cached phase difference of the channels of `sensors` changed since their last query."""
+        keys, pairs = [], []
+        for sensor in sensors:
+            epc1, epc2 = sensor.epcs[0], sensor.epcs[1]
+            for channel in sensor.channel_index.pop_dirty_channels():
+                phase_seq1 = sensor.channel_index.get_phases(epc1, channel)
+                phase_seq2 = sensor.channel_index.get_phases(epc2, channel)
+                if phase_seq1 and phase_seq2:
+                    keys.append((sensor, channel))
+                    pairs.append((np.fromiter(phase_seq1, float), np.fromiter(phase_seq2, float)))
+                else:
+                    sensor.channel_diffs.pop(channel, None)
 
-        data1 = epc_data.get(epc1)
-        data2 = epc_data.get(epc2)
+        sums, counts = self.channel_phase_differences(pairs)
+        for (sensor, channel), total, count in zip(keys, sums.tolist(), counts.tolist()):
+            sensor.channel_diffs[channel] = (total, count)
 
-        if data1 is None or data2 is None:
-            return None
+    def full_capture_channel_diffs(self, sensors):
+        """(sum, count) of the phase differences of every channel of every sensor over all stored reads."""
+        views = {}
+        keys, pairs = [], []
+        for i, sensor in enumerate(sensors):
+            for epc in sensor.epcs[:2]:
+                if epc not in views:
+                    views[epc] = self.get_tag_window(epc, window=False)
+            data1, data2 = views[sensor.epcs[0]], views[sensor.epcs[1]]
+            if data1 is None or data2 is None:
+                continue
+            # Iterate over all channels (frequencies) present in both EPCs
+            for channel in np.intersect1d(data1['channels'], data2['channels']):
+                keys.append(i)
+                pairs.append((data1['phases'][data1['channels'] == channel].astype(float),
+                              data2['phases'][data2['channels'] == channel].astype(float)))
+        sums, counts = self.channel_phase_differences(pairs)
+        return np.array(keys, dtype=np.intp), sums, counts
 
-        # Iterate over all channels (frequencies) present in both EPCs
-        common_channels = set(data1['channels']) & set(data2['channels'])
+    def sensors_phase_differences(self, sensors, window=True):
+        """
+        Phase difference of each of `sensors` in one batched pass.
 
-        total_diff = 0.0
-        count = 0
+        :return: A list with the average phase difference of each sensor, None where unknown.
+        """
+        sensors = list(sensors)
+        results = [None] * len(sensors)
+        paired = [i for i, sensor in enumerate(sensors) if len(sensor.epcs) >= 2]
+
+        if window and not self.is_dtw:
+            for i in paired:
+                results[i] = sensors[i].phase_estimator.value
+            return results
 
-        for channel in common_channels:
-            # Extract the phase data for the current channel
-            phase_seq1 = [float(data1['phases'][i]) for i, ch in enumerate(data1['channels']) if ch == channel]
-            phase_seq2 = [float(data2['phases'][i]) for i, ch in enumerate(data2['channels']) if ch == channel]
+        if window:
+            # Only the channels touched since the last query are recomputed, for all sensors together
+            self.update_channel_diffs([sensors[i] for i in paired])
+            keys = np.array([i for i in paired for _ in sensors[i].channel_diffs], dtype=np.intp)
+            sums = np.array([total for i in paired for total, _ in sensors[i].channel_diffs.values()], dtype=float)
+            counts = np.array([n for i in paired for _, n in sensors[i].channel_diffs.values()], dtype=np.int64)
+        else:
+            keys, sums, counts = self.full_capture_channel_diffs([sensors[i] for i in paired])
+            keys = np.asarray(paired, dtype=np.intp)[keys]
 
-            warped_rf1, warped_rf2 = self.dtw_matching(phase_seq1, phase_seq2)
+        total_diff = np.bincount(keys, weights=sums, minlength=len(sensors))
+        count = np.bincount(keys, weights=counts, minlength=len(sensors))
+        for i in paired:
+            if count[i] > 0:
+                results[i] = float(total_diff[i] / count[i])
+        return results
 
-            for rf1, rf2 in zip(warped_rf1, warped_rf2):
-                diff = abs(rf1 - rf2)
-                if diff > 270:
-                    diff = abs(diff - 360)
-                elif diff > 135:
-                    diff = abs(diff - 180)
-                total_diff += diff
-                count += 1
+    def calculate_sensor_phase_difference(self, sensor, window=True):
+        """Phase difference of one sensor, None while unknown."""
+        return self.sensors_phase_differences([sensor], window)[0]
 
-        avg_phase_diff = total_diff / count if count > 0 else None
+    def calculate_phase_differences(self, window=True):
+        """Phase difference of every configured sensor, by name, in one batched pass over all pairs."""
+        return dict(zip(self.sensors, self.sensors_phase_differences(self.sensors.values(), window)))
 
-        return avg_phase_diff
+    def calculate_sensor_rssi_difference(self, sensor):
+        """
+        Difference (dB) of the mean RSSI of the sensor's first EPC minus that of its second
+        over their last `buffer_size` reads, signed like the offline RSSI difference.
+        """
+        if len(sensor.epcs) < 2:
+            return None
+        means = []
+        for epc in sensor.epcs[:2]:
+            buffer = self.buffers[epc]
+            if len(buffer) == 0:
+                return None
+            means.append(float(buffer.view(sensor.buffer_size)["rssis"].mean()))
+        return means[0] - means[1]
+
+    def calculate_sensor_differences(self, window=True):
+        """
+        Phase and RSSI difference of every configured sensor, in the order of `sensors`.
+
+        :return: An (n_sensors, 2) array of (phase difference, RSSI difference), NaN where unknown.
+        """
+        differences = np.full((len(self.sensors), 2), np.nan)
+        phase_diffs = self.sensors_phase_differences(self.sensors.values(), window)
+        for i, (sensor, phase_diff) in enumerate(zip(self.sensors.values(), phase_diffs)):
+            rssi_diff = self.calculate_sensor_rssi_difference(sensor)
+            differences[i] = (np.nan if phase_diff is None else phase_diff, np.nan if rssi_diff is None else rssi_diff)
+        return differences
+
+    def calculate_avg_phase_difference(self, window=True):
+        """Phase difference of the primary sensor."""
+        return self.calculate_sensor_phase_difference(self.primary_sensor, window)
 
     def save_data(self,fname):
+        self.warn_if_truncated()
         tag_data = self.restructure_tag_data()
         save_raw_data_to_json(tag_data,fname)
         save_raw_data_to_mat(tag_data,fname)
     
     def clear_data(self):
         """Clear all stored tag data."""
-        self.tag_records.clear()
+        for buffer in self.buffers.values():
+            buffer.clear()
+        for sensor in self.sensors.values():
+            sensor.clear()
 
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Batch analysis of recorded captures: runs the interpolated phase and RSSI moving averages
+of rfid_data_plotter on many *_raw.json files in parallel worker processes, without
+plotting, and writes one summary row per capture and sensor pair.
+
+    python src/batch_analysis.py [captures ...] [--workers N] [--expected 20] [--output summary.csv]
+
+`captures` are files, directories (their *_raw.json files) or glob patterns; by default
+every capture in data/json/raw.
+"""
+
+from sys import path
+import os
+
+# Add the parent directory of the src to sys.path
+path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import csv
+import json
+import argparse
+import numpy as np
+from glob import glob
+from datetime import datetime
+from time import perf_counter
+from traceback import format_exc
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from rfid_analysis import interpolated_moving_average_phase_difference, interpolated_moving_average_rssi_difference
+from lib.params import DATA, SENSOR_CONFIGS, SENSOR_DEF, BATCH_ANALYSIS, read_rate
+
+SUMMARY_FIELDS = (
+    "file", "sensor", "duration_s", "read_rate", "windows",
+    "phase_mean", "phase_std", "phase_median", "phase_rmse",
+    "rssi_mean", "rssi_std", "rssi_median", "file_time_s"
+)
+
+def find_captures(patterns):
+    """Capture files matching the given files, directories or glob patterns, sorted."""
+    files = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            pattern = os.path.join(pattern, "*_raw.json")
+        files.update(glob(pattern))
+    return sorted(files)
+
+def sensor_pairs(data):
+    """
+    (sensor name, EPC pair) of every configured sensor with both tags in the capture;
+    the first two EPCs of the capture when there is none, as rfid_data_plotter does.
+    """
+    pairs = [(name, config['epc']) for name, config in SENSOR_CONFIGS.items()
+             if len(config['epc']) == 2 and all(epc in data for epc in config['epc'])]
+    if not pairs and len(data) >= 2:
+        pairs = [("unconfigured", list(data.keys())[:2])]
+    return pairs
+
+def analyze_pair(data, sensor, epc_list, window_stride_s, expected):
+    """Summary row of one sensor pair of a capture."""
+    window_duration_s = SENSOR_CONFIGS.get(sensor, SENSOR_CONFIGS[SENSOR_DEF])['window']
+    phase_diffs, _, phase_stats = interpolated_moving_average_phase_difference(
+        data, epc_list, window_duration_s, window_stride_s, expected)
+    _, _, rssi_stats = interpolated_moving_average_rssi_difference(data, epc_list, window_duration_s, window_stride_s)
+
+    timestamps = [np.asarray(data[epc]["timestamps"], dtype=float) for epc in epc_list]
+    reads = sum(len(ts) for ts in timestamps)
+    if all(len(ts) for ts in timestamps):
+        duration_s = (max(ts[-1] for ts in timestamps) - min(ts[0] for ts in timestamps)) / 1000.0
+    else:
+        duration_s = 0.0
+
+    return {
+        "sensor": sensor,
+        "duration_s": duration_s,
+        "read_rate": reads / duration_s if duration_s > 0 else np.nan,
+        "windows": len(phase_diffs),
+        "phase_mean": phase_stats["mean"],
+        "phase_std": phase_stats["std"],
+        "phase_median": phase_stats["median"],
+        "phase_rmse": phase_stats.get("rmse", np.nan),
+        "rssi_mean": rssi_stats["mean"],
+        "rssi_std": rssi_stats["std"],
+        "rssi_median": rssi_stats["median"]
+    }
+
+def analyze_capture(capture_path, window_stride_s, expected):
+    """
+    Worker: analyze every sensor pair of one capture.
+
+    :return: (capture path, summary rows, seconds spent, error traceback or None).
+    """
+    start = perf_counter()
+    try:
+        with open(capture_path, 'r') as f:
+            data = json.load(f)
+        rows = [analyze_pair(data, sensor, epc_list, window_stride_s, expected) for sensor, epc_list in sensor_pairs(data)]
+        error = None
+    except Exception:
+        rows, error = [], format_exc()
+    elapsed = perf_counter() - start
+
+    name = os.path.basename(capture_path).replace("_raw.json", "")
+    for row in rows:
+        row["file"] = name
+        row["file_time_s"] = elapsed
+    return capture_path, rows, elapsed, error
+
+def format_value(value):
+    if isinstance(value, (float, np.floating)):
+        return "" if np.isnan(value) else f"{value:.3f}"
+    return str(value)
+
+def write_summary(rows, output_path):
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    with open(output_path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=SUMMARY_FIELDS)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow({field: format_value(row[field]) for field in SUMMARY_FIELDS})
+
+def print_summary(rows):
+    table = [SUMMARY_FIELDS] + [[format_value(row[field]) for field in SUMMARY_FIELDS] for row in rows]
+    widths = [max(len(line[i]) for line in table) for i in range(len(SUMMARY_FIELDS))]
+    for line in table:
+        print("  ".join(cell.rjust(width) for cell, width in zip(line, widths)))
+
+def run_batch(captures, workers=BATCH_ANALYSIS['workers'], window_stride_s=1.0 / read_rate * 10,
+              expected=BATCH_ANALYSIS['expected'], output_path=None):
+    """
+    Analyze `captures` over a pool of `workers` processes (0 for one per CPU) and write the
+    summary table to `output_path`.
+
+    :return: The summary rows, sorted by file and sensor.
+    """
+    # No more processes than captures
+    pool_size = min(workers or os.cpu_count(), len(captures)) or 1
+    rows = []
+    busy = 0.0
+    start = perf_counter()
+    with ProcessPoolExecutor(max_workers=pool_size) as pool:
+        futures = [pool.submit(analyze_capture, capture, window_stride_s, expected) for capture in captures]
+        for future in as_completed(futures):
+            capture_path, capture_rows, elapsed, error = future.result()
+            busy += elapsed
+            if error:
+                print(f"{os.path.basename(capture_path)}: failed after {elapsed:.2f} s\n{error}")
+                continue
+            print(f"{os.path.basename(capture_path)}: {len(capture_rows)} sensor pair(s) in {elapsed:.2f} s")
+            rows.extend(capture_rows)
+    wall = perf_counter() - start
+
+    rows.sort(key=lambda row: (row["file"], row["sensor"]))
+    print_summary(rows)
+    if output_path:
+        write_summary(rows, output_path)
+        print(f"Summary written to {output_path}")
+    print(f"{len(captures)} captures in {wall:.2f} s on {pool_size} workers "
+          f"({busy:.2f} s of analysis, {busy / wall if wall > 0 else 0:.1f}x parallel speedup)")
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Analyze many captures in parallel and summarize them in one table")
+    parser.add_argument("captures", nargs="*", default=[os.path.join(DATA, "json", "raw")],
+                        help="Capture files, directories or glob patterns (default: every capture in data/json/raw)")
+    parser.add_argument("--workers", type=int, default=BATCH_ANALYSIS['workers'], help="Worker processes (0: one per CPU)")
+    parser.add_argument("--expected", type=float, default=BATCH_ANALYSIS['expected'],
+                        help="Expected phase difference (degrees) for the RMSE")
+    parser.add_argument("--stride", type=float, default=1.0 / read_rate * 10, help="Window stride (s)")
+    parser.add_argument("--output", default=None,
+                        help="Summary CSV (default: data/analysis/batch_summary_<date>.csv)")
+    args = parser.parse_args()
+
+    captures = find_captures(args.captures)
+    if not captures:
+        print(f"No captures found in {args.captures}")
+        return
+    output_path = args.output or os.path.join(DATA, "analysis", f"batch_summary_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv")
+    run_batch(captures, args.workers, args.stride, args.expected, output_path)
+
+if __name__ == "__main__":
+    main()
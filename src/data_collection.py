@@ -10,14 +10,38 @@ path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from traceback import format_exc
 
 from TagData import TagData
-from ConnectReader import ConnectReader
-from lib.params import STORE_DATA
-from lib.params import IMPINJ_HOST_IP,jar_files
+from reader_factory import create_reader
+from MultiReaderCollector import MultiReaderCollector
+from lib.params import STORE_DATA, IMPINJ_HOST_IPS
 from lib.params import SENSOR_CONFIGS,SENSOR_DEF
 
 # default time to collect data in seconds
 time_to_collect = 10
 
+def collect_from_readers(fname, collection_time):
+    """Collect from every reader in IMPINJ_HOST_IPS at once, saving one capture per reader."""
+    collector = MultiReaderCollector(IMPINJ_HOST_IPS, SENSOR_CONFIGS[SENSOR_DEF])
+    if STORE_DATA:
+        collector.start_spill(fname)
+
+    try:
+        collector.connect()
+        collector.start_reading(False,collection_time)
+    except Exception:
+        print(format_exc())
+    finally:
+        try:
+            collector.shutdown()
+        except:
+            print("Readers already disconnected")
+
+    try:
+        print(collector.get_stats())
+        if STORE_DATA:
+            collector.save_data(fname)
+    except:
+        print(format_exc())
+
 def main():
     num_args = len(argv)
     if(num_args<2):
@@ -48,12 +72,15 @@ def main():
         print("Not storing data")
     
     print(f"Collecting data for {collection_time} seconds")
+    if len(IMPINJ_HOST_IPS) > 1:
+        collect_from_readers(fname, collection_time)
+        return
+
     tag_data = TagData(SENSOR_CONFIGS[SENSOR_DEF])
-    reader = ConnectReader(
-        IMPINJ_HOST_IP,
-        jar_files,
-        tag_data
-    )
+    if STORE_DATA:
+        # Keep memory flat on long captures by spilling reads to disk as they arrive
+        tag_data.start_spill(fname)
+    reader = create_reader(tag_data)
 
     try:
         reader.start_jvm()
@@ -70,7 +97,7 @@ def main():
             print("Reader already disconnected")
 
     try:
-        print(len(tag_data.get_all_tags()))
+        print(tag_data.get_record_count())
         if STORE_DATA:
             tag_data.save_data(fname)
     except:
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import numpy as np
+
+def band_limits(n, m, band):
+    """
+    Range [lo, hi] of row indices i (1-based) on every anti-diagonal i + j = k, k in [2, n + m].
+
+    The Sakoe-Chiba band keeps the cells within `band` samples of the straight
+    line joining (1, 1) and (n, m), widened to |n - m| + 1 so that a warp path
+    always exists for sequences of different lengths.
+    """
+    k = np.arange(2, n + m + 1)
+    lo, hi = np.maximum(1, k - m), np.minimum(n, k - 1)
+    if band is not None:
+        width = max(band, abs(n - m) + 1) / max(n, m)
+        slope = 1.0 / n + 1.0 / m
+        lo = np.maximum(lo, np.ceil((k / m - width) / slope).astype(np.int64))
+        hi = np.minimum(hi, np.floor((k / m + width) / slope).astype(np.int64))
+    return lo.tolist(), hi.tolist()
+
+def accumulate_cost(x, y, band=None):
+    """
+    Accumulated DTW cost over the band, computed one anti-diagonal at a time.
+
+    All cells (i, j) of an anti-diagonal i + j = k only depend on the two previous
+    diagonals, so each diagonal is a single vectorized update. Only the cells inside
+    the band are stored, diagonal after diagonal in one flat array, each diagonal padded
+    with one inf cell at both ends. Band limits move by at most one row per diagonal, so
+    every neighbour of a band cell lies in its diagonal's band or padding and the
+    updates are plain slices. The local costs of all band cells are computed up front.
+
+    Returns:
+        tuple: (acc, offsets, lo) where the cost of cell (i, k - i) is
+               acc[offsets[k] + 1 + i - lo[k]]; diagonal 0 holds the origin (0, 0).
+    """
+    n, m = len(x), len(y)
+    lo, hi = band_limits(n, m, band)
+    if band is not None and any(l > h for l, h in zip(lo, hi)):
+        lo, hi = band_limits(n, m, None)
+    # Diagonal 0 is the origin (row 0), diagonal 1 is empty (both its cells are on the border)
+    lo, hi = np.array([0, 1] + lo), np.array([0, 0] + hi)
+    cells = hi - lo + 1
+    offsets = np.r_[0, np.cumsum(cells + 2)[:-1]]
+    acc = np.full(offsets[-1] + cells[-1] + 2, np.inf)
+    acc[1] = 0.0
+
+    # Local cost of every band cell, at the same place as its accumulated cost
+    k = np.repeat(np.arange(2, n + m + 1), cells[2:])
+    first_cell = np.repeat(np.cumsum(cells[2:]) - cells[2:], cells[2:])
+    i = np.repeat(lo[2:], cells[2:]) + np.arange(len(k)) - first_cell
+    cost = np.zeros_like(acc)
+    cost[offsets[k] + 1 + i - lo[k]] = np.abs(x[i - 1] - y[k - i - 1])
+
+    # Start in diagonals k - 1 (up, then left one cell further) and k - 2 (diagonal) of rows lo[k] - 1...
+    up = (offsets[1:-1] + lo[2:] - lo[1:-1]).tolist()
+    diag = (offsets[:-2] + lo[2:] - lo[:-2]).tolist()
+    starts = (offsets[2:] + 1).tolist()
+    for start, length, up_start, diag_start in zip(starts, cells[2:].tolist(), up, diag):
+        out = acc[start:start + length]
+        np.minimum(acc[up_start:up_start + length], acc[up_start + 1:up_start + 1 + length], out=out)
+        np.minimum(out, acc[diag_start:diag_start + length], out=out)
+        out += cost[start:start + length]
+    return acc, offsets, lo
+
+def warp_path(acc, offsets, lo, n, m):
+    """Backtrack the optimal warp path, returned as two index arrays (0-based)."""
+    # Scalar lookups are much cheaper on a list (of the band cells only) than on an array
+    acc = acc.tolist()
+    base = (offsets + 1 - lo).tolist()   # acc index of cell (i, k - i) is base[k] + i
+
+    i, j = n, m
+    path_x, path_y = [], []
+    while i > 0 and j > 0:
+        path_x.append(i - 1)
+        path_y.append(j - 1)
+        # Same tie-breaking order as fastdtw: (i-1, j), (i, j-1), (i-1, j-1)
+        k = i + j
+        up, left, diag = acc[base[k - 1] + i - 1], acc[base[k - 1] + i], acc[base[k - 2] + i - 1]
+        if up <= left and up <= diag:
+            i -= 1
+        elif left <= diag:
+            j -= 1
+        else:
+            i -= 1
+            j -= 1
+    return np.array(path_x[::-1], dtype=np.intp), np.array(path_y[::-1], dtype=np.intp)
+
+def dtw(x, y, band=None):
+    """
+    Dynamic time warping between two 1-D sequences with absolute-difference cost.
+
+    Args:
+        x, y (array-like): The sequences to align.
+        band (int, optional): Sakoe-Chiba band radius in samples. None computes the full matrix.
+
+    Returns:
+        tuple: (distance, (path_x, path_y)).
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    if len(x) == 0 or len(y) == 0:
+        raise ValueError("DTW needs two non-empty sequences.")
+
+    n, m = len(x), len(y)
+    acc, offsets, lo = accumulate_cost(x, y, band)
+    if band is not None and not np.isfinite(acc[offsets[n + m] + 1 + n - lo[n + m]]):
+        acc, offsets, lo = accumulate_cost(x, y)
+
+    return float(acc[offsets[n + m] + 1 + n - lo[n + m]]), warp_path(acc, offsets, lo, n, m)
+
+def dtw_align(x, y, band=None):
+    """Return the two sequences aligned along their DTW warp path."""
+    x = np.asarray(x)
+    y = np.asarray(y)
+    _, (path_x, path_y) = dtw(x, y, band)
+    return x[path_x], y[path_y]
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import numpy as np
+
+def wrap_corrections(diffs):
+    """Correction step (degrees) implied by each consecutive phase difference."""
+    return np.where(diffs > 180, -360.0, np.where(diffs < -180, 360.0, 0.0))
+
+def unwrap_phase(phases):
+    """
+    Unwraps a sequence of phase values (in degrees) to make it continuous.
+
+    A jump of more than 180 degrees between consecutive samples is treated as a
+    wrap, and the cumulative +/-360 correction is applied to every later sample.
+
+    Args:
+        phases (np.ndarray): An array of phase values, typically 0-360.
+
+    Returns:
+        np.ndarray: The unwrapped, continuous phase sequence.
+    """
+    phases = np.asarray(phases, dtype=float)
+    if len(phases) == 0:
+        return np.array([])
+
+    correction = np.empty_like(phases)
+    correction[0] = 0.0
+    np.cumsum(wrap_corrections(np.diff(phases)), out=correction[1:])
+    return phases + correction
+
+def unwrap_by_channel(phases, channels):
+    """
+    Unwraps every channel's phase sequence independently, in a single vectorized pass.
+
+    Equivalent to calling `unwrap_phase` on the samples of each channel (in their
+    original order) and scattering the results back.
+    """
+    phases = np.asarray(phases, dtype=float)
+    channels = np.asarray(channels)
+    if len(phases) == 0:
+        return np.array([])
+
+    order = np.argsort(channels, kind="stable")
+    sorted_phases = phases[order]
+    sorted_channels = channels[order]
+    same_channel = sorted_channels[1:] == sorted_channels[:-1]
+
+    steps = np.zeros_like(sorted_phases)
+    steps[1:] = np.where(same_channel, wrap_corrections(np.diff(sorted_phases)), 0.0)
+    correction = np.cumsum(steps)
+
+    # Restart the cumulative correction at the first sample of each channel
+    group_starts = np.flatnonzero(np.r_[True, ~same_channel])
+    group_ids = np.cumsum(np.r_[True, ~same_channel]) - 1
+    correction -= correction[group_starts][group_ids]
+
+    unwrapped = np.empty_like(phases)
+    unwrapped[order] = sorted_phases + correction
+    return unwrapped
+
+class PhaseUnwrapper:
+    """
+    Stateful phase unwrapper for streams and successive chunks.
+
+    Carries the last raw phase and the cumulative correction between calls,
+    so data that was already unwrapped never has to be processed again.
+    """
+    def __init__(self):
+        self.last = None
+        self.correction = 0.0
+
+    def update(self, phase):
+        """Unwrap a single phase (degrees)."""
+        if self.last is not None:
+            diff = phase - self.last
+            if diff > 180:
+                self.correction -= 360.0
+            elif diff < -180:
+                self.correction += 360.0
+        self.last = phase
+        return phase + self.correction
+
+    def unwrap(self, phases):
+        """Unwrap a chunk of phases (degrees) continuing from the previous call."""
+        phases = np.asarray(phases, dtype=float)
+        if len(phases) == 0:
+            return np.array([])
+
+        previous = phases[0] if self.last is None else self.last
+        correction = self.correction + np.cumsum(wrap_corrections(np.diff(phases, prepend=previous)))
+        self.last = float(phases[-1])
+        self.correction = float(correction[-1])
+        return phases + correction
+
+    def reset(self):
+        self.last = None
+        self.correction = 0.0
@@ -0,0 +1,20 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+from lib.params import REPLAY, IMPINJ_HOST_IP, jar_files, directory
+
+def create_reader(tag_data, hostname=IMPINJ_HOST_IP, **kwargs):
+    """
+    ReplayReader over the recorded captures when replay is enabled in params.xml,
+    ConnectReader to the Impinj reader at `hostname` otherwise. Both take the same keyword
+    arguments (if_gui, data_queue, compute_rate, batch_size, series) and expose the same
+    interface; a replay stands in for any hostname, so it also simulates several readers.
+    """
+    if REPLAY['enabled']:
+        # Imported here so that replaying does not need JPype
+        from ReplayReader import ReplayReader
+        return ReplayReader(os.path.join(directory, REPLAY['captures']), tag_data, speed=REPLAY['speed'], **kwargs)
+
+    from ConnectReader import ConnectReader
+    return ConnectReader(hostname, jar_files, tag_data, **kwargs)
@@ -8,25 +8,45 @@ import os
 path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from traceback import format_exc
-from time import sleep
+from time import time,sleep
 from multiprocessing import Process, Queue, Event
 
 from TagData import TagData
-from ConnectReader import ConnectReader
+from reader_factory import create_reader
 from RealTimePlotApp import RealTimePlotApp
-from lib.params import STORE_DATA
-from lib.params import IMPINJ_HOST_IP,jar_files
+from SharedRing import SharedRing
+from SharedSeries import SharedSeries
+from RingTagSink import RingTagSink
+from ComputeScheduler import ComputeScheduler
+from ResultPublisher import ResultPublisher
+from StreamServer import StreamServer
+from LatencyTracer import SAMPLE_FIELDS
+from lib.params import STORE_DATA, PIPELINE, COMPUTE_RATE, GUI_DASHBOARD, STREAM
 from lib.params import SENSOR_CONFIGS,SENSOR_DEF
 
-def data_collection_process(data_queue, stop_event):
+# The phase and RSSI difference of every sensor is published for the dashboard and for stream subscribers
+SENSOR_COLUMNS = GUI_DASHBOARD or STREAM['enabled']
+
+def tracked_sensors():
+    """
+    Every configured sensor when their columns are published, only sensor_def otherwise.
+    Without the dashboard sensor_def goes first: the first sensor is the plotted value.
+    """
+    if not SENSOR_COLUMNS:
+        return SENSOR_CONFIGS[SENSOR_DEF]
+    if GUI_DASHBOARD:
+        return SENSOR_CONFIGS
+    return {SENSOR_DEF: SENSOR_CONFIGS[SENSOR_DEF], **SENSOR_CONFIGS}
+
+def data_collection_process(data_queue, stop_event, series=None):
     try:
-        tag_data = TagData(SENSOR_CONFIGS[SENSOR_DEF])
-        reader = ConnectReader(
-            hostname=IMPINJ_HOST_IP,
-            jar_files=jar_files,
-            tag_data=tag_data,
+        tag_data = TagData(tracked_sensors())
+        reader = create_reader(
+            tag_data,
             if_gui=True,
-            data_queue=data_queue
+            data_queue=data_queue,
+            series=series,
+            dashboard=SENSOR_COLUMNS
         )
 
         try:
@@ -51,6 +71,77 @@ def data_collection_process(data_queue, stop_event):
         print(f"Error in data collection process: {e}")
         print(format_exc())
 
+def ingest_process(ring, stop_event):
+    """Pipeline mode: only receive reads and push them into the shared ring."""
+    try:
+        tag_sink = RingTagSink(ring, TagData.list_epcs(tracked_sensors()))
+        reader = create_reader(tag_sink)
+
+        try:
+            reader.start_jvm()
+            reader.connect_reader()
+            reader.configure_reader()
+            reader.setup_listener()
+            reader.start_reading(continuous=True)
+        except Exception:
+            print(format_exc())
+        finally:
+            try:
+                reader.stop_reading()
+            except:
+                print("Reader already disconnected")
+            print(f"Ingest: {tag_sink.get_record_count()} reads, ring: {ring.get_stats()}")
+        try:
+            stop_event.wait()  # Wait until the stop event is set
+            reader.shutdown()
+        except:
+            print("Already shutdown JVM")
+    except Exception as e:
+        print(f"Error in ingest process: {e}")
+        print(format_exc())
+    finally:
+        ring.close()
+
+def compute_process(ring, data_queue, stop_event, series=None, poll_interval=0.001):
+    """Pipeline mode: consume reads from the shared ring and compute the phase differences."""
+    try:
+        tag_data = TagData(tracked_sensors())
+        compute = tag_data.calculate_sensor_differences if SENSOR_COLUMNS else tag_data.calculate_avg_phase_difference
+        scheduler = ComputeScheduler(compute, COMPUTE_RATE)
+        publisher = ResultPublisher(data_queue, series=series)
+        parsed_at = inserted_at = None
+        try:
+            while not stop_event.is_set():
+                records = ring.pop()
+                if len(records):
+                    parsed_at = time()*1_000
+                    tag_data.add_tag_batch(records["epc"], records["timestamp"], records["channel"],
+                                           records["phase"], records["rssi"], records["readCount"])
+                    inserted_at = time()*1_000
+                    scheduler.notify(len(records), int(records["timestamp"][-1]))
+                # Polled on every pass, with or without new reads, so a pause in the reads does not hold back a tick
+                ran, result = scheduler.poll()
+                if ran and result is not None:
+                    # "parse" is when the reads left the ring
+                    trace = {"read": scheduler.latest_timestamp / 1_000, "parse": parsed_at, "insert": inserted_at, "compute": time()*1_000}
+                    if SENSOR_COLUMNS:
+                        publisher.publish_sensors(result, trace)
+                    else:
+                        publisher.publish(result, trace)
+                else:
+                    publisher.poll()
+                    if not len(records):
+                        sleep(poll_interval)
+        except KeyboardInterrupt:
+            print("Compute interrupted.")
+        finally:
+            print(f"Compute scheduler: {scheduler.get_stats()}, publisher: {publisher.get_stats()}, ring: {ring.get_stats()}")
+    except Exception as e:
+        print(f"Error in compute process: {e}")
+        print(format_exc())
+    finally:
+        ring.close()
+
 def main():
     try:
         num_args = len(argv)
@@ -72,13 +163,36 @@ def main():
     try:
         data_queue = Queue()
         stop_event = Event()
-
     except Exception as e:
         print(f"Could not initialize the multiprocessor objects due to {e}")
 
     try:
-        data_collector = Process(target=data_collection_process, args=(data_queue, stop_event))
-        data_collector.start()
+        # Phase differences reach the GUI through shared memory; data_queue is the fallback transport
+        # The dashboard and the stream add the phase and RSSI difference of every sensor to each sample
+        series = SharedSeries(width=len(SAMPLE_FIELDS) + (2 * len(SENSOR_CONFIGS) if SENSOR_COLUMNS else 0))
+    except Exception as e:
+        print(f"Could not create the shared-memory series due to {e}, sending the results through the queue")
+        series = None
+
+    try:
+        if PIPELINE:
+            # Ingest and compute get a core each; reads flow through a shared-memory ring
+            ring = SharedRing(RingTagSink.RECORD_DTYPE, 1 << 16)
+            data_collectors = [
+                Process(target=ingest_process, args=(ring, stop_event)),
+                Process(target=compute_process, args=(ring, data_queue, stop_event, series))
+            ]
+        else:
+            ring = None
+            data_collectors = [Process(target=data_collection_process, args=(data_queue, stop_event, series))]
+        if STREAM['enabled'] and series is None:
+            print("Streaming needs the shared-memory series, not starting the stream server")
+        elif STREAM['enabled']:
+            # Local WebSocket/SSE subscribers read the same series as the GUI, columns in the order of tracked_sensors()
+            sensor_names = list(tracked_sensors())
+            data_collectors.append(Process(target=StreamServer.run_server, args=(series, stop_event, sensor_names)))
+        for data_collector in data_collectors:
+            data_collector.start()
     except:
         print("Could not get the data collection process up and running")
         print(format_exc())
@@ -90,7 +204,7 @@ def main():
 
     try:
         print("Starting gui...")
-        gui_process = Process(target=RealTimePlotApp.run_gui, args=(data_queue, stop_event))
+        gui_process = Process(target=RealTimePlotApp.run_gui, args=(data_queue, stop_event, series))
         gui_process.start()
     except:
         print("Could not get the GUI up and running")
@@ -101,7 +215,13 @@ def main():
     try:
         gui_process.join()
         stop_event.set()
-        data_collector.join()
+        for data_collector in data_collectors:
+            data_collector.join()
+        if ring is not None:
+            print(f"Ring: {ring.get_stats()}")
+            ring.close()
+        if series is not None:
+            series.close()
     except:
         print("Could not close the data collection and/or the GUI processes")
         print(format_exc())
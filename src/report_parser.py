@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import numpy as np
+
+# Columns of a report line written by TagReportListenerImplementation, in order
+REPORT_FIELDS = ("epc", "timestamp", "channel", "phase", "rssi", "readCount")
+NUMERIC_TYPES = (np.int64, float, float, float, np.int64)
+
+def convert_columns(epcs, values):
+    """Typed columns from the EPC strings and the flat list of numeric fields (5 per read)."""
+    # Microsecond timestamps are far below 2**53, so going through float64 is exact
+    numbers = np.array(values, dtype=float).reshape(-1, len(NUMERIC_TYPES))
+    columns = {"epc": np.array(epcs, dtype=str)}
+    for i, (name, dtype) in enumerate(zip(REPORT_FIELDS[1:], NUMERIC_TYPES)):
+        columns[name] = numbers[:, i].astype(dtype)
+    return columns
+
+def parse_report_lines(lines):
+    """
+    Parse a chunk of CSV report lines (epc,timestamp,channel,phase,rssi,readCount)
+    into typed columns in one vectorized step.
+
+    Lines with the wrong number of fields or unparsable values are skipped.
+
+    :return: A dictionary of field name -> NumPy array (phase in radians, as reported).
+    """
+    width = len(REPORT_FIELDS)
+    lines = [line for line in lines if line.count(",") == width - 1]
+
+    fields = "\n".join(lines).replace(" ", "").replace("\n", ",").split(",") if lines else []
+    epcs = fields[0::width]
+    del fields[0::width]
+    try:
+        return convert_columns(epcs, fields)
+    except ValueError:
+        # A malformed value spoils the vectorized conversion; find it line by line
+        valid = []
+        for i, line in enumerate(lines):
+            try:
+                [float(value) for value in fields[i * (width - 1):(i + 1) * (width - 1)]]
+                valid.append(i)
+            except ValueError:
+                print(f"Error processing line {line}")
+        values = [value for i in valid for value in fields[i * (width - 1):(i + 1) * (width - 1)]]
+        return convert_columns([epcs[i] for i in valid], values)
+
+def lookup_epc_ids(known_epcs, epcs):
+    """Vectorized lookup of the index of each EPC in `known_epcs`, -1 for unknown EPCs."""
+    epcs = np.asarray(epcs, dtype=str)
+    known = np.array(known_epcs, dtype=str)
+    order = np.argsort(known)
+    pos = np.clip(np.searchsorted(known[order], epcs), 0, len(known) - 1)
+    ids = order[pos]
+    return np.where(known[ids] == epcs, ids, -1)
@@ -0,0 +1,410 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Compute-only analysis of recorded captures: the algorithms behind rfid_data_plotter,
+returning NumPy arrays and stats dictionaries. Imports no plotting library, so batch
+jobs can run it without matplotlib.
+"""
+
+import numpy as np
+
+from dtw_kernel import dtw_align
+from lib.params import DTW_BAND
+from phase_unwrap import unwrap_by_channel
+from sliding_windows import window_bounds, ChannelWindows, interpolated_window_means
+
+
+def clean_phases(phase_list):
+    """Cleans phase data by normalizing it to a 0-180 degree range."""
+    cleaned = np.array(phase_list)
+    mask_gt_270 = cleaned > 270
+    mask_gt_135 = (cleaned > 135) & (cleaned <= 270)
+
+    cleaned[mask_gt_270] = np.abs(cleaned[mask_gt_270] - 360)
+    cleaned[mask_gt_135] = np.abs(cleaned[mask_gt_135] - 180)
+    cleaned[~(mask_gt_270 | mask_gt_135)] = np.abs(cleaned[~(mask_gt_270 | mask_gt_135)])
+
+    return cleaned
+
+def phase_normalization(phi_deg):
+    """
+    Normalizes and folds a given phase value into the [0, 90] degree range.
+
+    This function first wraps the input phase to the [0, 180) interval,
+    then folds it around 90 degrees to find the closest magnitude
+    representation within [0, 90]. Useful for scenarios where phase
+    differences of (e.g., 20 deg) and (160 deg) are considered equivalent
+    in terms of absolute deviation from 0/180 boundaries.
+
+    Args:
+        phi_deg (float, int or np.ndarray): The input phase value(s) in degrees.
+
+    Returns:
+        float or np.ndarray: The folded phase value(s), guaranteed to be in the range [0, 90] degrees.
+    """
+    phi_norm = phi_deg % 180
+    return np.minimum(phi_norm, 180 - phi_norm)
+
+def dynamic_time_warp(signal1, signal2):
+    """Aligns two signals using Dynamic Time Warping."""
+    return dtw_align(signal1, signal2, DTW_BAND)
+
+def series_stats(values, expected=None):
+    """
+    Summary statistics of a moving-average series.
+
+    Args:
+        values (array-like): The series.
+        expected (float, optional): Ground-truth value; adds its RMSE and R^2 when given.
+
+    Returns:
+        dict: count, mean, std, median, min, max (NaN when the series is empty) and, with
+              `expected`, expected, rmse and r2.
+    """
+    values = np.asarray(values, dtype=float)
+    stats = {"count": len(values)}
+    for key, reduce in (("mean", np.mean), ("std", np.std), ("median", np.median), ("min", np.min), ("max", np.max)):
+        stats[key] = float(reduce(values)) if len(values) else np.nan
+
+    if expected is not None:
+        stats["expected"] = expected
+        if len(values):
+            errors = values - expected
+            ss_tot = np.sum((values - stats["mean"])**2)
+            ss_res = np.sum(errors**2)
+            stats["rmse"] = float(np.sqrt(np.mean(errors**2)))
+            stats["r2"] = float(1 - (ss_res / ss_tot)) if ss_tot != 0 else 0.0
+        else:
+            stats["rmse"] = stats["r2"] = np.nan
+    return stats
+
+def tag_statistics(tag_data):
+    """
+    Basic statistics of one tag's reads.
+
+    Returns:
+        dict: samples, duration_s (first to last read), read_rate (reads/s), phase_min,
+              phase_max and rssi_mean.
+    """
+    ts = np.asarray(tag_data["timestamps"], dtype=float)
+    phases = np.asarray(tag_data["phases"], dtype=float)
+    rssis = np.asarray(tag_data["rssis"], dtype=float)
+    duration_s = float(ts[-1] - ts[0]) / 1000.0 if len(ts) else 0.0
+    return {
+        "samples": len(ts),
+        "duration_s": duration_s,
+        "read_rate": len(ts) / duration_s if duration_s > 0 else np.nan,
+        "phase_min": float(phases.min()) if len(phases) else np.nan,
+        "phase_max": float(phases.max()) if len(phases) else np.nan,
+        "rssi_mean": float(rssis.mean()) if len(rssis) else np.nan
+    }
+
+def subset_epc_data(data, start = 0, end = 1):
+    """
+    Subset EPC data dictionary between start and end (seconds or fractions).
+
+    Args:
+        data (dict): Dictionary of EPC data:
+                     {
+                       "epc1": {"rssis": [], "phases": [], "timestamps": [], "channels": []},
+                       ...
+                     }
+        start (float): Start index (seconds or fraction of total duration).
+        end (float): End index (seconds or fraction of total duration).
+
+    Returns:
+        dict: Subset of the original data with the same structure.
+    """
+    # Get overall duration from timestamps (assuming ms values)
+    all_timestamps = []
+    for epc in data.values():
+        all_timestamps.extend(epc["timestamps"])
+    if not all_timestamps:
+        return {}
+
+    min_ts = min(all_timestamps)
+    max_ts = max(all_timestamps)
+    duration_sec = (max_ts - min_ts) / 1000.0
+
+    # Handle fractional indices
+    if 0 <= start <= 1 and 0 <= end <= 1 and start <= end:
+        start_time = min_ts + start * duration_sec * 1000
+        end_time = min_ts + end * duration_sec * 1000
+    else:
+        start_time = min_ts + start * 1000
+        end_time = min_ts + end * 1000
+
+    # Build subset
+    subset = {}
+    for epc, values in data.items():
+        ts = values["timestamps"]
+        indices = [i for i, t in enumerate(ts) if start_time <= t <= end_time]
+
+        subset[epc] = {
+            "rssis":   [values["rssis"][i] for i in indices],
+            "phases":  [values["phases"][i] for i in indices],
+            "timestamps": [values["timestamps"][i] for i in indices],
+            "channels":   [values["channels"][i] for i in indices]
+        }
+
+    return subset
+
+def channelwise_phase_differences(data, epc_list, processing_method='dtw', start=0.0, end=1.0):
+    """
+    Compares the phases of two tags on every frequency channel they share.
+
+    Args:
+        data (dict): A dictionary where keys are RFID EPCs and values are dicts
+                     containing 'phases' and 'channels' lists.
+        epc_list (list): A list containing two EPC strings for the tags to be compared.
+        processing_method (str, optional): 'dtw' to align the phases with Dynamic Time
+                                           Warping or 'raw' for direct comparison.
+                                           Defaults to 'dtw'.
+        start (float, optional): The starting point for the data slice as a fraction
+                                 of the total length (e.g., 0.2 for 20%). Defaults to 0.0.
+        end (float, optional): The ending point for the data slice as a fraction
+                               of the total length (e.g., 0.5 for 50%). Defaults to 1.0.
+
+    Returns:
+        tuple: (sorted common channels,
+                dict of channel -> (aligned phases 1, aligned phases 2, cleaned phase difference)
+                for the channels both tags have data on,
+                overall average phase difference).
+    """
+    if not (0.0 <= start < 1.0 and 0.0 < end <= 1.0 and start < end):
+        raise ValueError("Start and end must be fractions between 0.0 and 1.0, with start < end.")
+    if len(epc_list) != 2:
+        raise ValueError("epc_list must contain exactly two EPCs.")
+    if epc_list[0] not in data or epc_list[1] not in data:
+        raise ValueError("One or both EPCs were not found in the data dictionary.")
+    if processing_method not in ['raw', 'dtw']:
+        raise ValueError("processing_method must be either 'raw' or 'dtw'.")
+
+    # Slice both tags
+    phases_by_channel = []
+    for epc in epc_list:
+        tag_full = data[epc]
+        length = len(tag_full["phases"])
+        start_idx, end_idx = int(start * length), int(end * length)
+        by_channel = {}
+        for phase, channel in zip(tag_full["phases"][start_idx:end_idx], tag_full["channels"][start_idx:end_idx]):
+            by_channel.setdefault(channel, []).append(phase)
+        phases_by_channel.append(by_channel)
+    tag_1_phases_by_channel, tag_2_phases_by_channel = phases_by_channel
+
+    common_channels = sorted(list(set(tag_1_phases_by_channel.keys()) & set(tag_2_phases_by_channel.keys())))
+
+    results = {}
+    phase_diffs_means = []
+    for channel in common_channels:
+        phase_1 = np.array(tag_1_phases_by_channel[channel])
+        phase_2 = np.array(tag_2_phases_by_channel[channel])
+
+        if processing_method == 'dtw':
+            if len(phase_1) > 0 and len(phase_2) > 0:
+                aligned_phase_1, aligned_phase_2 = dynamic_time_warp(phase_1, phase_2)
+            else:
+                continue
+        else: # 'raw'
+            min_length = min(len(phase_1), len(phase_2))
+            if min_length == 0:
+                continue
+            aligned_phase_1 = phase_1[:min_length]
+            aligned_phase_2 = phase_2[:min_length]
+
+        phase_diff = clean_phases(np.abs(aligned_phase_1 - aligned_phase_2))
+        if len(phase_diff) > 0:
+            phase_diffs_means.append(np.mean(phase_diff))
+        results[channel] = (aligned_phase_1, aligned_phase_2, phase_diff)
+
+    overall_avg_phase_diff = np.mean(phase_diffs_means) if phase_diffs_means else 0
+    return common_channels, results, overall_avg_phase_diff
+
+def tag_pair_columns(data, epc_list, window_duration_s, window_stride_s, *columns):
+    """
+    Validates a two-tag moving-average request and returns the timestamps, channels and
+    requested columns of both tags as NumPy arrays.
+    """
+    if len(epc_list) != 2:
+        raise ValueError("`epc_list` must contain exactly two RFID EPC codes.")
+    tag1_id, tag2_id = epc_list[0], epc_list[1]
+    if tag1_id not in data or tag2_id not in data:
+        raise ValueError(f"One or both EPCs ({tag1_id}, {tag2_id}) not found in `data`.")
+    if window_duration_s <= 0 or window_stride_s <= 0:
+        raise ValueError("`window_duration_s` and `window_stride_s` must be positive.")
+
+    return [[np.asarray(data[epc][key]) for key in ("timestamps", "channels") + columns] for epc in epc_list]
+
+def overlap_windows(tag1_ts, tag2_ts, window_duration_s, window_stride_s):
+    """Sliding windows (start and end in ms) over the time range both tags were read in."""
+    start_time_ms = max(tag1_ts[0], tag2_ts[0])
+    end_time_ms = min(tag1_ts[-1], tag2_ts[-1])
+    if start_time_ms >= end_time_ms:
+        return np.array([]), np.array([])
+    return window_bounds(start_time_ms, end_time_ms, window_duration_s * 1000, window_stride_s * 1000)
+
+def moving_average_phase_difference(
+    data,
+    epc_list,
+    window_duration_s=1.0,
+    window_stride_s=0.05,
+    enable_dtw=True,
+    expected=None
+):
+    """
+    Calculates the moving average phase difference using a time-based sliding window,
+    correctly handling variable and different sampling rates.
+
+    In every window, the phases of the channels both tags were read on are aligned (with
+    DTW, or truncated to the same length), and the window value is the mean over those
+    channels of the mean cleaned phase difference, folded into [0, 90]. Windows where one
+    tag has no reads are skipped; windows without a common channel count as 0.
+
+    Args:
+        data (dict): A dictionary containing RFID tag data, grouped by EPC.
+        epc_list (list): A list of exactly two RFID EPC codes.
+        window_duration_s (float): The duration in seconds for the analysis window.
+        window_stride_s (float): The time step in seconds to slide the window forward.
+        enable_dtw (bool, optional): If True, applies DTW matching. Defaults to True.
+        expected (float, optional): Ground-truth phase difference for the stats.
+
+    Returns:
+        tuple: (moving average phase differences, window end timestamps in seconds, stats dict).
+
+    Raises:
+        ValueError: For invalid input parameters.
+    """
+    (tag1_ts, tag1_ch, tag1_ph), (tag2_ts, tag2_ch, tag2_ph) = tag_pair_columns(
+        data, epc_list, window_duration_s, window_stride_s, "phases")
+    if len(tag1_ts) == 0 or len(tag2_ts) == 0:
+        return np.array([]), np.array([]), series_stats([], expected)
+
+    # Locate every window of each tag once, per channel; a window is then a set of slices
+    starts, ends = overlap_windows(tag1_ts, tag2_ts, window_duration_s, window_stride_s)
+    tag1_windows = ChannelWindows(tag1_ts, tag1_ch, starts, ends, phases=tag1_ph)
+    tag2_windows = ChannelWindows(tag2_ts, tag2_ch, starts, ends, phases=tag2_ph)
+
+    moving_avg_phase_diffs = []
+    filled = np.zeros(len(ends), dtype=bool)
+    for k in range(len(ends)):
+        if tag1_windows.counts[k] == 0 or tag2_windows.counts[k] == 0:
+            # If one tag has no data in this window, we can't calculate a difference.
+            # We slide to the next window.
+            continue
+
+        # Phases by channel within the window
+        tag1_phases_by_ch = tag1_windows.window(k)
+        tag2_phases_by_ch = tag2_windows.window(k)
+
+        common_channels = sorted(tag1_phases_by_ch.keys() & tag2_phases_by_ch.keys())
+        window_channel_avg_diffs = []
+
+        for channel in common_channels:
+            phase_seq1 = tag1_phases_by_ch[channel]["phases"]
+            phase_seq2 = tag2_phases_by_ch[channel]["phases"]
+
+            if enable_dtw:
+                aligned_phase_1, aligned_phase_2 = dynamic_time_warp(phase_seq1, phase_seq2)
+            else:
+                min_len = min(len(phase_seq1), len(phase_seq2))
+                aligned_phase_1, aligned_phase_2 = phase_seq1[:min_len], phase_seq2[:min_len]
+
+            if len(aligned_phase_1) > 0:
+                diffs = np.abs(aligned_phase_1 - aligned_phase_2)
+                cleaned_diffs = clean_phases(diffs)
+                window_channel_avg_diffs.append(np.mean(cleaned_diffs))
+
+        # Calculate the average for the current window and store it
+        overall_avg_for_window = np.mean(window_channel_avg_diffs) if window_channel_avg_diffs else 0.0
+        moving_avg_phase_diffs.append(phase_normalization(overall_avg_for_window))
+        filled[k] = True
+
+    moving_avg_phase_diffs = np.asarray(moving_avg_phase_diffs, dtype=float)
+    return moving_avg_phase_diffs, ends[filled] / 1000.0, series_stats(moving_avg_phase_diffs, expected)
+
+def interpolated_moving_average_phase_difference(
+    data,
+    epc_list,
+    window_duration_s=1.0,
+    window_stride_s=0.05,
+    expected=None
+):
+    """
+    Calculates the moving average phase difference using a time-based sliding window
+    with phase unwrapping and linear interpolation for robust, accurate results.
+
+    In every window, each channel with at least 2 reads of each tag is unwrapped from its
+    first raw phase, tag 2 is interpolated at tag 1's read times, and the window value is
+    the mean of all those differences, folded into [0, 90]. Windows without any such
+    channel are skipped.
+
+    Args:
+        data (dict): A dictionary containing RFID tag data, grouped by EPC.
+        epc_list (list): A list of exactly two RFID EPC codes.
+        window_duration_s (float): The duration in seconds for the analysis window.
+        window_stride_s (float): The time step in seconds to slide the window forward.
+        expected (float, optional): Ground-truth phase difference for the stats.
+
+    Returns:
+        tuple: (moving average phase differences, window end timestamps in seconds, stats dict).
+    """
+    (tag1_ts, tag1_ch, tag1_ph), (tag2_ts, tag2_ch, tag2_ph) = tag_pair_columns(
+        data, epc_list, window_duration_s, window_stride_s, "phases")
+    if len(tag1_ts) < 2 or len(tag2_ts) < 2:
+        return np.array([]), np.array([]), series_stats([], expected)
+
+    # Unwrap each channel once over the whole capture. A window's channel samples are
+    # contiguous in that channel's sequence, so unwrapping them from scratch only differs
+    # by the correction already accumulated at their first sample.
+    tag1_uw = unwrap_by_channel(tag1_ph, tag1_ch)
+    tag2_uw = unwrap_by_channel(tag2_ph, tag2_ch)
+
+    # Interpolate each channel once for all windows too, rebasing every window to start
+    # from its raw first phase (dropping the correction accumulated at that read)
+    starts, ends = overlap_windows(tag1_ts, tag2_ts, window_duration_s, window_stride_s)
+    tag1_windows = ChannelWindows(tag1_ts, tag1_ch, starts, ends, unwrapped=tag1_uw, corrections=tag1_uw - tag1_ph)
+    tag2_windows = ChannelWindows(tag2_ts, tag2_ch, starts, ends, unwrapped=tag2_uw, corrections=tag2_uw - tag2_ph)
+    sums, counts = interpolated_window_means(tag1_windows, tag2_windows, "unwrapped", offsets="corrections")
+
+    filled = counts > 0
+    moving_avg_phase_diffs = phase_normalization(sums[filled] / counts[filled])
+    return moving_avg_phase_diffs, ends[filled] / 1000.0, series_stats(moving_avg_phase_diffs, expected)
+
+def interpolated_moving_average_rssi_difference(
+    data,
+    epc_list,
+    window_duration_s=1.0,
+    window_stride_s=0.05,
+    expected=None
+):
+    """
+    Calculates the moving average RSSI difference using a time-based sliding window
+    with linear interpolation, like the phase-based version (without unwrapping or
+    folding: the window value is the signed mean RSSI difference).
+
+    Args:
+        data (dict): A dictionary containing RFID tag data, grouped by EPC.
+        epc_list (list): A list of exactly two RFID EPC codes.
+        window_duration_s (float): The duration in seconds for the analysis window.
+        window_stride_s (float): The time step in seconds to slide the window forward.
+        expected (float, optional): Ground-truth RSSI difference for the stats.
+
+    Returns:
+        tuple: (moving average RSSI differences, window end timestamps in seconds, stats dict).
+    """
+    (tag1_ts, tag1_ch, tag1_rs), (tag2_ts, tag2_ch, tag2_rs) = tag_pair_columns(
+        data, epc_list, window_duration_s, window_stride_s, "rssis")
+    if len(tag1_ts) < 2 or len(tag2_ts) < 2:
+        return np.array([]), np.array([]), series_stats([], expected)
+
+    # Interpolate each channel once for all windows
+    starts, ends = overlap_windows(tag1_ts, tag2_ts, window_duration_s, window_stride_s)
+    tag1_windows = ChannelWindows(tag1_ts, tag1_ch, starts, ends, rssis=tag1_rs)
+    tag2_windows = ChannelWindows(tag2_ts, tag2_ch, starts, ends, rssis=tag2_rs)
+    sums, counts = interpolated_window_means(tag1_windows, tag2_windows, "rssis")
+
+    filled = counts > 0
+    # Differential RSSI
+    moving_avg_rssi_diffs = sums[filled] / counts[filled]
+    return moving_avg_rssi_diffs, ends[filled] / 1000.0, series_stats(moving_avg_rssi_diffs, expected)
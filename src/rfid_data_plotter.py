@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-from sys import path,argv
+from sys import path,argv,exit
 from pathlib import Path
 import os
 
@@ -12,33 +12,16 @@ import json
 import math
 import numpy as np
 import matplotlib.pyplot as plt
-from fastdtw import fastdtw
 from traceback import format_exc
 
 from lib.params import DATA
 from lib.params import SENSOR_CONFIGS,SENSOR_DEF
 from lib.params import read_rate
+from rfid_analysis import clean_phases, phase_normalization, dynamic_time_warp, subset_epc_data
+from rfid_analysis import channelwise_phase_differences, moving_average_phase_difference
+from rfid_analysis import interpolated_moving_average_phase_difference, interpolated_moving_average_rssi_difference
 
 
-def clean_phases(phase_list):
-    """Cleans phase data by normalizing it to a 0-180 degree range."""
-    cleaned = np.array(phase_list)
-    mask_gt_270 = cleaned > 270
-    mask_gt_135 = (cleaned > 135) & (cleaned <= 270)
-    
-    cleaned[mask_gt_270] = np.abs(cleaned[mask_gt_270] - 360)
-    cleaned[mask_gt_135] = np.abs(cleaned[mask_gt_135] - 180)
-    cleaned[~(mask_gt_270 | mask_gt_135)] = np.abs(cleaned[~(mask_gt_270 | mask_gt_135)])
-    
-    return cleaned
-
-def dynamic_time_warp(signal1, signal2):
-    """Aligns two signals using Dynamic Time Warping."""
-    distance, path = fastdtw(signal1, signal2)
-    aligned_signal1 = np.array([signal1[i] for i, j in path])
-    aligned_signal2 = np.array([signal2[j] for i, j in path])
-    return aligned_signal1, aligned_signal2
-
 def analyze_channelwise_phases(data, epc_list, processing_method='dtw', start=0.0, end=1.0):
     """
     Analyzes and plots RFID phase data for two tags, comparing their phases
@@ -58,92 +41,35 @@ def analyze_channelwise_phases(data, epc_list, processing_method='dtw', start=0.
         end (float, optional): The ending point for the data slice as a fraction
                                of the total length (e.g., 0.5 for 50%). Defaults to 1.0.
     """
-    
-    # --- 1. Input Validation ---
-    if not (0.0 <= start < 1.0 and 0.0 < end <= 1.0 and start < end):
-        raise ValueError("Start and end must be fractions between 0.0 and 1.0, with start < end.")
-    if len(epc_list) != 2:
-        raise ValueError("epc_list must contain exactly two EPCs.")
-    if epc_list[0] not in data or epc_list[1] not in data:
-        raise ValueError("One or both EPCs were not found in the data dictionary.")
-    if processing_method not in ['raw', 'dtw']:
-        raise ValueError("processing_method must be either 'raw' or 'dtw'.")
-
-    # --- 2. Data Extraction and Slicing ---
-    tag_1_full = data[epc_list[0]]
-    tag_2_full = data[epc_list[1]]
-    
-    # Create dynamic labels from EPCs
-    label1 = f"Tag: {epc_list[0][-3:]}"
-    label2 = f"Tag: {epc_list[1][-3:]}"
-
-    len1, len2 = len(tag_1_full["phases"]), len(tag_2_full["phases"])
-    start_idx1, end_idx1 = int(start * len1), int(end * len1)
-    start_idx2, end_idx2 = int(start * len2), int(end * len2)
-
-    tag_1_data = {
-        "phases": tag_1_full["phases"][start_idx1:end_idx1],
-        "channels": tag_1_full["channels"][start_idx1:end_idx1]
-    }
-    tag_2_data = {
-        "phases": tag_2_full["phases"][start_idx2:end_idx2],
-        "channels": tag_2_full["channels"][start_idx2:end_idx2]
-    }
-
-    # --- 3. Segregate Phases and Find Common Channels ---
-    tag_1_phases_by_channel = {}
-    tag_2_phases_by_channel = {}
-
-    for i, channel in enumerate(tag_1_data["channels"]):
-        tag_1_phases_by_channel.setdefault(channel, []).append(tag_1_data["phases"][i])
-
-    for i, channel in enumerate(tag_2_data["channels"]):
-        tag_2_phases_by_channel.setdefault(channel, []).append(tag_2_data["phases"][i])
-
-    common_channels = sorted(list(set(tag_1_phases_by_channel.keys()) & set(tag_2_phases_by_channel.keys())))
+    common_channels, results, overall_avg_phase_diff = channelwise_phase_differences(
+        data, epc_list, processing_method, start, end)
     if not common_channels:
         print("No common channels found in the provided data slice.")
         return 0
 
-    # --- 4. Dynamic Plot Layout ---
+    # Create dynamic labels from EPCs
+    label1 = f"Tag: {epc_list[0][-3:]}"
+    label2 = f"Tag: {epc_list[1][-3:]}"
+
+    # --- Dynamic Plot Layout ---
     n_channels = len(common_channels)
     cols = int(math.ceil(math.sqrt(n_channels)))
     rows = int(math.ceil(n_channels / cols)) if cols > 0 else 0
 
-    if n_channels == 0:
-        return 0
-
-    # --- 5. Plotting ---
+    # --- Plotting ---
     fig_phases, axes_phases = plt.subplots(rows, cols, figsize=(cols * 4.5, rows * 3.5), squeeze=False)
     fig_diff, axes_diff = plt.subplots(rows, cols, figsize=(cols * 4.5, rows * 3.5), squeeze=False)
 
     fig_phases.suptitle(f'Phase Comparison ({processing_method.upper()})', fontsize=16)
     fig_diff.suptitle('Phase Difference', fontsize=16)
 
-    phase_diffs_means = []
-    
     axes_phases_flat = axes_phases.flatten()
     axes_diff_flat = axes_diff.flatten()
 
     for idx, channel in enumerate(common_channels):
-        phase_1 = np.array(tag_1_phases_by_channel[channel])
-        phase_2 = np.array(tag_2_phases_by_channel[channel])
-
-        if processing_method == 'dtw':
-            if len(phase_1) > 0 and len(phase_2) > 0:
-                aligned_phase_1, aligned_phase_2 = dynamic_time_warp(phase_1, phase_2)
-            else:
-                continue
-        else: # 'raw'
-            min_length = min(len(phase_1), len(phase_2))
-            if min_length == 0:
-                continue
-            aligned_phase_1 = phase_1[:min_length]
-            aligned_phase_2 = phase_2[:min_length]
-
-        phase_diff = clean_phases(np.abs(aligned_phase_1 - aligned_phase_2))
-        if len(phase_diff) > 0:
-            phase_diffs_means.append(np.mean(phase_diff))
+        if channel not in results:
+            continue
+        aligned_phase_1, aligned_phase_2, phase_diff = results[channel]
 
         # Plot with dynamic labels
         axes_phases_flat[idx].plot(aligned_phase_1, 'b-', label=label1)
@@ -162,7 +88,6 @@ def analyze_channelwise_phases(data, epc_list, processing_method='dtw', start=0.
         axes_phases_flat[i].set_visible(False)
         axes_diff_flat[i].set_visible(False)
 
-    overall_avg_phase_diff = np.mean(phase_diffs_means) if phase_diffs_means else 0
     print(f"Overall Average Phase Difference: {overall_avg_phase_diff:.2f} degrees")
 
     fig_phases.tight_layout(rect=[0, 0.03, 1, 0.95])
@@ -180,8 +105,9 @@ def plot_moving_average_dtw_phase_difference(
     enable_dtw=True
 ):
     """
-    Calculates the moving average phase difference using a time-based sliding window,
-    correctly handling variable and different sampling rates.
+    Plots the moving average phase difference using a time-based sliding window,
+    correctly handling variable and different sampling rates
+    (see `rfid_analysis.moving_average_phase_difference`).
 
     Args:
         data (dict): A dictionary containing RFID tag data, grouped by EPC.
@@ -196,91 +122,15 @@ def plot_moving_average_dtw_phase_difference(
     Raises:
         ValueError: For invalid input parameters.
     """
-    if len(epc_list) != 2:
-        raise ValueError("`epc_list` must contain exactly two RFID EPC codes.")
-    tag1_id, tag2_id = epc_list[0], epc_list[1]
-    if tag1_id not in data or tag2_id not in data:
-        raise ValueError(f"One or both EPCs ({tag1_id}, {tag2_id}) not found in `data`.")
-    if window_duration_s <= 0 or window_stride_s <= 0:
-        raise ValueError("`window_duration_s` and `window_stride_s` must be positive floats.")
-
-    tag1_ts = np.asarray(data[tag1_id]["timestamps"])
-    tag1_ph = np.asarray(data[tag1_id]["phases"])
-    tag1_ch = np.asarray(data[tag1_id]["channels"])
-
-    tag2_ts = np.asarray(data[tag2_id]["timestamps"])
-    tag2_ph = np.asarray(data[tag2_id]["phases"])
-    tag2_ch = np.asarray(data[tag2_id]["channels"])
-
-    if len(tag1_ts) == 0 or len(tag2_ts) == 0:
-        return [], []
-
-    # Determine the overlapping time range for both tags
-    start_time_ms = max(tag1_ts[0], tag2_ts[0])
-    end_time_ms = min(tag1_ts[-1], tag2_ts[-1])
-
-    if start_time_ms >= end_time_ms:
-        return [], []
-
-    moving_avg_phase_diffs = []
-    corresponding_timestamps_s = []
-
-    window_duration_ms = window_duration_s * 1000
-    window_stride_ms = window_stride_s * 1000
-
-    current_window_start_ms = start_time_ms
-    while current_window_start_ms + window_duration_ms <= end_time_ms:
-        current_window_end_ms = current_window_start_ms + window_duration_ms
-
-        # Filter data for each tag within the current time window
-        idx1 = np.where((tag1_ts >= current_window_start_ms) & (tag1_ts < current_window_end_ms))[0]
-        idx2 = np.where((tag2_ts >= current_window_start_ms) & (tag2_ts < current_window_end_ms))[0]
-
-        if len(idx1) == 0 or len(idx2) == 0:
-            # If one tag has no data in this window, we can't calculate a difference.
-            # We slide to the next window.
-            current_window_start_ms += window_stride_ms
-            continue
-
-        win_tag1_ph, win_tag1_ch = tag1_ph[idx1], tag1_ch[idx1]
-        win_tag2_ph, win_tag2_ch = tag2_ph[idx2], tag2_ch[idx2]
-
-        # Group phases by channel within the window
-        tag1_phases_by_ch = {ch: win_tag1_ph[win_tag1_ch == ch] for ch in np.unique(win_tag1_ch)}
-        tag2_phases_by_ch = {ch: win_tag2_ph[win_tag2_ch == ch] for ch in np.unique(win_tag2_ch)}
-
-        common_channels = set(tag1_phases_by_ch.keys()) & set(tag2_phases_by_ch.keys())
-        window_channel_avg_diffs = []
-
-        if common_channels:
-            for channel in common_channels:
-                phase_seq1 = tag1_phases_by_ch[channel]
-                phase_seq2 = tag2_phases_by_ch[channel]
-
-                if enable_dtw:
-                    aligned_phase_1, aligned_phase_2 = dynamic_time_warp(phase_seq1, phase_seq2)
-                else:
-                    min_len = min(len(phase_seq1), len(phase_seq2))
-                    aligned_phase_1, aligned_phase_2 = phase_seq1[:min_len], phase_seq2[:min_len]
-
-                if len(aligned_phase_1) > 0:
-                    diffs = np.abs(aligned_phase_1 - aligned_phase_2)
-                    cleaned_diffs = clean_phases(diffs)
-                    window_channel_avg_diffs.append(np.mean(cleaned_diffs))
-
-        # Calculate the average for the current window and store it
-        overall_avg_for_window = np.mean(window_channel_avg_diffs) if window_channel_avg_diffs else 0.0
-        moving_avg_phase_diffs.append(phase_normalization(overall_avg_for_window))
-        corresponding_timestamps_s.append(current_window_end_ms / 1000.0)
-
-        current_window_start_ms += window_stride_ms
+    moving_avg_phase_diffs, corresponding_timestamps_s, _ = moving_average_phase_difference(
+        data, epc_list, window_duration_s, window_stride_s, enable_dtw)
 
     if enable_dtw:
         method = "DTW"
     else:   method = "Time"
 
     print(f"Generated {len(moving_avg_phase_diffs)} data points for the moving average.")
-    if moving_avg_phase_diffs:
+    if len(moving_avg_phase_diffs):
         plt.figure(figsize=(12, 6))
         plt.plot(corresponding_timestamps_s, moving_avg_phase_diffs, 'g-', label=f'{method}-Based MA ({window_duration_s}s window, {window_stride_s}s stride)', markersize=4)
         plt.title(f'{method}-Based Moving Average Phase Difference', fontweight='bold')
@@ -291,59 +141,7 @@ def plot_moving_average_dtw_phase_difference(
         plt.ylim(bottom=0)
         plt.show()
 
-def unwrap_phase(phases):
-    """
-    Unwraps a sequence of phase values (in degrees) to make it continuous.
-    
-    Args:
-        phases (np.ndarray): An array of phase values, typically 0-360.
-        
-    Returns:
-        np.ndarray: The unwrapped, continuous phase sequence.
-    """
-    if len(phases) == 0:
-        return np.array([])
-    
-    unwrapped = np.copy(phases).astype(float) # Ensure float type for calculations
-    cumulative_correction = 0.0
-
-    for i in range(1, len(unwrapped)):
-        # Calculate the difference between the current original wrapped phase
-        # and the previous original wrapped phase.
-        # This determines if a wrap occurred between *original* samples.
-        diff = phases[i] - phases[i-1] 
-
-        # If difference indicates a phase wrap (jump > 180 or < -180)
-        # We need to adjust the cumulative_correction for all subsequent points.
-        if diff > 180:  # A jump down (e.g., from ~350 to ~10 degrees)
-            cumulative_correction -= 360.0
-        elif diff < -180: # A jump up (e.g., from ~10 to ~350 degrees)
-            cumulative_correction += 360.0
-        
-        # Apply the cumulative_correction to the current original phase value
-        unwrapped[i] = phases[i] + cumulative_correction
-        
-    return unwrapped
-
-
-def phase_normalization(phi_deg):
-    """
-    Normalizes and folds a given phase value into the [0, 90] degree range.
-
-    This function first wraps the input phase to the [0, 180) interval,
-    then folds it around 90 degrees to find the closest magnitude
-    representation within [0, 90]. Useful for scenarios where phase
-    differences of (e.g., 20 deg) and (160 deg) are considered equivalent
-    in terms of absolute deviation from 0/180 boundaries.
-
-    Args:
-        phi_deg (float or int): The input phase value in degrees.
-
-    Returns:
-        float: The folded phase value, guaranteed to be in the range [0, 90] degrees.
-    """
-    phi_norm = phi_deg % 180
-    return min(phi_norm, 180 - phi_norm)
+    return moving_avg_phase_diffs.tolist(), corresponding_timestamps_s.tolist()
 
 def plot_interpolated_moving_average_phase_difference(
                                                     data,
@@ -354,115 +152,35 @@ def plot_interpolated_moving_average_phase_difference(
                                                     stats=True
                                                 ):
     """
-    Calculates the moving average phase difference using a time-based sliding window
-    with phase unwrapping and linear interpolation for robust, accurate results.
+    Plots the moving average phase difference using a time-based sliding window
+    with phase unwrapping and linear interpolation for robust, accurate results
+    (see `rfid_analysis.interpolated_moving_average_phase_difference`).
 
     Args:
         data (dict): A dictionary containing RFID tag data, grouped by EPC.
         epc_list (list): A list of exactly two RFID EPC codes.
         window_duration_s (float): The duration in seconds for the analysis window.
         window_stride_s (float): The time step in seconds to slide the window forward.
+        expected (float, optional): Ground-truth phase difference; also prints the RMSE and R^2 against it.
+        stats (bool, optional): Print the statistics of the series. Defaults to True.
 
     Returns:
         tuple: (list of moving average phase differences, list of corresponding timestamps).
     """
-    if len(epc_list) != 2:
-        raise ValueError("`epc_list` must contain exactly two RFID EPC codes.")
-    tag1_id, tag2_id = epc_list[0], epc_list[1]
-    if tag1_id not in data or tag2_id not in data:
-        raise ValueError(f"One or both EPCs ({tag1_id}, {tag2_id}) not found in `data`.")
-    if window_duration_s <= 0 or window_stride_s <= 0:
-        raise ValueError("`window_duration_s` and `window_stride_s` must be positive.")
-
-    tag1_ts = np.asarray(data[tag1_id]["timestamps"])
-    tag1_ph = np.asarray(data[tag1_id]["phases"])
-    tag1_ch = np.asarray(data[tag1_id]["channels"])
-
-    tag2_ts = np.asarray(data[tag2_id]["timestamps"])
-    tag2_ph = np.asarray(data[tag2_id]["phases"])
-    tag2_ch = np.asarray(data[tag2_id]["channels"])
-
-    if len(tag1_ts) < 2 or len(tag2_ts) < 2:
-        print("Not enough data for interpolation (each tag needs at least 2 points).")
-        return [], []
-
-    start_time_ms = max(tag1_ts[0], tag2_ts[0])
-    end_time_ms = min(tag1_ts[-1], tag2_ts[-1])
-    if start_time_ms >= end_time_ms:
-        return [], []
-
-    moving_avg_phase_diffs = []
-    corresponding_timestamps_s = []
-
-    window_duration_ms = window_duration_s * 1000
-    window_stride_ms = window_stride_s * 1000
-    current_window_start_ms = start_time_ms
-
-    while current_window_start_ms + window_duration_ms <= end_time_ms:
-        current_window_end_ms = current_window_start_ms + window_duration_ms
-        
-        idx1 = np.where((tag1_ts >= current_window_start_ms) & (tag1_ts < current_window_end_ms))[0]
-        idx2 = np.where((tag2_ts >= current_window_start_ms) & (tag2_ts < current_window_end_ms))[0]
-
-        if len(idx1) < 2 or len(idx2) < 2:
-            current_window_start_ms += window_stride_ms
-            continue
-
-        win_tag1_ts, win_tag1_ph, win_tag1_ch = tag1_ts[idx1], tag1_ph[idx1], tag1_ch[idx1]
-        win_tag2_ts, win_tag2_ph, win_tag2_ch = tag2_ts[idx2], tag2_ph[idx2], tag2_ch[idx2]
-
-        tag1_phases_by_ch = {ch: (win_tag1_ts[win_tag1_ch == ch], win_tag1_ph[win_tag1_ch == ch]) for ch in np.unique(win_tag1_ch)}
-        tag2_phases_by_ch = {ch: (win_tag2_ts[win_tag2_ch == ch], win_tag2_ph[win_tag2_ch == ch]) for ch in np.unique(win_tag2_ch)}
-
-        common_channels = set(tag1_phases_by_ch.keys()) & set(tag2_phases_by_ch.keys())
-        window_all_diffs = []
-
-        if common_channels:
-            for channel in common_channels:
-                ts1_ch, ph1_ch = tag1_phases_by_ch[channel]
-                ts2_ch, ph2_ch = tag2_phases_by_ch[channel]
-
-                # Need at least 2 points on this channel for each tag to interpolate
-                if len(ts1_ch) < 2 or len(ts2_ch) < 2:
-                    continue
-
-                # --- Core Logic: Unwrap and Interpolate ---
-                unwrapped_ph1 = unwrap_phase(ph1_ch)
-                unwrapped_ph2 = unwrap_phase(ph2_ch)
-
-                # Interpolate Tag 2's phase at the timestamps of Tag 1
-                # np.interp(x, xp, fp) -> x=new_x, xp=old_x, fp=old_y
-                interp_ph2 = np.interp(ts1_ch, ts2_ch, unwrapped_ph2)
-
-                # Calculate the difference
-                diffs = unwrapped_ph1 - interp_ph2
-                window_all_diffs.extend(diffs)
-
-        if window_all_diffs:
-            overall_avg_for_window = np.mean(window_all_diffs)
-            moving_avg_phase_diffs.append(phase_normalization(overall_avg_for_window))
-            corresponding_timestamps_s.append(current_window_end_ms / 1000.0)
-
-        current_window_start_ms += window_stride_ms
+    moving_avg_phase_diffs, corresponding_timestamps_s, summary = interpolated_moving_average_phase_difference(
+        data, epc_list, window_duration_s, window_stride_s, expected)
+    moving_avg_phase_diffs, corresponding_timestamps_s = moving_avg_phase_diffs.tolist(), corresponding_timestamps_s.tolist()
 
     print(f"Generated {len(moving_avg_phase_diffs)} data points for the interpolated moving average.")
     if stats:
         if moving_avg_phase_diffs:
-            print(f"Standard Deviation: {np.std(moving_avg_phase_diffs)}")
-            print(f"Min/Max: {np.min(moving_avg_phase_diffs)}/{np.max(moving_avg_phase_diffs)}")
-            print(f"Mean: {np.mean(moving_avg_phase_diffs)}")
-            print(f"Median: {np.median(moving_avg_phase_diffs)}")
-            if expected:
-                expected = 20
-                errors = np.array(moving_avg_phase_diffs) - expected
-                rmse = np.sqrt(np.mean(errors**2))
-                mean_actual = np.mean(moving_avg_phase_diffs)
-                ss_tot = np.sum((np.array(moving_avg_phase_diffs) - mean_actual)**2)
-                ss_res = np.sum(errors**2)
-                r2 = 1 - (ss_res / ss_tot) if ss_tot != 0 else 0
-                print(f"RMSE (expected {expected}): {rmse:.2f}")
-                print(f"R^2 (expected {expected}): {r2:.4f}")
-
+            print(f"Standard Deviation: {summary['std']}")
+            print(f"Min/Max: {summary['min']}/{summary['max']}")
+            print(f"Mean: {summary['mean']}")
+            print(f"Median: {summary['median']}")
+            if expected is not None:
+                print(f"RMSE (expected {expected}): {summary['rmse']:.2f}")
+                print(f"R^2 (expected {expected}): {summary['r2']:.4f}")
 
     if moving_avg_phase_diffs:
         plt.figure(figsize=(18, 6)) # Wider figure
@@ -499,9 +217,9 @@ def plot_interpolated_moving_average_rssi_difference(
                                                     window_stride_s=0.05
                                                 ):
     """
-    Calculates the moving average RSSI difference using a time-based sliding window
-    with linear interpolation for robust, accurate results. 
-    Matches the structure of the phase-based version.
+    Plots the moving average RSSI difference using a time-based sliding window
+    with linear interpolation for robust, accurate results
+    (see `rfid_analysis.interpolated_moving_average_rssi_difference`).
 
     Args:
         data (dict): A dictionary containing RFID tag data, grouped by EPC.
@@ -512,80 +230,9 @@ def plot_interpolated_moving_average_rssi_difference(
     Returns:
         tuple: (list of moving average RSSI differences, list of corresponding timestamps).
     """
-    if len(epc_list) != 2:
-        raise ValueError("`epc_list` must contain exactly two RFID EPC codes.")
-    tag1_id, tag2_id = epc_list[0], epc_list[1]
-    if tag1_id not in data or tag2_id not in data:
-        raise ValueError(f"One or both EPCs ({tag1_id}, {tag2_id}) not found in `data`.")
-    if window_duration_s <= 0 or window_stride_s <= 0:
-        raise ValueError("`window_duration_s` and `window_stride_s` must be positive.")
-
-    tag1_ts = np.asarray(data[tag1_id]["timestamps"])
-    tag1_rs = np.asarray(data[tag1_id]["rssis"])
-    tag1_ch = np.asarray(data[tag1_id]["channels"])
-
-    tag2_ts = np.asarray(data[tag2_id]["timestamps"])
-    tag2_rs = np.asarray(data[tag2_id]["rssis"])
-    tag2_ch = np.asarray(data[tag2_id]["channels"])
-
-    if len(tag1_ts) < 2 or len(tag2_ts) < 2:
-        print("Not enough data for interpolation (each tag needs at least 2 points).")
-        return [], []
-
-    start_time_ms = max(tag1_ts[0], tag2_ts[0])
-    end_time_ms = min(tag1_ts[-1], tag2_ts[-1])
-    if start_time_ms >= end_time_ms:
-        return [], []
-
-    moving_avg_rssi_diffs = []
-    corresponding_timestamps_s = []
-
-    window_duration_ms = window_duration_s * 1000
-    window_stride_ms = window_stride_s * 1000
-    current_window_start_ms = start_time_ms
-
-    while current_window_start_ms + window_duration_ms <= end_time_ms:
-        current_window_end_ms = current_window_start_ms + window_duration_ms
-        
-        idx1 = np.where((tag1_ts >= current_window_start_ms) & (tag1_ts < current_window_end_ms))[0]
-        idx2 = np.where((tag2_ts >= current_window_start_ms) & (tag2_ts < current_window_end_ms))[0]
-
-        if len(idx1) < 2 or len(idx2) < 2:
-            current_window_start_ms += window_stride_ms
-            continue
-
-        win_tag1_ts, win_tag1_rs, win_tag1_ch = tag1_ts[idx1], tag1_rs[idx1], tag1_ch[idx1]
-        win_tag2_ts, win_tag2_rs, win_tag2_ch = tag2_ts[idx2], tag2_rs[idx2], tag2_ch[idx2]
-
-        tag1_rssi_by_ch = {ch: (win_tag1_ts[win_tag1_ch == ch], win_tag1_rs[win_tag1_ch == ch]) for ch in np.unique(win_tag1_ch)}
-        tag2_rssi_by_ch = {ch: (win_tag2_ts[win_tag2_ch == ch], win_tag2_rs[win_tag2_ch == ch]) for ch in np.unique(win_tag2_ch)}
-
-        common_channels = set(tag1_rssi_by_ch.keys()) & set(tag2_rssi_by_ch.keys())
-        window_all_diffs = []
-
-        if common_channels:
-            for channel in common_channels:
-                ts1_ch, rs1_ch = tag1_rssi_by_ch[channel]
-                ts2_ch, rs2_ch = tag2_rssi_by_ch[channel]
-
-                # Need at least 2 points on this channel for each tag to interpolate
-                if len(ts1_ch) < 2 or len(ts2_ch) < 2:
-                    continue
-
-                # --- Core Logic: Interpolate RSSI ---
-                # Interpolate Tag 2's RSSI at the timestamps of Tag 1
-                interp_rs2 = np.interp(ts1_ch, ts2_ch, rs2_ch)
-
-                # Calculate the difference (Differential RSSI)
-                diffs = rs1_ch - interp_rs2
-                window_all_diffs.extend(diffs)
-
-        if window_all_diffs:
-            overall_avg_for_window = np.mean(window_all_diffs)
-            moving_avg_rssi_diffs.append(overall_avg_for_window)
-            corresponding_timestamps_s.append(current_window_end_ms / 1000.0)
-
-        current_window_start_ms += window_stride_ms
+    moving_avg_rssi_diffs, corresponding_timestamps_s, _ = interpolated_moving_average_rssi_difference(
+        data, epc_list, window_duration_s, window_stride_s)
+    moving_avg_rssi_diffs, corresponding_timestamps_s = moving_avg_rssi_diffs.tolist(), corresponding_timestamps_s.tolist()
 
     print(f"Generated {len(moving_avg_rssi_diffs)} data points for the interpolated moving average RSSI.")
     if moving_avg_rssi_diffs:
@@ -848,57 +495,6 @@ def plot_realtime_phase_difference(data, experiment_duration=None):
         print(f"Sampling rate: {len(data)/experiment_duration:.2f} Hz")
         print(f"Time per sample: {experiment_duration/len(data):.3f} seconds")
 
-def subset_epc_data(data, start = 0, end = 1):
-    """
-    Subset EPC data dictionary between start and end (seconds or fractions).
-
-    Args:
-        data (dict): Dictionary of EPC data:
-                     {
-                       "epc1": {"rssis": [], "phases": [], "timestamps": [], "channels": []},
-                       ...
-                     }
-        start (float): Start index (seconds or fraction of total duration).
-        end (float): End index (seconds or fraction of total duration).
-
-    Returns:
-        dict: Subset of the original data with the same structure.
-    """
-    # Get overall duration from timestamps (assuming ms values)
-    all_timestamps = []
-    for epc in data.values():
-        all_timestamps.extend(epc["timestamps"])
-    if not all_timestamps:
-        return {}
-
-    min_ts = min(all_timestamps)
-    max_ts = max(all_timestamps)
-    duration_sec = (max_ts - min_ts) / 1000.0
-
-    # Handle fractional indices
-    if 0 <= start <= 1 and 0 <= end <= 1 and start <= end:
-        start_time = min_ts + start * duration_sec * 1000
-        end_time = min_ts + end * duration_sec * 1000
-    else:
-        start_time = min_ts + start * 1000
-        end_time = min_ts + end * 1000
-
-    # Build subset
-    subset = {}
-    for epc, values in data.items():
-        ts = values["timestamps"]
-        indices = [i for i, t in enumerate(ts) if start_time <= t <= end_time]
-
-        subset[epc] = {
-            "rssis":   [values["rssis"][i] for i in indices],
-            "phases":  [values["phases"][i] for i in indices],
-            "timestamps": [values["timestamps"][i] for i in indices],
-            "channels":   [values["channels"][i] for i in indices]
-        }
-
-    return subset
-
-
 def extract_experiment_duration(base_file_name):
     """
     Extract the time (X in seconds) from filenames of the form:
@@ -1017,7 +613,13 @@ def plotter(base_file_name, epc_list=None, start_index=0, end_index=1):
 
 # **Main execution function**
 if __name__ == "__main__":
-    
+
+    # A directory or glob pattern of captures runs the headless batch analysis instead
+    if len(argv) > 1 and (os.path.isdir(argv[1]) or any(char in argv[1] for char in "*?[")):
+        from batch_analysis import main as batch_main
+        batch_main()
+        exit()
+
     try:
         base_file_name = argv[1]
     except:
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import numpy as np
+
+def window_bounds(start_ms, end_ms, duration_ms, stride_ms):
+    """
+    Start and end (ms) of every window of `duration_ms` stepped by `stride_ms` from
+    `start_ms`, keeping only windows that end by `end_ms`.
+
+    The starts are accumulated one stride at a time, exactly like a loop doing
+    `start += stride`, so the windows match those of the stepping loops bit for bit.
+    """
+    if end_ms - start_ms < duration_ms:
+        return np.array([]), np.array([])
+    count = int((end_ms - start_ms - duration_ms) // stride_ms) + 2
+    starts = np.add.accumulate(np.r_[float(start_ms), np.full(count - 1, float(stride_ms))])
+    starts = starts[starts + duration_ms <= end_ms]
+    return starts, starts + duration_ms
+
+class ChannelWindows:
+    """
+    Reads of one tag cut into sliding windows, per channel, without copying per window.
+
+    The reads are grouped by channel once (stable, so each channel keeps its read order)
+    and the first and last read of every window are found for every channel at once with
+    `np.searchsorted` on the timestamps. Window `k` of a channel is then a plain slice
+    of that channel's columns, so stepping a window costs nothing per read.
+
+    Timestamps must be in read order (non-decreasing), as they are in the captures.
+    """
+    def __init__(self, timestamps, channels, starts, ends, **columns):
+        """
+        :param starts: Window starts (ms), e.g. from `window_bounds`.
+        :param ends: Window ends (ms), exclusive.
+        :param columns: Per-read columns (e.g. phases=..., rssis=...) to slice along.
+        """
+        timestamps = np.asarray(timestamps)
+        channels = np.asarray(channels)
+        if np.any(np.diff(timestamps) < 0):
+            raise ValueError("`timestamps` must be sorted.")
+
+        # Reads of every window over all channels
+        self.counts = np.searchsorted(timestamps, ends, side="left") - np.searchsorted(timestamps, starts, side="left")
+
+        order = np.argsort(channels, kind="stable")
+        sorted_channels = channels[order]
+        self.channels, first = np.unique(sorted_channels, return_index=True)
+        self.columns = {name: np.asarray(column)[order] for name, column in columns.items()}
+        self.columns["timestamps"] = timestamps[order]
+
+        # Channel c holds the sorted reads bounds[c]:bounds[c + 1]
+        self.bounds = np.r_[first, len(order)]
+        self.starts = np.asarray(starts)
+        self.ends = np.asarray(ends)
+        # Per channel and window bounds, only built for `window` (they hold channels x windows entries)
+        self.lo = self.hi = None
+
+    def __len__(self):
+        return len(self.starts)
+
+    def channel_slices(self, c):
+        """
+        First and one-past-last read of channel index `c` in every window, as indices into
+        the channel-sorted columns.
+        """
+        lo, hi = self.bounds[c], self.bounds[c + 1]
+        block = self.columns["timestamps"][lo:hi]
+        return (lo + np.searchsorted(block, self.starts, side="left"),
+                lo + np.searchsorted(block, self.ends, side="left"))
+
+    def window(self, k):
+        """
+        Reads of window `k` grouped by channel.
+
+        :return: A dictionary of channel -> {column name: NumPy view}, non-empty channels only.
+        """
+        if self.lo is None:
+            # lo/hi[c, k]: slice of window k within the sorted columns, for channel c
+            slices = [self.channel_slices(c) for c in range(len(self.channels))]
+            self.lo = np.array([lo for lo, _ in slices])
+            self.hi = np.array([hi for _, hi in slices])
+        lo, hi = self.lo[:, k], self.hi[:, k]
+        return {
+            self.channels[c]: {name: column[lo[c]:hi[c]] for name, column in self.columns.items()}
+            for c in np.flatnonzero(hi > lo)
+        }
+
+def interpolated_window_means(tag1, tag2, column, offsets=None, min_reads=2):
+    """
+    Mean difference over every window between `column` of tag 1 and that of tag 2 linearly
+    interpolated at tag 1's read times, pooled over the channels both tags read at least
+    `min_reads` times in the window.
+
+    This is what interpolating each channel within each window gives (tag 2 held at its
+    first/last value in the window outside its reads), computed without a window loop:
+    tag 2 is interpolated once per channel over the whole capture, which is exact between
+    two tag-2 reads of the window, and every window sum is then a difference of prefix
+    sums plus the held-value terms at its two ends. The cost no longer depends on how much
+    the windows overlap.
+
+    :param tag1, tag2: ChannelWindows of both tags over the same windows.
+    :param column: Name of the column to compare.
+    :param offsets: Name of a column subtracted from `column` at the first read of each
+                    window and channel, e.g. the unwrap correction already accumulated
+                    there, so that the window starts from the raw value.
+    :return: (sums, counts): per-window sum and number of differences; the mean of window
+             `k` is sums[k] / counts[k] wherever counts[k] > 0.
+    """
+    sums = np.zeros(len(tag1), dtype=np.float64)
+    counts = np.zeros(len(tag1), dtype=np.int64)
+    ts1, ts2 = tag1.columns["timestamps"], tag2.columns["timestamps"]
+    values1, values2 = tag1.columns[column], tag2.columns[column]
+
+    for c1, channel in enumerate(tag1.channels):
+        c2 = np.searchsorted(tag2.channels, channel)
+        if c2 == len(tag2.channels) or tag2.channels[c2] != channel:
+            continue
+        lo1, hi1 = tag1.channel_slices(c1)
+        lo2, hi2 = tag2.channel_slices(c2)
+        valid = (hi1 - lo1 >= min_reads) & (hi2 - lo2 >= min_reads)
+        if not valid.any():
+            continue
+        lo1, hi1, lo2, hi2 = lo1[valid], hi1[valid], lo2[valid], hi2[valid]
+
+        block1 = slice(tag1.bounds[c1], tag1.bounds[c1 + 1])
+        block2 = slice(tag2.bounds[c2], tag2.bounds[c2 + 1])
+        diffs = values1[block1] - np.interp(ts1[block1], ts2[block2], values2[block2])
+        prefix_values = np.r_[0.0, np.cumsum(values1[block1])]
+        prefix_diffs = np.r_[0.0, np.cumsum(diffs)]
+
+        # Local (channel block) indices of the window reads
+        lo1, hi1 = lo1 - block1.start, hi1 - block1.start
+        first2, last2 = lo2, hi2 - 1
+        # Tag-1 reads between the first and the last tag-2 read of the window
+        mid_lo = np.clip(np.searchsorted(ts1[block1], ts2[first2], side="left"), lo1, hi1)
+        mid_hi = np.clip(np.searchsorted(ts1[block1], ts2[last2], side="right"), mid_lo, hi1)
+
+        total = (prefix_diffs[mid_hi] - prefix_diffs[mid_lo]
+                 + prefix_values[mid_lo] - prefix_values[lo1] - (mid_lo - lo1) * values2[first2]
+                 + prefix_values[hi1] - prefix_values[mid_hi] - (hi1 - mid_hi) * values2[last2])
+        n = hi1 - lo1
+        if offsets is not None:
+            total += n * (tag2.columns[offsets][first2] - tag1.columns[offsets][lo1 + block1.start])
+        sums[valid] += total
+        counts[valid] += n
+
+    return sums, counts
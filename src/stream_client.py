@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Local test client of StreamServer: subscribes over WebSocket (or SSE) and prints the
+received frames, then the frame rate and the latency from publication to receipt.
+
+    python src/stream_client.py [--sse] [--binary] [--sensors stub6,soil] [--count 100] [--quiet]
+"""
+
+from sys import path
+import os
+
+# Add the parent directory of the src to sys.path
+path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import json
+import asyncio
+import argparse
+import numpy as np
+from time import time,perf_counter
+from base64 import b64encode
+from StreamServer import FRAME_HEADER, FRAME_SENSOR, WS_TEXT, WS_BINARY, WS_CLOSE, read_ws_frame
+from lib.params import STREAM
+
+def ws_client_frame(payload, opcode):
+    """Encode one masked (client to server) WebSocket frame; payloads here are short."""
+    mask = os.urandom(4)
+    masked = (np.frombuffer(payload, np.uint8) ^ np.resize(np.frombuffer(mask, np.uint8), len(payload))).tobytes()
+    return bytes((0x80 | opcode, 0x80 | len(payload))) + mask + masked
+
+def decode_binary(payload, sensor_names):
+    timestamp, count = FRAME_HEADER.unpack_from(payload)
+    sensors = {}
+    for i in range(count):
+        idx, phase, rssi = FRAME_SENSOR.unpack_from(payload, FRAME_HEADER.size + i * FRAME_SENSOR.size)
+        sensors[sensor_names[idx]] = {"phase": phase, "rssi": rssi}
+    return {"t": timestamp, "sensors": sensors}
+
+async def receive_ws(reader, writer, args):
+    """Yield the decoded frames of a WebSocket subscription."""
+    writer.write(f"GET /ws?{query(args)} HTTP/1.1\r\nHost: {args.host}:{args.port}\r\nUpgrade: websocket\r\n"
+                 f"Connection: Upgrade\r\nSec-WebSocket-Key: {b64encode(os.urandom(16)).decode()}\r\n"
+                 "Sec-WebSocket-Version: 13\r\n\r\n".encode())
+    status = (await reader.readuntil(b"\r\n\r\n")).split(b"\r\n", 1)[0]
+    if b" 101 " not in status:
+        raise ConnectionError(f"Handshake refused: {status.decode()}")
+    sensor_names = None
+    while True:
+        opcode, payload = await read_ws_frame(reader)
+        if opcode == WS_CLOSE:
+            return
+        if sensor_names is None:
+            sensor_names = json.loads(payload)["sensorNames"]
+            print(f"Sensors: {sensor_names}")
+        elif opcode == WS_BINARY:
+            yield decode_binary(payload, sensor_names)
+        elif opcode == WS_TEXT:
+            yield json.loads(payload)
+
+async def receive_sse(reader, writer, args):
+    """Yield the decoded events of an SSE subscription."""
+    writer.write(f"GET /events?{query(args)} HTTP/1.1\r\nHost: {args.host}:{args.port}\r\n"
+                 "Accept: text/event-stream\r\n\r\n".encode())
+    await reader.readuntil(b"\r\n\r\n")
+    first = True
+    while True:
+        event = (await reader.readuntil(b"\n\n")).decode()
+        data = json.loads(event.split("data: ", 1)[1])
+        if first:
+            print(f"Sensors: {data['sensorNames']}")
+            first = False
+        else:
+            yield data
+
+def query(args):
+    return "&".join(part for part in (f"sensors={args.sensors}" if args.sensors else "",
+                                      "format=binary" if args.binary else "") if part)
+
+async def run(args):
+    reader, writer = await asyncio.open_connection(args.host, args.port)
+    receive = receive_sse if args.sse else receive_ws
+    latencies = []
+    start = perf_counter()
+    try:
+        async for frame in receive(reader, writer, args):
+            latencies.append(time() * 1_000 - frame["t"])
+            if not args.quiet:
+                print(frame)
+            if len(latencies) >= args.count:
+                break
+        if not args.sse:
+            writer.write(ws_client_frame(b"\x03\xe8", WS_CLOSE))
+            await writer.drain()
+    finally:
+        writer.close()
+    elapsed = perf_counter() - start
+    if latencies:
+        print(f"{len(latencies)} frames in {elapsed:.2f} s ({len(latencies) / elapsed:.1f}/s), "
+              f"latency p50 {np.percentile(latencies, 50):.2f} ms, p99 {np.percentile(latencies, 99):.2f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description="Test client of the phase-difference stream")
+    parser.add_argument("--host", default=STREAM['host'])
+    parser.add_argument("--port", type=int, default=STREAM['port'])
+    parser.add_argument("--sse", action="store_true", help="Subscribe over Server-Sent Events instead of WebSocket")
+    parser.add_argument("--binary", action="store_true", help="Ask for binary WebSocket frames")
+    parser.add_argument("--sensors", default="", help="Comma-separated sensors to subscribe to (all by default)")
+    parser.add_argument("--count", type=int, default=100, help="Frames to receive before exiting")
+    parser.add_argument("--quiet", action="store_true", help="Only print the summary")
+    try:
+        asyncio.run(run(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,8 @@
+import os
+import sys
+
+# The modules in src import each other by name and lib.params from the repository root,
+# which also reads lib/params.xml relative to the working directory
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path[:0] = [os.path.join(ROOT, 'src'), ROOT]
+os.chdir(ROOT)
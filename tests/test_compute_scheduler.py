@@ -0,0 +1,76 @@
+import pytest
+
+from ComputeScheduler import ComputeScheduler
+
+
+class Counter:
+    def __init__(self, result=None):
+        self.calls = 0
+        self.result = result
+
+    def __call__(self):
+        self.calls += 1
+        return self.result
+
+
+def scheduler_at(start, compute, rate_hz=10):
+    scheduler = ComputeScheduler(compute, rate_hz)
+    scheduler.next_tick = start
+    return scheduler
+
+
+def test_reads_between_ticks_are_coalesced():
+    compute = Counter(42)
+    scheduler = scheduler_at(100.0, compute)
+    assert scheduler.poll(100.0) == (False, None)   # no read yet
+
+    scheduler.notify(3, timestamp=1_000)
+    scheduler.notify(2, timestamp=2_000)
+    assert scheduler.poll(100.0) == (True, 42)
+    assert compute.calls == 1 and scheduler.pending == 0 and scheduler.latest_timestamp == 2_000
+
+    # The next tick is a period later, whatever the reads in between
+    scheduler.notify(4)
+    assert scheduler.poll(100.05) == (False, None)
+    assert scheduler.poll(100.1) == (True, 42)
+    stats = scheduler.get_stats()
+    assert stats["ticks"] == 2 and stats["reads"] == 9 and stats["reads_per_tick"] == 4.5
+
+
+def test_a_none_result_still_counts_as_a_tick():
+    scheduler = scheduler_at(0.0, Counter(None))
+    scheduler.notify()
+    assert scheduler.poll(0.0) == (True, None)
+
+
+def test_idle_poll_runs_the_last_reads_once_due():
+    # Reads arrive right after a tick; with no further reads the idle poll computes them
+    compute = Counter(1)
+    scheduler = scheduler_at(0.0, compute)
+    scheduler.notify()
+    scheduler.poll(0.0)
+    scheduler.notify()
+    assert scheduler.poll(0.01) == (False, None)
+    assert scheduler.poll(0.1) == (True, 1)
+    assert compute.calls == 2
+
+
+def test_missed_ticks_are_skipped_not_replayed():
+    compute = Counter(1)
+    scheduler = scheduler_at(0.0, compute)
+    scheduler.notify()
+    # 0.35 s late on a 0.1 s period: this tick runs, the three after it are skipped
+    assert scheduler.poll(0.35) == (True, 1)
+    assert scheduler.skipped_ticks == 3
+    assert scheduler.lag == pytest.approx(0.35) and scheduler.max_lag == pytest.approx(0.35)
+    assert scheduler.next_tick == pytest.approx(0.4)
+
+    scheduler.notify()
+    assert scheduler.poll(0.39) == (False, None)
+    assert scheduler.poll(0.4) == (True, 1)
+    assert compute.calls == 2 and scheduler.skipped_ticks == 3
+
+
+def test_rate_must_be_positive():
+    with pytest.raises(ValueError):
+        ComputeScheduler(Counter(), 0)
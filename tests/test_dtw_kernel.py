@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+
+from dtw_kernel import band_limits, dtw, dtw_align
+
+
+def reference_dtw(x, y, band=None):
+    """Full-matrix DTW, cells outside band_limits left at inf, same tie-breaking as dtw_kernel."""
+    n, m = len(x), len(y)
+    acc = np.full((n + 1, m + 1), np.inf)
+    acc[0, 0] = 0.0
+    lo, hi = band_limits(n, m, band)
+    for i in range(1, n + 1):
+        for j in range(1, m + 1):
+            if lo[i + j - 2] <= i <= hi[i + j - 2]:
+                acc[i, j] = min(acc[i - 1, j], acc[i, j - 1], acc[i - 1, j - 1]) + abs(x[i - 1] - y[j - 1])
+
+    i, j = n, m
+    path = []
+    while i > 0 and j > 0:
+        path.append((i - 1, j - 1))
+        up, left, diag = acc[i - 1, j], acc[i, j - 1], acc[i - 1, j - 1]
+        if up <= left and up <= diag:
+            i -= 1
+        elif left <= diag:
+            j -= 1
+        else:
+            i -= 1
+            j -= 1
+    return acc[n, m], path[::-1]
+
+
+@pytest.mark.parametrize("n, m", [(1, 1), (1, 7), (7, 1), (12, 12), (15, 40), (40, 15)])
+@pytest.mark.parametrize("integers", [False, True])
+def test_full_matrix_matches_reference(n, m, integers):
+    rng = np.random.default_rng(n * 100 + m)
+    # Small integers make many paths tie, which checks the tie-breaking as well
+    x = rng.integers(0, 3, n).astype(float) if integers else rng.normal(size=n)
+    y = rng.integers(0, 3, m).astype(float) if integers else rng.normal(size=m)
+
+    distance, (path_x, path_y) = dtw(x, y)
+    ref_distance, ref_path = reference_dtw(x, y)
+    assert distance == ref_distance
+    assert list(zip(path_x.tolist(), path_y.tolist())) == ref_path
+
+
+@pytest.mark.parametrize("n, m, band", [(30, 30, 3), (30, 45, 2), (45, 30, 5), (50, 50, 0)])
+def test_band_matches_banded_reference(n, m, band):
+    rng = np.random.default_rng(band)
+    x, y = np.cumsum(rng.normal(size=n)), np.cumsum(rng.normal(size=m))
+
+    distance, (path_x, path_y) = dtw(x, y, band)
+    ref_distance, ref_path = reference_dtw(x, y, band)
+    assert distance == ref_distance
+    assert list(zip(path_x.tolist(), path_y.tolist())) == ref_path
+    # The band only removes paths
+    assert distance >= dtw(x, y)[0]
+
+
+def test_band_wider_than_the_sequences_is_the_full_matrix():
+    rng = np.random.default_rng(0)
+    x, y = rng.normal(size=20), rng.normal(size=25)
+    full = dtw(x, y)
+    banded = dtw(x, y, band=25)
+    assert banded[0] == full[0]
+    np.testing.assert_array_equal(banded[1][0], full[1][0])
+    np.testing.assert_array_equal(banded[1][1], full[1][1])
+
+
+def test_align_follows_the_path():
+    x, y = np.array([0.0, 1.0, 2.0]), np.array([0.0, 0.0, 1.0, 2.0, 2.0])
+    aligned_x, aligned_y = dtw_align(x, y)
+    np.testing.assert_array_equal(aligned_x, [0, 0, 1, 2, 2])
+    np.testing.assert_array_equal(aligned_y, y)
+
+
+def test_empty_sequence_is_rejected():
+    with pytest.raises(ValueError):
+        dtw([], [1.0])
@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from LatencyTracer import LatencyHistogram, LatencyTracer, SAMPLE_FIELDS
+
+
+def test_small_values_are_exact():
+    histogram = LatencyHistogram()
+    values = np.arange(2 * LatencyHistogram.SUB_BUCKETS)
+    np.testing.assert_array_equal([histogram.bucket_value(index) for index in histogram.bucket_index(values)], values)
+
+
+def test_bucket_error_is_below_one_sub_bucket():
+    histogram = LatencyHistogram()
+    values = np.unique(np.geomspace(1, histogram.max_value, 20_000).astype(np.int64))
+    lower = np.array([histogram.bucket_value(index) for index in histogram.bucket_index(values)])
+    # Buckets hold their lower bound, less than 1 / SUB_BUCKETS below the value
+    assert np.all(lower <= values)
+    assert np.all(values - lower <= values / LatencyHistogram.SUB_BUCKETS)
+    # Bucket indices grow with the values and stay inside the counts
+    assert np.all(np.diff(histogram.bucket_index(values)) >= 0)
+    assert histogram.bucket_index(values).max() < len(histogram.counts)
+
+
+@pytest.mark.parametrize("q", [1, 50, 90, 99, 99.9, 100])
+def test_percentile_error_bound(q):
+    rng = np.random.default_rng(0)
+    values = rng.lognormal(8, 2, 50_000).astype(np.int64)
+    histogram = LatencyHistogram()
+    histogram.record(values[:20_000])
+    histogram.record(values[20_000:])
+
+    exact = np.percentile(values, q, method="inverted_cdf")
+    estimate = histogram.percentile(q)
+    assert exact - exact / LatencyHistogram.SUB_BUCKETS <= estimate <= exact
+
+
+def test_record_clamps_and_tracks_extremes():
+    histogram = LatencyHistogram(max_value_us=1_000)
+    histogram.record([-5, 10, 5_000])
+    assert histogram.total == 3 and histogram.min == 0 and histogram.max == 1_000
+    assert histogram.percentile(100) == 1_000
+    assert LatencyHistogram().percentile(50) is None
+
+
+def test_tracer_leaves_out_unstamped_stages():
+    tracer = LatencyTracer()
+    # value, enqueue, read, parse, insert, compute (ms); insert was not stamped
+    sample = [1.0, 104.0, 100.0, 101.0, np.nan, 103.0]
+    assert len(sample) == len(SAMPLE_FIELDS)
+    tracer.record_samples([sample], dequeue=105.0, draw=110.0)
+    report = tracer.report()
+    assert report["read->parse"]["count"] == 1 and report["read->parse"]["max_ms"] == 1.0
+    assert report["parse->insert"]["count"] == 0
+    assert report["read->draw"]["max_ms"] == 10.0
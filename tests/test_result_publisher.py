@@ -0,0 +1,123 @@
+from time import time, sleep
+
+import numpy as np
+import pytest
+
+from LatencyTracer import SAMPLE_FIELDS
+from ResultPublisher import ResultPublisher
+from SharedSeries import SharedSeries
+
+
+class FakeQueue:
+    """Queue whose backlog is set by the test: qsize() reports `backlog` on top of what was put."""
+    def __init__(self, backlog=0):
+        self.items = []
+        self.backlog = backlog
+
+    def put(self, item):
+        self.items.append(item)
+
+    def qsize(self):
+        return self.backlog
+
+
+@pytest.fixture
+def series():
+    series = SharedSeries(capacity=64, width=len(SAMPLE_FIELDS))
+    yield series
+    series.close()
+
+
+def poll_until(publisher, delivered, timeout_ms):
+    """Poll as an idle producer does, return the time (ms) the first result was delivered."""
+    deadline = time()*1_000 + timeout_ms
+    while time()*1_000 < deadline:
+        publisher.poll()
+        if delivered():
+            return time()*1_000
+        sleep(0.001)
+    return None
+
+
+def test_lone_result_reaches_the_queue_within_max_age():
+    queue = FakeQueue()
+    publisher = ResultPublisher(queue, batch_size=50, max_age_ms=20)
+    t_publish = time()*1_000
+    publisher.publish(1.0)
+    assert not queue.items
+
+    t_delivered = poll_until(publisher, lambda: queue.items, 500)
+    assert t_delivered is not None
+    # A few ms of slack for the polling interval and the scheduler
+    assert t_delivered - t_publish < 20 + 15
+    samples, summary = queue.items[0]
+    assert [sample[0] for sample in samples] == [1.0] and summary is None
+
+
+def test_lone_result_reaches_the_series_within_max_age(series):
+    publisher = ResultPublisher(batch_size=50, series=series, max_age_ms=20)
+    t_publish = time()*1_000
+    publisher.publish(1.0, {"read": 5.0})
+    assert len(series) == 0
+
+    t_delivered = poll_until(publisher, lambda: len(series), 500)
+    assert t_delivered is not None
+    assert t_delivered - t_publish < 20 + 15
+    samples, _ = series.read_since(0)
+    assert samples.shape == (1, len(SAMPLE_FIELDS))
+    assert samples[0, 0] == 1.0 and samples[0, SAMPLE_FIELDS.index("read")] == 5.0
+
+
+def test_full_batch_goes_to_the_series_at_once(series):
+    publisher = ResultPublisher(batch_size=4, series=series, max_age_ms=10_000)
+    for value in range(3):
+        publisher.publish(float(value))
+    assert len(series) == 0
+    publisher.publish(3.0)
+    samples, cursor = series.read_since(0)
+    np.testing.assert_array_equal(samples[:, 0], [0.0, 1.0, 2.0, 3.0])
+    assert cursor == 4 and publisher.get_stats()["batches"] == 1
+
+
+def test_results_are_coalesced_while_the_gui_is_behind():
+    queue = FakeQueue(backlog=4)
+    publisher = ResultPublisher(queue, batch_size=2, max_age_ms=10_000, max_pending=4)
+    for value in (1.0, 5.0, 3.0, 2.0):
+        publisher.publish(value)
+    # Both full batches were folded instead of sent
+    assert not queue.items
+    assert publisher.get_stats()["buffered"] == 4
+
+    # Still behind: nothing goes out
+    publisher.poll()
+    assert not queue.items
+
+    queue.backlog = 3
+    publisher.poll()
+    (samples, summary), = queue.items
+    assert [sample[0] for sample in samples] == [2.0]
+    assert summary == {"count": 4, "min": 1.0, "max": 5.0, "mean": 2.75}
+    stats = publisher.get_stats()
+    assert stats["coalesced_batches"] == 1 and stats["coalesced_samples"] == 4 and stats["buffered"] == 0
+
+
+def test_regular_batches_once_the_gui_caught_up():
+    queue = FakeQueue(backlog=4)
+    publisher = ResultPublisher(queue, batch_size=2, max_age_ms=10_000, max_pending=4)
+    publisher.publish(1.0)
+    publisher.publish(2.0)
+    queue.backlog = 0
+    publisher.poll()
+    publisher.publish(3.0)
+    publisher.publish(4.0)
+    assert [summary is None for _, summary in queue.items] == [False, True]
+    assert [sample[0] for sample in queue.items[1][0]] == [3.0, 4.0]
+
+
+def test_series_is_never_coalesced(series):
+    publisher = ResultPublisher(FakeQueue(backlog=100), batch_size=2, series=series, max_pending=1)
+    for value in range(4):
+        publisher.publish(float(value))
+    samples, _ = series.read_since(0)
+    np.testing.assert_array_equal(samples[:, 0], [0.0, 1.0, 2.0, 3.0])
+    assert publisher.get_stats()["coalesced_samples"] == 0
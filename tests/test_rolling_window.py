@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from RollingWindow import RollingWindow
+
+
+def window_stats(values):
+    finite = values[np.isfinite(values)]
+    if not len(finite):
+        return None, None
+    return finite.mean(), finite.std()
+
+
+def test_stats_follow_the_window_with_nan():
+    rng = np.random.default_rng(0)
+    window = RollingWindow(16)
+    stream = []
+    for _ in range(200):
+        batch = rng.normal(20, 5, rng.integers(1, 9))
+        batch[rng.random(len(batch)) < 0.2] = np.nan
+        window.extend(batch)
+        stream.extend(batch)
+
+        expected = np.array(stream[-16:])
+        np.testing.assert_array_equal(window.view(), expected)
+        mean, std = window_stats(expected)
+        if mean is None:
+            assert window.mean() is None and window.std() is None
+        else:
+            assert window.mean() == pytest.approx(mean, abs=1e-9)
+            assert window.std() == pytest.approx(std, abs=1e-6)
+        assert window.indices()[-1] == len(stream) and len(window.indices()) == len(window)
+
+
+def test_all_nan_window_has_no_stats():
+    window = RollingWindow(4)
+    window.extend([1.0, 2.0])
+    window.extend([np.nan] * 4)
+    assert window.valid == 0 and window.mean() is None and window.std() is None
+    assert np.isnan(window.latest())
+
+
+def test_wrap_resyncs_the_sums():
+    # A large offset makes the incremental sums drift, the resync on every wrap removes the drift
+    rng = np.random.default_rng(1)
+    window = RollingWindow(10)
+    for _ in range(500):
+        window.extend(1e9 + rng.normal(size=3))
+        if window.head < 3:
+            # The batch just wrapped: the sums are exactly those of the window
+            values = window.view()
+            assert window.sum == float(values.sum())
+            assert window.sum_sq == float((values * values).sum())
+
+
+def test_batch_longer_than_the_window_keeps_the_newest():
+    window = RollingWindow(5)
+    window.extend(np.arange(3.0))
+    window.extend(np.arange(100.0))
+    np.testing.assert_array_equal(window.view(), np.arange(95.0, 100.0))
+    assert window.mean() == 97.0 and window.total == 103
+    np.testing.assert_array_equal(window.indices(), np.arange(99, 104))
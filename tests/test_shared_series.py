@@ -0,0 +1,31 @@
+import numpy as np
+
+from SharedSeries import SharedSeries
+
+
+def test_extend_wraps_around_the_ring():
+    series = SharedSeries(capacity=8, width=2)
+    try:
+        series.extend([(i, i) for i in range(6)])
+        series.extend([(i, i) for i in range(6, 11)])
+        samples, cursor = series.read_since(0)
+        # The three oldest samples were overwritten
+        np.testing.assert_array_equal(samples[:, 0], np.arange(3, 11))
+        assert cursor == 11
+
+        series.append(11, 11)
+        samples, cursor = series.read_since(cursor)
+        np.testing.assert_array_equal(samples, [[11, 11]])
+    finally:
+        series.close()
+
+
+def test_extend_longer_than_the_ring_keeps_the_newest():
+    series = SharedSeries(capacity=4, width=2)
+    try:
+        series.extend([(i, -i) for i in range(10)])
+        samples, cursor = series.read_since(0)
+        np.testing.assert_array_equal(samples[:, 0], [6, 7, 8, 9])
+        assert cursor == 10
+    finally:
+        series.close()